@@ -7,10 +7,21 @@ Provides REST API endpoints for dashboard statistics and data insertion
 from flask import Flask, jsonify, request, render_template
 from flask_cors import CORS
 import os
-from utils import get_db_connection, get_user_region, get_account_region, get_account_info_by_number, get_account_id_by_number, cursor_to_dict, cursor_to_dicts
+from utils import get_db_connection, get_user_region, get_account_region, get_account_id_by_number, cursor_to_dict, cursor_to_dicts
+from utils.db import get_accounts_info_by_numbers, call_procedure
+from utils.http_cache import conditional_json, init_compression, bump_write_generation
+from utils.transfers import transfer_money_async, get_transfer_status, get_outbox_stats
+from utils.admission import admit_write, mark_write_failed, get_admission_stats, init_admission, AdmissionRejected
+from utils.approx_stats import approximate_regional_stats, approximate_overall_stats
+from utils.admin import require_admin
+from utils.profiler import start_profile, get_profile
+from utils.telemetry import init_telemetry, get_wait_stats
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+CORS(app, expose_headers=['ETag', 'Retry-After'])  # Enable CORS for all routes
+init_compression(app)  # gzip/br compress large responses
+init_admission(app)  # Per-shard write concurrency limits (429 + Retry-After when overloaded)
+init_telemetry(app)  # Wait-event collector on the catalog and shards (when TELEMETRY_INTERVAL is set)
 
 @app.route('/')
 def index():
@@ -18,8 +29,18 @@ def index():
     return render_template('dashboard.html')
 
 @app.route('/api/stats/regional', methods=['GET'])
+@conditional_json
 def get_regional_stats():
-    """Get statistics by region"""
+    """Get statistics by region (?mode=approximate for sketch-based distinct counts)"""
+    mode = request.args.get('mode', 'exact').lower()
+    if mode not in ('exact', 'approximate'):
+        return jsonify({'error': f'Invalid mode: {mode}. Use exact or approximate'}), 400
+    if mode == 'approximate':
+        try:
+            return jsonify(approximate_regional_stats())
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database connection failed'}), 500
@@ -37,8 +58,21 @@ def get_regional_stats():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/stats/overall', methods=['GET'])
+@conditional_json
 def get_overall_stats():
-    """Get overall statistics"""
+    """Get overall statistics (?mode=approximate for sketch-based distinct counts)"""
+    mode = request.args.get('mode', 'exact').lower()
+    if mode not in ('exact', 'approximate'):
+        return jsonify({'error': f'Invalid mode: {mode}. Use exact or approximate'}), 400
+    if mode == 'approximate':
+        try:
+            return jsonify(approximate_overall_stats())
+        except Exception as e:
+            import traceback
+            error_details = traceback.format_exc()
+            print(f"Error in get_overall_stats (approximate): {error_details}")
+            return jsonify({'error': str(e), 'details': error_details}), 500
+    
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database connection failed', 'details': 'Check database is running and connection settings'}), 500
@@ -59,6 +93,7 @@ def get_overall_stats():
         return jsonify({'error': str(e), 'details': error_details}), 500
 
 @app.route('/api/transactions/recent', methods=['GET'])
+@conditional_json
 def get_recent_transactions():
     """Get recent transactions"""
     conn = get_db_connection()
@@ -78,6 +113,7 @@ def get_recent_transactions():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/accounts/by-region', methods=['GET'])
+@conditional_json
 def get_accounts_by_region():
     """Get accounts breakdown by region"""
     conn = get_db_connection()
@@ -97,6 +133,7 @@ def get_accounts_by_region():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/transactions/by-date', methods=['GET'])
+@conditional_json
 def get_transactions_by_date():
     """Get transaction volume by date"""
     conn = get_db_connection()
@@ -126,9 +163,13 @@ def insert_user():
         if region not in ['NA', 'EU', 'APAC']:
             return jsonify({'error': f'Invalid region: {region}. Must be NA, EU, or APAC'}), 400
         
+        # Wait for a write slot on the shard (raises AdmissionRejected -> 429)
+        admit_write(region)
+        
         # Connect to the appropriate shard based on region
         conn = get_db_connection(shard_region=region)
         if not conn:
+            mark_write_failed()
             return jsonify({'error': f'Database connection failed to shard for region {region}'}), 500
         
         cursor = conn.cursor()
@@ -149,9 +190,13 @@ def insert_user():
         conn.commit()
         cursor.close()
         conn.close()
+        bump_write_generation()
         
         return jsonify({'success': True, 'message': 'User inserted successfully'})
+    except AdmissionRejected:
+        raise  # Answered with 429 by the admission error handler
     except Exception as e:
+        mark_write_failed(e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/insert/account', methods=['POST'])
@@ -169,9 +214,13 @@ def insert_account():
         if not region:
             return jsonify({'error': f'User with user_id {user_id} not found'}), 404
         
+        # Wait for a write slot on the shard (raises AdmissionRejected -> 429)
+        admit_write(region)
+        
         # Connect to the appropriate shard based on user's region
         shard_conn = get_db_connection(shard_region=region)
         if not shard_conn:
+            mark_write_failed()
             return jsonify({'error': f'Database connection failed to shard for region {region}'}), 500
         
         cursor = shard_conn.cursor()
@@ -193,9 +242,13 @@ def insert_account():
         shard_conn.commit()
         cursor.close()
         shard_conn.close()
+        bump_write_generation()
         
         return jsonify({'success': True, 'message': 'Account inserted successfully'})
+    except AdmissionRejected:
+        raise  # Answered with 429 by the admission error handler
     except Exception as e:
+        mark_write_failed(e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/insert/transaction', methods=['POST'])
@@ -212,25 +265,28 @@ def insert_transaction():
         from_account_number = data.get('from_account_number')
         to_account_number = data.get('to_account_number')
         amount = data.get('amount')
+        # 'sync' (default): distributed transaction over DB links
+        # 'async': cross-shard transfers go through the transactional outbox (see utils/transfers.py)
+        mode = (data.get('mode') or 'sync').lower()
+        if mode not in ('sync', 'async'):
+            return jsonify({'error': f'Invalid mode: {mode}. Use sync or async'}), 400
         
         from_account_info = None
         to_account_info = None
         
         # Look up account info by account_number (required method)
         # account_id is NOT globally unique across shards, so we MUST use account_number
+        # Both accounts of a transfer are resolved with one catalog query
+        accounts = get_accounts_info_by_numbers([from_account_number, to_account_number])
         if from_account_number:
-            from_account_info = get_account_info_by_number(from_account_number)
+            from_account_info = accounts.get(from_account_number)
             if not from_account_info:
                 return jsonify({'error': f'Account with number {from_account_number} not found'}), 404
-        else:
-            from_account_info = None
             
         if to_account_number:
-            to_account_info = get_account_info_by_number(to_account_number)
+            to_account_info = accounts.get(to_account_number)
             if not to_account_info:
                 return jsonify({'error': f'Account with number {to_account_number} not found'}), 404
-        else:
-            to_account_info = None
             
         if amount:
             amount = float(amount)
@@ -267,52 +323,74 @@ def insert_transaction():
         else:
             return jsonify({'error': f'Invalid transaction type: {transaction_type}'}), 400
         
+        # Wait for a write slot on the shard (raises AdmissionRejected -> 429)
+        admit_write(region)
+        
         # Connect to the appropriate shard based on account's region
         conn = get_db_connection(shard_region=region)
         if not conn:
+            mark_write_failed()
             return jsonify({'error': f'Database connection failed to shard for region {region}'}), 500
         
-        cursor = conn.cursor()
-        
         # Use stored procedures for all transaction types (handle balance updates automatically)
         # Procedures now use account_number (globally unique) instead of account_id
+        # The procedures commit themselves: no separate commit round trip (see utils.db.call_procedure)
         try:
-            if transaction_type == 'TRANSFER' and from_account_number and to_account_number:
+            if (transaction_type == 'TRANSFER' and mode == 'async'
+                    and from_account_info['region'] != to_account_info['region']):
+                print(f"Calling transfer_money_async procedure: from={from_account_number}, to={to_account_number}, amount={amount}")
+                transfer_id = transfer_money_async(
+                    conn,
+                    from_account_number,
+                    to_account_number,
+                    to_account_info['region'],
+                    amount,
+                    data.get('description', '')
+                )
+                conn.close()
+                bump_write_generation()
+                return jsonify({
+                    'success': True,
+                    'message': 'Transfer accepted; the credit is applied asynchronously',
+                    'transfer_id': transfer_id,
+                    'status': 'PENDING',
+                    'status_url': f"/api/transfers/{transfer_id}?region={region}"
+                }), 202
+            elif transaction_type == 'TRANSFER' and from_account_number and to_account_number:
                 print(f"Calling transfer_money procedure: from={from_account_number}, to={to_account_number}, amount={amount}")
-                cursor.callproc('transfer_money', [
+                call_procedure(conn, 'transfer_money', [
                     from_account_number,
                     to_account_number,
                     amount,
                     data.get('description', '')
                 ])
-                conn.commit()
-                cursor.close()
                 conn.close()
+                bump_write_generation()
                 return jsonify({'success': True, 'message': 'Transfer completed successfully'})
             elif transaction_type == 'DEPOSIT' and to_account_number:
                 print(f"Calling deposit_money procedure: to={to_account_number}, amount={amount}")
-                cursor.callproc('deposit_money', [
+                call_procedure(conn, 'deposit_money', [
                     to_account_number,
                     amount,
                     data.get('description', '')
                 ])
-                conn.commit()
-                cursor.close()
                 conn.close()
+                bump_write_generation()
                 return jsonify({'success': True, 'message': 'Deposit completed successfully'})
             elif transaction_type == 'WITHDRAWAL' and from_account_number:
                 print(f"Calling withdraw_money procedure: from={from_account_number}, amount={amount}")
-                cursor.callproc('withdraw_money', [
+                call_procedure(conn, 'withdraw_money', [
                     from_account_number,
                     amount,
                     data.get('description', '')
                 ])
-                conn.commit()
-                cursor.close()
                 conn.close()
+                bump_write_generation()
                 return jsonify({'success': True, 'message': 'Withdrawal completed successfully'})
             else:
                 # Fallback for other transaction types or invalid combinations
+                conn.autocommit = True  # commit with the insert (one round trip)
+                cursor = conn.cursor()
                 cursor.execute("""
                     INSERT INTO transactions (from_account_number, to_account_number, transaction_type, amount, status, description)
                     VALUES (:from_account_number, :to_account_number, :transaction_type, :amount, :status, :description)
@@ -324,24 +402,31 @@ def insert_transaction():
                     'status': data.get('status', 'COMPLETED'),
                     'description': data.get('description', '')
                 })
-                conn.commit()
                 cursor.close()
                 conn.close()
+                bump_write_generation()
                 return jsonify({'success': True, 'message': 'Transaction inserted successfully'})
         except Exception as proc_error:
-            conn.rollback()
             print(f"Transaction procedure error: {proc_error}")
+            mark_write_failed(proc_error)
             error_msg = str(proc_error)
             # Extract error message if it's an Oracle error
             if hasattr(proc_error, 'args') and proc_error.args:
                 error_msg = str(proc_error.args[0])
-            cursor.close()
-            conn.close()
+            if conn:
+                try:
+                    conn.rollback()
+                    conn.close()
+                except:
+                    pass
             return jsonify({'error': f'Transaction failed: {error_msg}'}), 500
+    except AdmissionRejected:
+        raise  # Answered with 429 by the admission error handler
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
         print(f"Error in insert_transaction: {error_details}")
+        mark_write_failed(e)
         if conn:
             try:
                 conn.rollback()
@@ -350,7 +435,129 @@ def insert_transaction():
                 pass
         return jsonify({'error': str(e), 'details': error_details}), 500
 
+@app.route('/api/transfers/<transfer_id>', methods=['GET'])
+def get_transfer(transfer_id):
+    """Get the status of an async transfer (optional ?region= of the source account)"""
+    try:
+        region = request.args.get('region')
+        if region and region.upper() not in ('NA', 'EU', 'APAC'):
+            return jsonify({'error': f'Invalid region: {region}'}), 400
+        transfer = get_transfer_status(transfer_id, region=region)
+        if not transfer:
+            return jsonify({'error': f'Transfer {transfer_id} not found'}), 404
+        return jsonify(transfer)
+    except Exception as e:
+        import traceback
+        print(f"Error in get_transfer: {traceback.format_exc()}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/metrics/outbox', methods=['GET'])
+def get_outbox_metrics():
+    """Get async transfer relay lag and throughput per shard"""
+    try:
+        return jsonify(get_outbox_stats())
+    except Exception as e:
+        import traceback
+        print(f"Error in get_outbox_metrics: {traceback.format_exc()}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/metrics/admission', methods=['GET'])
+def get_admission_metrics():
+    """Get per-shard write admission metrics (limit, queue depth, wait time, rejects)"""
+    return jsonify(get_admission_stats())
+
+@app.route('/api/metrics/waits', methods=['GET'])
+def get_wait_metrics():
+    """Get DB time per database by wait category, procedure and event (recent window)"""
+    try:
+        return jsonify(get_wait_stats())
+    except Exception as e:
+        import traceback
+        print(f"Error in get_wait_metrics: {traceback.format_exc()}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/shard-health', methods=['GET'])
+@require_admin
+def get_shard_health():
+    """Get wait telemetry with top SQL (statement text) and current lock holders per database"""
+    try:
+        return jsonify(get_wait_stats(detail=True))
+    except Exception as e:
+        import traceback
+        print(f"Error in get_shard_health: {traceback.format_exc()}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/profile', methods=['POST'])
+@require_admin
+def start_profiling():
+    """
+    Start the sampling profiler and return 202 with the profile_id to poll
+    Body: {"hz": 100, "seconds": 10} profiles all requests for N seconds;
+          {"hz": 200, "route": "/api/stats/regional", "requests": 20} profiles the next N requests
+          to a route (path or Flask rule)
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        session = start_profile(
+            app,
+            hz=_profile_number(data, 'hz', int, 100),
+            route=data.get('route'),
+            seconds=_profile_number(data, 'seconds', float),
+            requests=_profile_number(data, 'requests', int)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+    # The session runs in the background: don't hold a request thread for its duration
+    return jsonify({
+        'profile_id': session.id,
+        'status': session.status,
+        'status_url': f"/api/admin/profile/{session.id}"
+    }), 202
+
+def _profile_number(data, key, cast, default=None):
+    """Numeric profiler parameter from the request body (ValueError -> 400)"""
+    value = data.get(key)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f'{key} must be a number')
+    try:
+        return cast(value)
+    except ValueError:
+        raise ValueError(f'{key} must be a number') from None
+
+@app.route('/api/admin/profile/<profile_id>', methods=['GET'])
+@require_admin
+def get_profiling_result(profile_id):
+    """
+    Get a profile (status 'running' until its time is up or the requested number of requests
+    was profiled); ?format=collapsed returns the collapsed stacks as text (flamegraph.pl input)
+    """
+    session = get_profile(profile_id)
+    if not session:
+        return jsonify({'error': f'Profile {profile_id} not found'}), 404
+    return _profile_response(session)
+
+@app.route('/api/admin/profile/<profile_id>', methods=['DELETE'])
+@require_admin
+def stop_profiling(profile_id):
+    """Stop a running profile early and return its result (same formats as GET)"""
+    session = get_profile(profile_id)
+    if not session:
+        return jsonify({'error': f'Profile {profile_id} not found'}), 404
+    session.stop()
+    return _profile_response(session)
+
+def _profile_response(session):
+    if request.args.get('format') == 'collapsed':
+        return app.response_class(session.collapsed(), mimetype='text/plain')
+    return jsonify(session.report())
+
 @app.route('/api/users', methods=['GET'])
+@conditional_json
 def get_users():
     """Get all users for dropdown"""
     conn = get_db_connection()
@@ -380,6 +587,7 @@ def get_users():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/accounts', methods=['GET'])
+@conditional_json
 def get_accounts():
     """Get all accounts for dropdown or list"""
     conn = get_db_connection()
@@ -418,6 +626,7 @@ def get_accounts():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/users/list', methods=['GET'])
+@conditional_json
 def get_users_list():
     """Get all users with full details for list view"""
     conn = get_db_connection()
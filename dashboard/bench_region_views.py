@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Regional View Timing Comparison
+Times the catalog's regional statistics before and after denormalising region onto
+transactions:
+
+- before: transactions_all joined to accounts_all with an OR condition (all
+          transaction rows are pulled over the database links and joined in the catalog)
+- after:  transaction_region_stats, grouped by transactions.region on each shard
+          (one row per shard and region crosses the links)
+
+Load volume first with sql/sharding/23-load-timing-transactions.sql (1M rows per shard).
+
+Usage:
+    python3 bench_region_views.py
+    python3 bench_region_views.py --repeat 5
+"""
+
+import argparse
+import json
+import statistics
+import time
+from utils.db import get_db_connection
+
+# dashboard_regional_stats / regional_stats / dashboard_overall_stats as defined before
+# transactions.region existed (08 and 11 prior to 22-add-transaction-region.sql)
+BEFORE_QUERIES = {
+    'dashboard_regional_stats': """
+        WITH user_account_stats AS (
+            SELECT
+                COALESCE(a.region, u.region) AS region,
+                COUNT(DISTINCT u.user_id) AS total_users,
+                COUNT(DISTINCT a.account_number) AS total_accounts,
+                COALESCE(SUM(a.balance), 0) AS total_balance,
+                ROUND(AVG(a.balance), 2) AS avg_balance_per_account
+            FROM users_all u
+            LEFT JOIN accounts_all a ON u.user_id = a.user_id AND u.shard_location = a.shard_location
+            GROUP BY COALESCE(a.region, u.region)
+        ),
+        transaction_stats AS (
+            SELECT
+                acc.region,
+                COUNT(*) AS total_transactions,
+                COUNT(CASE WHEN t.transaction_type = 'DEPOSIT' THEN 1 END) AS deposits,
+                COUNT(CASE WHEN t.transaction_type = 'WITHDRAWAL' THEN 1 END) AS withdrawals,
+                COUNT(CASE WHEN t.transaction_type = 'TRANSFER' THEN 1 END) AS transfers,
+                COALESCE(SUM(CASE WHEN t.transaction_type = 'DEPOSIT' THEN t.amount ELSE 0 END), 0) AS total_deposits,
+                COALESCE(SUM(CASE WHEN t.transaction_type = 'WITHDRAWAL' THEN t.amount ELSE 0 END), 0) AS total_withdrawals,
+                COALESCE(SUM(CASE WHEN t.transaction_type = 'TRANSFER' THEN t.amount ELSE 0 END), 0) AS total_transfers
+            FROM transactions_all t
+            JOIN accounts_all acc ON (
+                (t.from_account_number IS NOT NULL AND t.from_account_number = acc.account_number AND t.shard_location = acc.shard_location)
+                OR
+                (t.from_account_number IS NULL AND t.to_account_number IS NOT NULL AND t.to_account_number = acc.account_number AND t.shard_location = acc.shard_location)
+            )
+            GROUP BY acc.region
+        )
+        SELECT
+            COALESCE(uas.region, ts.region) AS region,
+            COALESCE(uas.total_users, 0) AS total_users,
+            COALESCE(uas.total_accounts, 0) AS total_accounts,
+            COALESCE(ts.total_transactions, 0) AS total_transactions,
+            COALESCE(uas.total_balance, 0) AS total_balance,
+            COALESCE(uas.avg_balance_per_account, 0) AS avg_balance_per_account,
+            COALESCE(ts.deposits, 0) AS deposits,
+            COALESCE(ts.withdrawals, 0) AS withdrawals,
+            COALESCE(ts.transfers, 0) AS transfers,
+            COALESCE(ts.total_deposits, 0) AS total_deposits,
+            COALESCE(ts.total_withdrawals, 0) AS total_withdrawals,
+            COALESCE(ts.total_transfers, 0) AS total_transfers
+        FROM user_account_stats uas
+        FULL OUTER JOIN transaction_stats ts ON uas.region = ts.region
+        ORDER BY COALESCE(uas.region, ts.region)
+    """,
+    'regional_stats': """
+        SELECT
+            a.region,
+            COUNT(DISTINCT u.user_id) AS user_count,
+            COUNT(DISTINCT a.account_number) AS account_count,
+            COUNT(*) AS transaction_count,
+            SUM(a.balance) AS total_balance,
+            ROUND(AVG(a.balance), 2) AS avg_balance,
+            MIN(a.balance) AS min_balance,
+            MAX(a.balance) AS max_balance
+        FROM accounts_all a
+        LEFT JOIN users_all u ON a.user_id = u.user_id AND a.shard_location = u.shard_location
+        LEFT JOIN transactions_all t
+          ON (a.account_number = t.from_account_number AND a.shard_location = t.shard_location)
+          OR (a.account_number = t.to_account_number AND a.shard_location = t.shard_location)
+        GROUP BY a.region
+        ORDER BY a.region
+    """,
+    'dashboard_overall_stats': """
+        SELECT
+            COUNT(*) AS total_transactions,
+            COUNT(CASE WHEN t.status = 'COMPLETED' THEN 1 END) AS completed_transactions,
+            COUNT(CASE WHEN t.status = 'PENDING' THEN 1 END) AS pending_transactions,
+            COUNT(CASE WHEN t.status = 'FAILED' THEN 1 END) AS failed_transactions,
+            COALESCE(SUM(CASE WHEN t.transaction_type = 'DEPOSIT' THEN t.amount ELSE 0 END), 0) AS total_deposits,
+            COALESCE(SUM(CASE WHEN t.transaction_type = 'WITHDRAWAL' THEN t.amount ELSE 0 END), 0) AS total_withdrawals,
+            COALESCE(SUM(CASE WHEN t.transaction_type = 'TRANSFER' THEN t.amount ELSE 0 END), 0) AS total_transfers
+        FROM transactions_all t
+    """
+}
+
+AFTER_QUERIES = {
+    'dashboard_regional_stats': "SELECT * FROM dashboard_regional_stats ORDER BY region",
+    'regional_stats': "SELECT * FROM regional_stats ORDER BY region",
+    'dashboard_overall_stats': """
+        SELECT total_transactions, completed_transactions, pending_transactions, failed_transactions,
+               total_deposits, total_withdrawals, total_transfers
+        FROM dashboard_overall_stats
+    """
+}
+
+def shard_volumes(cursor):
+    """Transactions per shard (and how many still lack a region)"""
+    cursor.execute("""
+        SELECT shard_location,
+               SUM(total_transactions),
+               SUM(CASE WHEN region IS NULL THEN total_transactions ELSE 0 END)
+        FROM transaction_region_stats
+        GROUP BY shard_location
+        ORDER BY shard_location
+    """)
+    return {row[0]: {'transactions': int(row[1]), 'without_region': int(row[2])} for row in cursor}
+
+def time_query(cursor, sql, repeat):
+    """Run a query `repeat` times (all rows fetched); returns (timings in seconds, last rows)"""
+    timings = []
+    rows = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        timings.append(time.perf_counter() - started)
+    return timings, rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the regional statistics views before and after transactions.region')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per query (after one warm-up run)')
+    parser.add_argument('--query', choices=sorted(BEFORE_QUERIES), action='append',
+                        help='Query to compare (default: all)')
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit('Database connection failed')
+    try:
+        cursor = conn.cursor()
+        cursor.arraysize = 1000
+        volumes = shard_volumes(cursor)
+        print(f"Transactions per shard: {json.dumps(volumes)}")
+        if any(v['without_region'] for v in volumes.values()):
+            print("Some transactions have no region yet: run sql/sharding/22-add-transaction-region.sql on the shards")
+
+        reports = []
+        for name in args.query or sorted(BEFORE_QUERIES):
+            report = {'query': name}
+            results = {}
+            for path, queries in (('before', BEFORE_QUERIES), ('after', AFTER_QUERIES)):
+                time_query(cursor, queries[name], 1)  # warm-up (parse, link sessions)
+                timings, rows = time_query(cursor, queries[name], args.repeat)
+                results[path] = rows
+                report[path] = {
+                    'min_ms': round(min(timings) * 1000, 1),
+                    'median_ms': round(statistics.median(timings) * 1000, 1)
+                }
+            report['speedup'] = round(report['before']['median_ms'] / max(report['after']['median_ms'], 0.1), 1)
+            # The old regional_stats counted one row per account without transactions
+            # and summed balances once per transaction, so its results are expected to differ
+            report['same_results'] = results['before'] == results['after']
+            reports.append(report)
+        cursor.close()
+    finally:
+        conn.close()
+
+    print(json.dumps(reports, indent=2))
+    print("\nquery                      before ms  after ms  speedup  same results")
+    for r in reports:
+        print(f"{r['query']:<26} {r['before']['median_ms']:<10} {r['after']['median_ms']:<9} "
+              f"{r['speedup']:<8} {r['same_results']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Write Path Round-Trip Benchmark
+Compares the transaction write path before and after the round-trip changes:
+
+- before: one catalog connection per account lookup, then callproc + explicit commit
+- after:  one catalog query for all accounts, then callproc with the commit made
+          by the procedure (autocommit, no separate commit call)
+
+Round trips of the shard write are read from the session's own statistics
+(V$MYSTAT 'SQL*Net roundtrips to/from client', needs SELECT on v_$mystat and
+v_$statname), net of the round trips of the statistics query itself.
+Connections opened per request are counted too: each one costs a handshake.
+
+All database traffic goes through local TCP proxies that add latency to every
+network hop (--rtt-ms), so the timings reflect a remote database link.
+
+Usage:
+    python3 bench_write_path.py --rtt-ms 20 --requests 50
+    python3 bench_write_path.py --operation transfer --rtt-ms 50
+"""
+
+import argparse
+import json
+import socket
+import statistics
+import threading
+import time
+from utils import db
+from utils.db import get_account_info_by_number, get_accounts_info_by_numbers, call_procedure
+
+ROUND_TRIPS_SQL = """
+    SELECT m.value
+    FROM v$mystat m
+    JOIN v$statname n ON n.statistic# = m.statistic#
+    WHERE n.name = 'SQL*Net roundtrips to/from client'
+"""
+
+class LatencyProxy:
+    """TCP proxy adding rtt/2 per direction"""
+
+    def __init__(self, target, rtt_ms):
+        self.target = target
+        self.delay = rtt_ms / 2000.0
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(64)
+        self.address = self.server.getsockname()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            client, _ = self.server.accept()
+            upstream = socket.create_connection(self.target)
+            for s in (client, upstream):
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._pump, args=(client, upstream), daemon=True).start()
+            threading.Thread(target=self._pump, args=(upstream, client), daemon=True).start()
+
+    def _pump(self, source, destination):
+        try:
+            while True:
+                data = source.recv(65536)
+                if not data:
+                    break
+                if self.delay:
+                    time.sleep(self.delay)
+                destination.sendall(data)
+        except OSError:
+            pass
+        finally:
+            for s in (source, destination):
+                try:
+                    s.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+def install_proxies(rtt_ms):
+    """Route catalog and shard connections through latency proxies"""
+    original = db.get_db_address
+    proxies = {region: LatencyProxy(original(region), rtt_ms) for region in [None] + db.SHARD_REGIONS}
+    db.get_db_address = lambda shard_region=None: proxies[shard_region.upper() if shard_region else None].address
+    return proxies
+
+def count_connections():
+    """Count connections opened through utils.db (catalog lookups included)"""
+    counts = {'catalog': 0, 'shard': 0}
+    original = db.get_db_connection
+
+    def counted(shard_region=None):
+        counts['shard' if shard_region else 'catalog'] += 1
+        return original(shard_region=shard_region)
+
+    db.get_db_connection = counted
+    return counts
+
+def session_round_trips(conn):
+    """Round trips made so far by this session (as counted by the server)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(ROUND_TRIPS_SQL)
+        return int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+def lookup_before(from_account, to_account):
+    """Account lookups as they were: one catalog connection per account"""
+    from_info = get_account_info_by_number(from_account) if from_account else None
+    to_info = get_account_info_by_number(to_account) if to_account else None
+    return (from_info or to_info)['region']
+
+def lookup_after(from_account, to_account):
+    """Both accounts resolved with one catalog query"""
+    accounts = get_accounts_info_by_numbers([from_account, to_account])
+    return accounts[from_account or to_account]['region']
+
+def write_before(conn, operation, from_account, to_account, amount):
+    """Write as it was: callproc, then an explicit commit"""
+    cursor = conn.cursor()
+    if operation == 'transfer':
+        cursor.callproc('transfer_money', [from_account, to_account, amount, 'bench'])
+    else:
+        cursor.callproc('deposit_money', [to_account, amount, 'bench'])
+    conn.commit()
+    cursor.close()
+
+def write_after(conn, operation, from_account, to_account, amount):
+    """Write through call_procedure: the procedure commits, no commit call"""
+    if operation == 'transfer':
+        call_procedure(conn, 'transfer_money', [from_account, to_account, amount, 'bench'])
+    else:
+        call_procedure(conn, 'deposit_money', [to_account, amount, 'bench'])
+
+def pick_accounts(operation):
+    conn = db.get_db_connection()
+    if not conn:
+        raise RuntimeError('Database connection failed')
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT account_number, shard_location
+            FROM accounts_all
+            WHERE status = 'ACTIVE'
+            ORDER BY balance DESC
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    if not rows:
+        raise RuntimeError('No ACTIVE accounts found')
+    if operation == 'deposit':
+        return None, rows[0][0]
+    # Cross-shard pair: the richest account and the first account on another shard
+    for account_number, location in rows[1:]:
+        if location != rows[0][1]:
+            return rows[0][0], account_number
+    raise RuntimeError('Need ACTIVE accounts on at least two shards')
+
+def run_path(name, lookup, write, connections, args, from_account, to_account):
+    latencies = []
+    write_trips = []
+    opened = dict(connections)
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        region = lookup(from_account, to_account)
+        conn = db.get_db_connection(shard_region=region)
+        if not conn:
+            raise RuntimeError(f'Database connection failed to shard for region {region}')
+        elapsed = time.perf_counter() - started
+        try:
+            # Two reads in a row give the statistics query's own round trips
+            first = session_round_trips(conn)
+            overhead = session_round_trips(conn) - first
+            before = first + overhead
+            started = time.perf_counter()
+            write(conn, args.operation, from_account, to_account, args.amount)
+            elapsed += time.perf_counter() - started
+            write_trips.append(session_round_trips(conn) - before - overhead)
+        finally:
+            conn.close()
+        latencies.append(elapsed)
+    latencies.sort()
+    return {
+        'path': name,
+        'requests': args.requests,
+        'write_round_trips': round(statistics.mean(write_trips), 1),
+        'catalog_connections': round((connections['catalog'] - opened['catalog']) / args.requests, 1),
+        'shard_connections': round((connections['shard'] - opened['shard']) / args.requests, 1),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 2),
+            'p50': round(latencies[len(latencies) // 2] * 1000, 2),
+            'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2)
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Round trips and latency of the transaction write path')
+    parser.add_argument('--operation', choices=['deposit', 'transfer'], default='deposit')
+    parser.add_argument('--requests', type=int, default=20, help='Requests per path')
+    parser.add_argument('--rtt-ms', type=float, default=20.0, help='Latency added to every network round trip')
+    parser.add_argument('--amount', type=float, default=0.01)
+    args = parser.parse_args()
+
+    from_account, to_account = pick_accounts(args.operation)
+    install_proxies(args.rtt_ms)
+    connections = count_connections()
+    print(f"{args.operation}: from={from_account} to={to_account}, added RTT {args.rtt_ms} ms")
+
+    reports = [
+        run_path('before', lookup_before, write_before, connections, args, from_account, to_account),
+        run_path('after', lookup_after, write_after, connections, args, from_account, to_account)
+    ]
+    print(json.dumps(reports, indent=2))
+    print("\npath    write round trips  connections (catalog/shard)  mean ms   p50 ms   p95 ms")
+    for r in reports:
+        print(f"{r['path']:<7} {r['write_round_trips']:<18} "
+              f"{r['catalog_connections']}/{r['shard_connections']}{'':<24} "
+              f"{r['latency_ms']['mean']:<9} {r['latency_ms']['p50']:<8} {r['latency_ms']['p95']}")
+
+if __name__ == '__main__':
+    main()
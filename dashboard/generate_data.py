@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data Generator
+Loads users, accounts and transactions into every shard in parallel
+(region user_id ranges, co-located accounts, array DML with large commit batches)
+
+Usage:
+    python3 generate_data.py --users 100000 --transactions 1000000
+    python3 generate_data.py --users 1000000 --transactions 10000000 --load-mode direct
+    python3 generate_data.py --regions EU --users 50000 --skew 1.2 --history-days 730 --seed 42
+
+The no-triggers and direct load modes disable triggers (and, for direct, foreign keys)
+on the shard tables while they run: use them on quiet test deployments only.
+"""
+
+import argparse
+import json
+import time
+from utils.datagen import generate_data, LOAD_MODES
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate high-volume synthetic data on every shard in parallel')
+    parser.add_argument('--users', type=int, default=10000, help='Users per shard')
+    parser.add_argument('--accounts-per-user', type=int, default=3, help='Accounts per user (uniform between 1 and this)')
+    parser.add_argument('--transactions', type=int, default=100000, help='Transactions per shard')
+    parser.add_argument('--regions', nargs='+', help='Shard regions to load: NA EU APAC (default: all)')
+    parser.add_argument('--load-mode', choices=LOAD_MODES, default='conventional',
+                        help='conventional (triggers fire), no-triggers, or direct (direct-path, foreign keys off)')
+    parser.add_argument('--batch-size', type=int, default=10000, help='Rows per array insert')
+    parser.add_argument('--commit-every', type=int, default=100000, help='Rows per commit (direct mode commits every batch)')
+    parser.add_argument('--skew', type=float, default=1.0, help='Zipf exponent of transactions per account (0 = uniform)')
+    parser.add_argument('--history-days', type=float, default=365, help='Spread transaction dates over this many past days')
+    parser.add_argument('--seed', type=int, help='Random seed for a reproducible dataset')
+    parser.add_argument('--no-stats', action='store_true', help='Skip gathering optimizer statistics after the load')
+    args = parser.parse_args()
+
+    if args.load_mode != 'conventional':
+        print(f"Load mode {args.load_mode}: triggers{' and foreign keys' if args.load_mode == 'direct' else ''} "
+              f"are disabled on the shard tables until the load ends")
+
+    started = time.perf_counter()
+    results = generate_data(
+        users=args.users,
+        accounts_per_user=args.accounts_per_user,
+        transactions=args.transactions,
+        regions=args.regions,
+        load_mode=args.load_mode,
+        batch_size=args.batch_size,
+        commit_every=args.commit_every,
+        skew=args.skew,
+        history_days=args.history_days,
+        seed=args.seed,
+        gather_stats=not args.no_stats
+    )
+    elapsed = time.perf_counter() - started
+    print(json.dumps(results, indent=2))
+
+    print("\nregion  table         rows        seconds   rows/s")
+    for region, tables in results.items():
+        for table in ('users', 'accounts', 'transactions', 'balances'):
+            r = tables[table]
+            print(f"{region:<7} {table:<13} {r['rows']:<11} {r['seconds']:<9} {r['rows_per_second']}")
+    total_rows = sum(tables['total']['rows'] for tables in results.values())
+    print(f"\nInserted {total_rows} rows in {elapsed:.2f}s ({total_rows / elapsed:.1f} rows/s across all shards)")
+
+if __name__ == '__main__':
+    main()
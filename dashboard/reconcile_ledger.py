@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Global Ledger Reconciliation
+Incrementally checks that account balances match transaction history across all shards
+(per-shard parallel scan from a transaction_id checkpoint, running per-account totals)
+
+Usage:
+    python3 reconcile_ledger.py --state ../reconcile_state.json
+    python3 reconcile_ledger.py --state ../reconcile_state.json --full-check
+    python3 reconcile_ledger.py --state ../reconcile_state.json --interval 300
+
+Exit code is 1 when mismatched accounts are found (single run mode)
+"""
+
+import argparse
+import json
+import sys
+import time
+from utils.reconcile import reconcile_ledger, DEFAULT_SETTLE_SECONDS, DEFAULT_GAP_RETENTION_SECONDS
+
+def run_once(args):
+    report = reconcile_ledger(
+        args.state,
+        regions=args.regions,
+        settle_seconds=args.settle_seconds,
+        full_check=args.full_check,
+        gap_retention_seconds=args.gap_retention_seconds
+    )
+    print(json.dumps(report, indent=2, default=str))
+    print(f"Processed {report['rows_processed']} transactions in {report['seconds']}s "
+          f"({report['rows_per_second']} rows/s), {len(report['mismatches'])} mismatched accounts, "
+          f"{len(report['unsettled'])} unsettled", file=sys.stderr)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental cross-shard ledger reconciliation')
+    parser.add_argument('--state', required=True, help='Checkpoint / running totals state file')
+    parser.add_argument('--regions', nargs='+', help='Shard regions to process: NA EU APAC (default: all)')
+    parser.add_argument('--settle-seconds', type=int, default=DEFAULT_SETTLE_SECONDS,
+                        help='Ignore rows newer than this and report recently changed accounts as unsettled')
+    parser.add_argument('--gap-retention-seconds', type=int, default=DEFAULT_GAP_RETENTION_SECONDS,
+                        help='Keep re-scanning transaction_ids missing below the checkpoint for this long')
+    parser.add_argument('--full-check', action='store_true', help='Compare every account balance, not only changed ones')
+    parser.add_argument('--interval', type=int, help='Run continuously every N seconds')
+    args = parser.parse_args()
+
+    try:
+        report = run_once(args)
+    except ValueError as e:
+        parser.error(str(e))
+    if not args.interval:
+        sys.exit(1 if report['mismatches'] else 0)
+
+    while True:
+        time.sleep(args.interval)
+        run_once(args)
+
+if __name__ == '__main__':
+    main()
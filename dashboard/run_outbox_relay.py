@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Transfer Outbox Relay
+Applies queued cross-shard transfer credits (async transfer mode) in batches per
+destination shard. Safe to run several instances (rows are claimed with SKIP LOCKED)
+
+Usage:
+    python3 run_outbox_relay.py
+    python3 run_outbox_relay.py --batch-size 1000 --poll-interval 0.2
+    python3 run_outbox_relay.py --once
+"""
+
+import argparse
+import json
+from utils.transfers import OutboxRelay
+
+def main():
+    parser = argparse.ArgumentParser(description='Relay async cross-shard transfers from the outbox')
+    parser.add_argument('--batch-size', type=int, default=500, help='Outbox rows claimed per source shard per cycle')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='Sleep (seconds) when the outbox is empty')
+    parser.add_argument('--regions', nargs='+', help='Source shard regions to relay: NA EU APAC (default: all)')
+    parser.add_argument('--once', action='store_true', help='Run a single cycle and exit')
+    args = parser.parse_args()
+
+    relay = OutboxRelay(batch_size=args.batch_size, regions=args.regions)
+    if args.once:
+        try:
+            print(json.dumps(relay.run_once(), indent=2))
+        finally:
+            relay.close()
+        return
+
+    print(f"Outbox relay started (batch size {args.batch_size})")
+    relay.run_forever(poll_interval=args.poll_interval)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Offline Shard Analytics
+Computes the dashboard_* statistics from an extracted Parquet / Arrow dataset
+(written by extract_shards.py) instead of querying the catalog union views
+
+Usage:
+    python3 shard_analytics.py --input ../extract
+    python3 shard_analytics.py --input ../extract --report regional
+"""
+
+import argparse
+import json
+from utils.analytics import (
+    load_dataset, regional_stats, overall_stats, accounts_by_region, transactions_by_date
+)
+
+REPORTS = {
+    'overall': overall_stats,
+    'regional': regional_stats,
+    'accounts-by-region': accounts_by_region,
+    'transactions-by-date': transactions_by_date
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Compute dashboard statistics from an extracted dataset')
+    parser.add_argument('--input', required=True, help='Dataset root directory')
+    parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet', help='Dataset file format')
+    parser.add_argument('--report', nargs='+', choices=list(REPORTS), help='Reports to compute (default: all)')
+    args = parser.parse_args()
+
+    data = load_dataset(args.input, args.format)
+    results = {name: REPORTS[name](data) for name in (args.report or REPORTS)}
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Unit tests for the dashboard utilities (no database needed)
+The dashboard modules import `utils` from the dashboard directory, as app.py does
+
+FakeConnection stands in for a python-oracledb connection; tests import it with
+`from conftest import FakeConnection` (AsyncFakeConnection for AsyncConnection).
+"""
+
+import itertools
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class FakeCursor:
+    """Cursor of a FakeConnection: records statements, answers them from the connection's rows"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.arraysize = 100
+        self.prefetchrows = 2
+        self.closed = False
+        self.rows = iter(())
+
+    def execute(self, sql, parameters=None, **kwargs):
+        parameters = parameters if parameters is not None else (kwargs or None)
+        self.connection.executed.append((sql, parameters))
+        self.connection.check(sql)
+        self.rows = iter(self.connection.rows_for(sql, parameters))
+
+    def callproc(self, name, parameters=None):
+        self.connection.check(name)
+        self.connection.calls.append(('callproc', name, parameters, self.connection.autocommit))
+
+    def fetchone(self):
+        return next(self.rows, None)
+
+    def fetchmany(self, size=None):
+        return list(itertools.islice(self.rows, size or self.arraysize))
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def __iter__(self):
+        return self.rows
+
+    def close(self):
+        self.closed = True
+
+class FakeConnection:
+    """
+    Stand-in for an oracledb connection
+
+    Args:
+        rows (dict): SQL substring -> rows of the first matching statement. Rows may be a
+            callable (sql, parameters, connection) returning an iterable; it is consumed
+            lazily by the fetches, so a generator sees which rows were actually fetched
+        fail_on (iterable): SQL substrings / procedure names whose execution raises error
+        error (Exception): Raised for fail_on (default: an ORA-20001 RuntimeError)
+    """
+
+    cursor_class = FakeCursor
+
+    def __init__(self, rows=None, fail_on=(), error=None):
+        self.rows = rows or {}
+        self.fail_on = list(fail_on)
+        self.error = error or RuntimeError('ORA-20001: Simulated failure')
+        self.autocommit = False
+        self.call_timeout = 0
+        self.executed = []  # (sql, parameters)
+        self.calls = []  # ('callproc', name, parameters, autocommit), ('commit',), ('rollback',)
+        self.cursors = []
+        self.closed = False
+
+    def check(self, text):
+        if any(fail in text for fail in self.fail_on):
+            raise self.error
+
+    def rows_for(self, sql, parameters):
+        for pattern, rows in self.rows.items():
+            if pattern in sql:
+                return rows(sql, parameters, self) if callable(rows) else rows
+        return ()
+
+    @property
+    def statements(self):
+        """Executed SQL with whitespace collapsed"""
+        return [' '.join(sql.split()) for sql, _ in self.executed]
+
+    def gettype(self, name):
+        # Collections are bound as plain lists
+        return SimpleNamespace(name=name, newobject=list)
+
+    def cursor(self):
+        cursor = self.cursor_class(self)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.calls.append(('commit',))
+
+    def rollback(self):
+        self.calls.append(('rollback',))
+
+    def close(self):
+        self.closed = True
+
+class AsyncFakeCursor(FakeCursor):
+    """FakeCursor with the coroutine methods of an oracledb AsyncCursor"""
+
+    async def execute(self, sql, parameters=None, **kwargs):
+        FakeCursor.execute(self, sql, parameters, **kwargs)
+
+    async def fetchone(self):
+        return FakeCursor.fetchone(self)
+
+    async def fetchmany(self, size=None):
+        return FakeCursor.fetchmany(self, size)
+
+    async def fetchall(self):
+        return FakeCursor.fetchall(self)
+
+class AsyncFakeConnection(FakeConnection):
+    cursor_class = AsyncFakeCursor
@@ -0,0 +1,169 @@
+"""Write admission control: adaptive limits, queueing and failure reporting"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, jsonify
+
+from utils import admission
+from utils.admission import (
+    ShardLimiter, AdmissionRejected, admit_write, mark_write_failed, is_overload_error, init_admission
+)
+from utils.db import oracledb
+
+def ora_error(code, full_code=None):
+    return oracledb.DatabaseError(SimpleNamespace(code=code, full_code=full_code or f'ORA-{code:05d}'))
+
+def saturated_release(limiter, latency, failed=False):
+    """Release one slot while the limit is fully in use"""
+    limiter.in_flight = int(limiter.limit)
+    limiter.release(latency, failed=failed)
+
+def test_aimd_grows_additively_when_fast_and_saturated():
+    limiter = ShardLimiter('NA', mode='aimd', limit=8, latency_target_ms=250)
+    saturated_release(limiter, 0.05)
+    assert limiter.limit == pytest.approx(8.125)
+
+def test_aimd_does_not_grow_when_idle():
+    limiter = ShardLimiter('NA', mode='aimd', limit=8)
+    limiter.in_flight = 1
+    limiter.release(0.05)
+    assert limiter.limit == 8
+
+def test_aimd_backs_off_once_per_latency_window():
+    limiter = ShardLimiter('NA', mode='aimd', limit=10, latency_target_ms=250)
+    saturated_release(limiter, 1.0)
+    assert limiter.limit == pytest.approx(9.0)
+    # The rest of the same burst must not collapse the limit
+    saturated_release(limiter, 1.0)
+    saturated_release(limiter, 1.0)
+    assert limiter.limit == pytest.approx(9.0)
+
+def test_aimd_backs_off_on_failure_even_when_fast():
+    limiter = ShardLimiter('NA', mode='aimd', limit=10, latency_target_ms=250)
+    saturated_release(limiter, 0.01, failed=True)
+    assert limiter.limit == pytest.approx(9.0)
+    assert limiter.snapshot()['failed'] == 1
+
+def test_limit_stays_within_bounds():
+    limiter = ShardLimiter('NA', mode='aimd', limit=1, min_limit=1, max_limit=2)
+    saturated_release(limiter, 1.0, failed=True)
+    assert limiter.limit == 1
+    limiter = ShardLimiter('NA', mode='aimd', limit=2, min_limit=1, max_limit=2)
+    saturated_release(limiter, 0.01)
+    assert limiter.limit == 2
+
+def test_gradient_shrinks_when_latency_rises():
+    limiter = ShardLimiter('NA', mode='gradient', limit=16, max_limit=64)
+    saturated_release(limiter, 0.01)
+    grown = limiter.limit
+    assert grown > 16
+    for _ in range(20):
+        saturated_release(limiter, 0.2)
+    assert limiter.limit < grown
+
+def test_gradient_halves_on_failure():
+    limiter = ShardLimiter('NA', mode='gradient', limit=16)
+    saturated_release(limiter, 0.01, failed=True)
+    assert limiter.limit == pytest.approx(0.8 * 16 + 0.2 * (16 * 0.5 + 4))
+
+def test_gradient_survives_zero_latency():
+    limiter = ShardLimiter('NA', mode='gradient', limit=8)
+    saturated_release(limiter, 0.0)
+    saturated_release(limiter, 0.0)
+    assert limiter.limit >= 8
+
+def test_fixed_limit_never_changes():
+    limiter = ShardLimiter('NA', mode='fixed', limit=4)
+    saturated_release(limiter, 5.0, failed=True)
+    saturated_release(limiter, 0.001)
+    assert limiter.limit == 4
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        ShardLimiter('NA', mode='magic')
+
+def test_full_queue_is_rejected_with_retry_after():
+    limiter = ShardLimiter('EU', mode='fixed', limit=1, queue_limit=0)
+    assert limiter.acquire() == 0.0
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.acquire()
+    assert rejected.value.reason == 'queue full' and rejected.value.retry_after >= 1
+
+def test_queue_timeout():
+    limiter = ShardLimiter('EU', mode='fixed', limit=1, queue_limit=4, queue_timeout_ms=20)
+    limiter.acquire()
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.acquire()
+    assert rejected.value.reason == 'queue timeout'
+    assert limiter.snapshot()['rejected_timeout'] == 1
+
+def test_average_wait_counts_only_queued_requests():
+    limiter = ShardLimiter('EU', mode='fixed', limit=1, queue_limit=4, queue_timeout_ms=2000)
+    limiter.acquire()
+    for _ in range(8):
+        limiter.release(0.001)
+        limiter.acquire()
+
+    released = threading.Timer(0.1, limiter.release, args=(0.1,))
+    released.start()
+    waited = limiter.acquire()
+    released.join()
+
+    stats = limiter.snapshot()
+    assert stats['admitted'] == 10 and stats['queued'] == 1
+    assert stats['avg_wait_ms'] == pytest.approx(waited * 1000, abs=0.01)
+    assert stats['avg_wait_ms'] >= 50
+
+def test_overload_errors():
+    assert is_overload_error(ora_error(18))
+    assert is_overload_error(ora_error(2049))
+    assert is_overload_error(ora_error(0, 'DPY-4024'))
+    assert is_overload_error(oracledb.OperationalError(SimpleNamespace(code=3113, full_code='ORA-03113')))
+    assert not is_overload_error(ora_error(20001))  # insufficient balance (procedure)
+    assert not is_overload_error(ora_error(1))      # duplicate username
+    assert not is_overload_error(ValueError('bad amount'))
+
+@pytest.fixture
+def app(monkeypatch):
+    limiter = ShardLimiter('NA', mode='aimd', limit=10, latency_target_ms=250)
+    monkeypatch.setattr(admission, '_limiters', {'NA': limiter})
+    app = Flask(__name__)
+    init_admission(app)
+
+    @app.route('/write/<outcome>', methods=['POST'])
+    def write(outcome):
+        admit_write('NA')
+        limiter.in_flight = 10  # saturated, so a fast success would grow the limit
+        if outcome == 'no-connection':
+            mark_write_failed()
+            return jsonify({'error': 'Database connection failed'}), 500
+        if outcome in ('busy', 'business'):
+            e = ora_error(18 if outcome == 'busy' else 20001)
+            mark_write_failed(e)
+            return jsonify({'error': str(e)}), 500
+        return jsonify({'success': True})
+
+    app.limiter = limiter
+    return app
+
+@pytest.mark.parametrize('outcome,failed', [
+    ('ok', 0), ('business', 0), ('busy', 1), ('no-connection', 1)
+])
+def test_routes_report_write_failures(app, outcome, failed):
+    app.test_client().post(f'/write/{outcome}')
+    stats = app.limiter.snapshot()
+    assert stats['failed'] == failed
+    if failed:
+        assert app.limiter.limit == pytest.approx(9.0)
+    else:
+        assert app.limiter.limit > 10
+
+def test_rejection_is_answered_with_429(app):
+    app.limiter.queue_limit = 0
+    app.limiter.in_flight = 10
+    response = app.test_client().post('/write/ok')
+    assert response.status_code == 429 and int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['reason'] == 'queue full'
+    assert app.limiter.in_flight == 10
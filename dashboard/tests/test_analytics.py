@@ -0,0 +1,28 @@
+"""Offline regional statistics over extracted Arrow tables"""
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+pytest.importorskip('numpy')
+
+from utils.analytics import regional_stats
+
+def test_transactions_without_region_are_left_out():
+    transactions = pa.table({
+        'transaction_type': ['DEPOSIT', 'DEPOSIT', 'TRANSFER'],
+        'amount': [10.0, 20.0, 5.0],
+        'shard_location': ['SHARD1', 'SHARD1', 'SHARD2'],
+        'region': ['NA', None, 'EU'],
+    })
+    stats = {row['region']: row for row in regional_stats({'transactions': transactions})}
+    assert sorted(stats) == ['EU', 'NA']
+    assert stats['NA']['total_transactions'] == 1
+    assert stats['NA']['total_deposits'] == 10.0
+
+def test_extracts_without_region_column_use_the_shard_region():
+    transactions = pa.table({
+        'transaction_type': ['WITHDRAWAL'],
+        'amount': [7.0],
+        'shard_location': ['SHARD3'],
+    })
+    assert [row['region'] for row in regional_stats({'transactions': transactions})] == ['APAC']
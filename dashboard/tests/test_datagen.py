@@ -0,0 +1,69 @@
+"""Load cleanup: every disabled trigger/foreign key is restored, failures never hide the load error"""
+
+import pytest
+
+from conftest import FakeConnection
+from utils import datagen
+
+def fake_cursor(fail_on=(), foreign_keys=()):
+    return FakeConnection({'user_constraints': list(foreign_keys)}, fail_on=fail_on,
+                          error=RuntimeError('ORA-02298: cannot validate')).cursor()
+
+def test_disable_records_items_before_a_partial_failure():
+    cursor = fake_cursor(fail_on=['ACCOUNTS DISABLE ALL TRIGGERS'])
+    disabled = []
+    with pytest.raises(RuntimeError):
+        datagen._disable_for_load(cursor, 'direct', disabled)
+    assert disabled == [('USERS', None)]
+
+def test_conventional_load_disables_nothing():
+    cursor = fake_cursor()
+    disabled = []
+    datagen._disable_for_load(cursor, 'conventional', disabled)
+    assert disabled == []
+    assert cursor.connection.executed == []
+
+def test_restore_continues_after_a_failed_item():
+    cursor = fake_cursor(fail_on=['ENABLE VALIDATE CONSTRAINT FK_ACCOUNTS_USER'],
+                         foreign_keys=[('ACCOUNTS', 'FK_ACCOUNTS_USER'), ('TRANSACTIONS', 'FK_TXN_ACCOUNT')])
+    disabled = []
+    datagen._disable_for_load(cursor, 'direct', disabled)
+    cursor.connection.executed.clear()
+
+    errors = datagen._restore_after_load(cursor, disabled)
+
+    assert len(errors) == 1 and 'FK_ACCOUNTS_USER' in errors[0]
+    assert 'ALTER TABLE TRANSACTIONS ENABLE VALIDATE CONSTRAINT FK_TXN_ACCOUNT' in cursor.connection.statements
+    assert sum('ENABLE ALL TRIGGERS' in sql for sql in cursor.connection.statements) == 3
+
+def test_finish_advances_sequences_after_a_failed_restore(monkeypatch):
+    advanced = []
+    monkeypatch.setattr(datagen, '_advance_sequence',
+                        lambda cursor, max_sql, params, sequence: advanced.append(sequence))
+    cursor = fake_cursor(fail_on=['ENABLE ALL TRIGGERS'])
+
+    errors = datagen._finish_load(cursor, [('USERS', None)], [('q', [], 'USER_SEQ_NA'), ('q', [], 'ACCOUNT_SEQ')])
+
+    assert len(errors) == 1
+    assert advanced == ['USER_SEQ_NA', 'ACCOUNT_SEQ']
+
+def test_finish_collects_sequence_failures(monkeypatch):
+    def fail(cursor, max_sql, params, sequence):
+        raise RuntimeError('ORA-04006')
+    monkeypatch.setattr(datagen, '_advance_sequence', fail)
+
+    errors = datagen._finish_load(fake_cursor(), [], [('q', [], 'USER_SEQ_NA'), ('q', [], 'ACCOUNT_SEQ')])
+
+    assert len(errors) == 2
+
+def test_finish_bumps_data_generation_after_disabled_triggers(monkeypatch):
+    monkeypatch.setattr(datagen, '_advance_sequence', lambda *args: None)
+    cursor = fake_cursor()
+
+    assert datagen._finish_load(cursor, [('USERS', None)], []) == []
+    assert 'BEGIN bump_data_generation; END;' in cursor.connection.statements
+    assert cursor.connection.calls == [('commit',)]
+
+    cursor = fake_cursor()
+    datagen._finish_load(cursor, [], [])
+    assert cursor.connection.executed == []
@@ -0,0 +1,18 @@
+"""Write procedure calls: no separate commit round trip"""
+
+import pytest
+
+from conftest import FakeConnection
+from utils.db import call_procedure
+
+def test_call_procedure_commits_with_the_call():
+    conn = FakeConnection()
+    call_procedure(conn, 'deposit_money', ['NA-1', 10.0, 'test'])
+    assert conn.calls == [('callproc', 'deposit_money', ['NA-1', 10.0, 'test'], True)]
+    assert conn.cursors[0].closed
+
+def test_call_procedure_closes_cursor_on_error():
+    conn = FakeConnection(fail_on=['withdraw_money'])
+    with pytest.raises(RuntimeError):
+        call_procedure(conn, 'withdraw_money', ['NA-1', 1e9, 'test'])
+    assert conn.cursors[0].closed and conn.calls == []
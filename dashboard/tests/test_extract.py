@@ -0,0 +1,67 @@
+"""Extract high-water marks, settle window and full-extract partition cleanup"""
+
+from datetime import datetime
+
+import pytest
+
+from conftest import FakeConnection
+from utils import extract
+from utils.extract import build_extract_query, settled_upper_bound, _encode_hwm, _decode_hwm, _clear_partition, _PartitionWriter
+
+def test_hwm_round_trip():
+    updated = datetime(2026, 3, 1, 12, 30, 5)
+    assert _decode_hwm('accounts', _encode_hwm(updated)) == updated
+    assert _decode_hwm('transactions', _encode_hwm(42)) == 42
+    assert _decode_hwm('transactions', '42') == 42
+    assert _decode_hwm('users', None) is None
+
+def test_full_extract_query_has_no_lower_bound():
+    sql, params = build_extract_query('transactions', None, 100)
+    assert sql.endswith('FROM transactions WHERE transaction_id <= :upper_bound')
+    assert params == {'upper_bound': 100}
+
+def test_incremental_query_is_exclusive_of_hwm():
+    hwm = datetime(2026, 3, 1)
+    sql, params = build_extract_query('users', hwm, datetime(2026, 3, 2))
+    assert 'WHERE last_updated > :hwm AND last_updated <= :upper_bound' in sql
+    assert params['hwm'] == hwm
+
+def test_query_without_bounds_reads_everything():
+    sql, params = build_extract_query('accounts')
+    assert 'WHERE' not in sql and params == {}
+
+def test_transactions_upper_bound_uses_settle_window():
+    conn = FakeConnection({'': [(250,)]})
+    assert settled_upper_bound(conn, 'transactions', 200, 30) == 250
+    sql, params = conn.executed[0]
+    assert sql == extract.TRANSACTIONS_UPPER_BOUND_SQL
+    assert params == {'hwm': 200, 'settle_seconds': 30}
+
+def test_upper_bound_never_goes_below_hwm():
+    hwm = datetime(2026, 3, 2)
+    conn = FakeConnection({'': [(datetime(2026, 3, 1),)]})
+    assert settled_upper_bound(conn, 'accounts', hwm, 60) == hwm
+    assert settled_upper_bound(FakeConnection({'': [(0,)]}), 'transactions', None, 60) == 0
+
+def test_clear_partition_keeps_only_new_file(tmp_path):
+    for name in ('part-1.parquet', 'part-2.parquet', 'notes.txt'):
+        (tmp_path / name).write_text('')
+    keep = str(tmp_path / 'part-2.parquet')
+    _clear_partition(str(tmp_path), keep=keep)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['notes.txt', 'part-2.parquet']
+
+def test_clear_partition_without_new_file(tmp_path):
+    (tmp_path / 'part-1.parquet').write_text('')
+    _clear_partition(str(tmp_path), keep=str(tmp_path / 'part-9.parquet'))
+    assert list(tmp_path.iterdir()) == []
+    _clear_partition(str(tmp_path / 'missing'))
+
+def test_partition_writer_never_overwrites_another_run(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    path = tmp_path / 'part-1.arrow'
+    path.write_bytes(b'other run')
+    writer = _PartitionWriter(str(path), 'arrow')
+    with pytest.raises(FileExistsError):
+        writer.write(pa.table({'id': [1]}))
+    writer.abort()
+    assert path.read_bytes() == b'other run'
@@ -0,0 +1,136 @@
+"""ETag / If-None-Match handling and response compression"""
+
+import gzip
+import os
+import re
+
+import pytest
+from flask import Flask, jsonify
+
+from conftest import FakeConnection
+from utils import http_cache
+
+@pytest.fixture
+def app(monkeypatch):
+    version = {'token': 'v1'}
+    calls = {'view': 0}
+    monkeypatch.setattr(http_cache, 'get_data_version', lambda: version['token'])
+
+    app = Flask(__name__)
+
+    @app.route('/stats')
+    @http_cache.conditional_json
+    def stats():
+        calls['view'] += 1
+        return jsonify({'rows': ['x'] * 500})
+
+    @app.route('/broken')
+    @http_cache.conditional_json
+    def broken():
+        return jsonify({'error': 'failed'}), 500
+
+    http_cache.init_compression(app, min_size=100)
+    app.version = version
+    app.calls = calls
+    return app
+
+def test_unchanged_data_is_answered_with_304(app):
+    client = app.test_client()
+    first = client.get('/stats')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag.startswith('W/') and first.headers['Cache-Control'] == 'no-cache'
+
+    second = client.get('/stats', headers={'If-None-Match': etag})
+    assert second.status_code == 304 and second.data == b''
+    assert second.headers['ETag'] == etag
+    assert app.calls['view'] == 1
+
+def test_new_data_version_changes_etag(app):
+    client = app.test_client()
+    etag = client.get('/stats').headers['ETag']
+    app.version['token'] = 'v2'
+    response = client.get('/stats', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+
+def test_etag_depends_on_query_string(app):
+    client = app.test_client()
+    assert client.get('/stats?days=7').headers['ETag'] != client.get('/stats?days=30').headers['ETag']
+
+def test_errors_are_not_tagged(app):
+    response = app.test_client().get('/broken')
+    assert response.status_code == 500 and 'ETag' not in response.headers
+
+def test_unknown_version_disables_caching(app):
+    app.version['token'] = None
+    response = app.test_client().get('/stats', headers={'If-None-Match': '*'})
+    assert response.status_code == 200 and 'ETag' not in response.headers
+
+def test_large_json_is_gzipped(app):
+    response = app.test_client().get('/stats', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'"rows"' in gzip.decompress(response.data)
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+def test_no_compression_without_accept_encoding(app):
+    response = app.test_client().get('/stats', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_data_version_changes_with_the_catalog_date(monkeypatch):
+    shards = [('SHARD1', 10), ('SHARD2', 7), ('SHARD3', 3)]
+    today = {'date': '2026-03-01'}
+    connections = []
+
+    def connect():
+        conn = FakeConnection({'dashboard_data_version':
+                               lambda sql, params, conn: [row + (today['date'],) for row in shards]})
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(http_cache, 'get_db_connection', connect)
+    monkeypatch.setattr(http_cache, 'DATA_VERSION_TTL', 0.0)
+    first = http_cache.get_data_version()
+    assert http_cache.get_data_version() == first
+    today['date'] = '2026-03-02'
+    assert http_cache.get_data_version() != first
+    assert 'TRUNC(SYSDATE)' in connections[0].executed[0][0]
+    assert all(conn.closed for conn in connections)
+
+SQL_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'sql', 'sharding')
+
+def read_sql(name):
+    with open(os.path.join(SQL_DIR, name)) as f:
+        return f.read()
+
+def test_every_table_written_by_the_relay_moves_the_data_version():
+    outbox_sql = read_sql('21-create-transfer-outbox.sql')
+    procedures = outbox_sql[outbox_sql.index('CREATE OR REPLACE PROCEDURE apply_transfer_credit'):
+                            outbox_sql.index('PROMPT Creating data generation triggers')]
+    written = {table.lower() for table in re.findall(r'\b(?:UPDATE|INSERT INTO)\s+(\w+)', procedures)}
+    triggers = read_sql('04-create-sharded-tables.sql') + outbox_sql
+    versioned = {table.lower() for table in re.findall(
+        r'AFTER INSERT OR UPDATE OR DELETE ON (\w+)\s+BEGIN\s+bump_data_generation;', triggers)}
+    assert {'accounts', 'transactions', 'transfer_outbox', 'transfer_inbox'} <= written
+    assert written <= versioned
+
+def test_settled_transfer_changes_etag(monkeypatch):
+    # data_generation per shard, as the triggers leave it
+    generation = {'SHARD1': 5, 'SHARD2': 2, 'SHARD3': 0}
+    monkeypatch.setattr(http_cache, 'get_db_connection', lambda: FakeConnection({
+        'dashboard_data_version': lambda sql, params, conn: [(s, g, '2026-03-01') for s, g in sorted(generation.items())]
+    }))
+    monkeypatch.setattr(http_cache, 'DATA_VERSION_TTL', 0.0)
+    app = Flask(__name__)
+
+    @app.route('/api/transactions/recent')
+    @http_cache.conditional_json
+    def recent():
+        return jsonify([{'status': 'PENDING'}])
+
+    client = app.test_client()
+    etag = client.get('/api/transactions/recent').headers['ETag']
+    assert client.get('/api/transactions/recent', headers={'If-None-Match': etag}).status_code == 304
+
+    # complete_outbox_transfer flips the TRANSFER row to COMPLETED in the relay's transaction
+    generation['SHARD1'] += 2
+    assert client.get('/api/transactions/recent', headers={'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,125 @@
+"""Sampling profiler: frame categories, reports and background sessions"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from utils import profiler
+from utils.profiler import _categorize, ProfileSession, start_profile, get_profile
+
+def code(filename, name='f'):
+    return SimpleNamespace(co_filename=filename, co_name=name, co_firstlineno=1)
+
+@pytest.mark.parametrize('frames,category', [
+    ([code('/venv/lib/python3.12/site-packages/oracledb/cursor.py'),
+      code('/app/dashboard/utils/response.py', 'cursor_to_dicts')], 'driver'),
+    ([code('/app/dashboard/utils/response.py', 'cursor_to_dicts'),
+      code('/app/dashboard/app.py', 'get_users')], 'cursor_to_dicts'),
+    ([code('/usr/lib/python3.12/json/encoder.py'),
+      code('/venv/lib/site-packages/flask/json/provider.py')], 'json'),
+    ([code('/venv/lib/site-packages/werkzeug/serving.py')], 'flask'),
+    ([code('C:\\venv\\Lib\\site-packages\\flask\\app.py')], 'flask'),
+    ([code('/app/dashboard/app.py', 'get_users')], 'app'),
+    ([], 'app')
+])
+def test_categorize_uses_first_categorized_frame_from_leaf(frames, category):
+    assert _categorize(frames) == category
+
+def test_other_cursor_to_dicts_is_not_row_conversion():
+    assert _categorize([code('/app/other/response.py', 'cursor_to_dicts')]) == 'app'
+
+def test_report_and_collapsed_stacks():
+    session = ProfileSession(Flask(__name__), hz=100, seconds=1)
+    session.stacks.update({'[driver];a;b': 3, '[app];a': 1})
+    session.categories.update({'driver': 3, 'app': 1})
+    session.samples = 4
+    report = session.report()
+    assert report['categories']['driver'] == {'samples': 3, 'percent': 75.0, 'seconds': 0.03}
+    assert report['categories']['json']['samples'] == 0
+    assert report['collapsed'] == '[driver];a;b 3\n[app];a 1\n'
+
+@pytest.fixture(autouse=True)
+def no_leftover_session():
+    yield
+    if profiler._current is not None:
+        profiler._current.stop()
+
+@pytest.mark.parametrize('kwargs', [
+    {'hz': 0, 'seconds': 1}, {'hz': 100}, {'hz': 100, 'seconds': 1, 'requests': 1},
+    {'hz': 100, 'seconds': 301}, {'hz': 100, 'requests': 0}
+])
+def test_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        start_profile(Flask(__name__), **kwargs)
+
+def test_seconds_session_ends_by_itself_and_unhooks():
+    app = Flask(__name__)
+    original = app.wsgi_app
+    session = start_profile(app, hz=200, seconds=0.1)
+    assert app.wsgi_app != original and get_profile(session.id) is session
+    with pytest.raises(RuntimeError):
+        start_profile(app, hz=100, seconds=1)
+    assert session.done.wait(2)
+    assert session.report()['status'] == 'done' and app.wsgi_app == original
+
+def test_reports_can_be_read_while_sampling():
+    app = Flask(__name__)
+    stop = threading.Event()
+
+    def depth(n):
+        if n == 0:
+            time.sleep(0.0005)
+        else:
+            depth(n - 1)
+
+    @app.route('/work')
+    def work():
+        i = 0
+        while not stop.is_set():
+            depth(i % 40)  # a new stack key on most samples
+            i += 1
+        return 'ok'
+
+    session = start_profile(app, hz=1000, route='/work', requests=1)
+    worker = threading.Thread(target=app.test_client().get, args=('/work',))
+    worker.start()
+    try:
+        deadline = time.time() + 0.5
+        while time.time() < deadline:
+            session.collapsed()
+            session.report()
+    finally:
+        stop.set()
+        worker.join()
+    assert session.done.wait(2)
+    assert session.report()['samples'] > 0
+
+@pytest.fixture
+def admin_client(monkeypatch):
+    import app as dashboard
+    from utils import admin
+    monkeypatch.setattr(admin, 'ADMIN_TOKEN', 'secret')
+    client = dashboard.app.test_client()
+    client.environ_base['HTTP_X_ADMIN_TOKEN'] = 'secret'
+    return client
+
+@pytest.mark.parametrize('body', [
+    {'seconds': [1]}, {'seconds': 'soon'}, {'seconds': True}, {'hz': {'x': 1}, 'seconds': 1}, {'requests': '1.5'}
+])
+def test_non_numeric_parameters_are_rejected(admin_client, body):
+    response = admin_client.post('/api/admin/profile', json=body)
+    assert response.status_code == 400
+    assert 'must be a number' in response.get_json()['error']
+
+def test_profile_is_stopped_with_delete_not_get(admin_client):
+    response = admin_client.post('/api/admin/profile', json={'hz': 100, 'seconds': 30})
+    assert response.status_code == 202
+    profile_id = response.get_json()['profile_id']
+
+    assert admin_client.get(f'/api/admin/profile/{profile_id}?stop=1').get_json()['status'] == 'running'
+    response = admin_client.delete(f'/api/admin/profile/{profile_id}')
+    assert response.status_code == 200 and response.get_json()['status'] == 'done'
+    assert admin_client.delete('/api/admin/profile/unknown').status_code == 404
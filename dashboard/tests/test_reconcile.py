@@ -0,0 +1,153 @@
+"""Ledger reconciliation: opening balances, drift, settle window and checkpoints"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import FakeConnection
+from utils import reconcile
+from utils.state import load_state
+
+SNAPSHOT = datetime(2026, 3, 1, 12, 0, 0)
+
+def fake_shards(monkeypatch, results):
+    """Replace the shard reads with canned results; returns the recorded calls"""
+    calls = []
+
+    def fake_reconcile_shard(region, checkpoint, inbox_checkpoint, since, recheck, settle_seconds, gaps):
+        calls.append({'region': region, 'checkpoint': checkpoint, 'inbox_checkpoint': inbox_checkpoint,
+                      'since': since, 'recheck': recheck, 'settle_seconds': settle_seconds, 'gaps': gaps})
+        result = {'flows': {}, 'balances': {}, 'checkpoint': checkpoint, 'inbox_checkpoint': inbox_checkpoint,
+                  'gaps': gaps, 'snapshot_time': SNAPSHOT, 'rows_processed': 0, 'seconds': 0.01}
+        result.update(results.get(region, {}))
+        return result
+
+    monkeypatch.setattr(reconcile, '_reconcile_shard', fake_reconcile_shard)
+    return calls
+
+def test_first_run_fixes_opening_balance(tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'state.json')
+    fake_shards(monkeypatch, {'NA': {'flows': {'NA-1': 5000}, 'balances': {'NA-1': (15000, False)}, 'checkpoint': 10}})
+    report = reconcile.reconcile_ledger(state_path, regions=['NA'])
+    assert report['mismatches'] == [] and report['accounts_checked'] == 0
+    state = load_state(state_path)
+    assert state['accounts']['NA-1'] == [10000, 5000]
+    assert state['checkpoints']['SHARD1'] == 10
+
+def test_balance_matching_flows_is_not_drift(tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'state.json')
+    fake_shards(monkeypatch, {'NA': {'balances': {'NA-1': (10000, False)}}})
+    reconcile.reconcile_ledger(state_path)
+
+    # A cross-shard credit reported by another shard's rows counts for NA-1
+    fake_shards(monkeypatch, {
+        'NA': {'flows': {'NA-1': -2500}, 'balances': {'NA-1': (9000, False)}},
+        'EU': {'flows': {'NA-1': 1500}}
+    })
+    report = reconcile.reconcile_ledger(state_path)
+    assert report['mismatches'] == [] and report['accounts_checked'] == 1
+
+def test_drift_is_reported_and_rechecked(tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'state.json')
+    fake_shards(monkeypatch, {'NA': {'balances': {'NA-1': (10000, False)}}})
+    reconcile.reconcile_ledger(state_path, regions=['NA'])
+
+    fake_shards(monkeypatch, {'NA': {'balances': {'NA-1': (10100, False)}}})
+    report = reconcile.reconcile_ledger(state_path, regions=['NA'])
+    assert report['mismatches'] == [{
+        'account_number': 'NA-1', 'shard_location': 'SHARD1',
+        'balance': 101.0, 'expected_balance': 100.0, 'drift': 1.0
+    }]
+    assert load_state(state_path)['recheck'] == ['NA-1']
+
+def test_unsettled_account_is_not_checked(tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'state.json')
+    fake_shards(monkeypatch, {'NA': {'balances': {'NA-1': (10000, True)}}})
+    report = reconcile.reconcile_ledger(state_path, regions=['NA'])
+    assert report['unsettled'] == ['NA-1']
+    state = load_state(state_path)
+    assert 'NA-1' not in state['accounts'] and state['recheck'] == ['NA-1']
+
+    calls = fake_shards(monkeypatch, {})
+    reconcile.reconcile_ledger(state_path, regions=['NA'])
+    assert calls[0]['recheck'] == ['NA-1']
+
+def test_next_run_reads_from_checkpoints_minus_settle_window(tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'state.json')
+    fake_shards(monkeypatch, {'NA': {'checkpoint': 42, 'inbox_checkpoint': 7}})
+    reconcile.reconcile_ledger(state_path, regions=['NA'], settle_seconds=30)
+
+    calls = fake_shards(monkeypatch, {})
+    reconcile.reconcile_ledger(state_path, regions=['NA'], settle_seconds=30)
+    assert calls[0]['checkpoint'] == 42 and calls[0]['inbox_checkpoint'] == 7
+    assert calls[0]['since'] == SNAPSHOT - timedelta(seconds=30)
+
+    calls = fake_shards(monkeypatch, {})
+    reconcile.reconcile_ledger(state_path, regions=['NA'], full_check=True)
+    assert calls[0]['since'] is None
+
+def test_state_is_tied_to_its_regions(tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'state.json')
+    fake_shards(monkeypatch, {})
+    reconcile.reconcile_ledger(state_path, regions=['eu', 'NA'])
+    assert load_state(state_path)['regions'] == ['NA', 'EU']
+
+    reconcile.reconcile_ledger(state_path, regions=['NA', 'EU'])
+    for regions in (['NA'], None):
+        with pytest.raises(ValueError, match='tracks regions NA EU'):
+            reconcile.reconcile_ledger(state_path, regions=regions)
+    with pytest.raises(ValueError, match='Invalid region'):
+        reconcile.reconcile_ledger(str(tmp_path / 'other.json'), regions=['XX'])
+
+def test_state_without_recorded_regions_uses_its_checkpoints(tmp_path, monkeypatch):
+    state_path = tmp_path / 'state.json'
+    state_path.write_text('{"checkpoints": {"SHARD1": 5, "SHARD1:inbox": 0}, "snapshots": {}, '
+                          '"accounts": {}, "recheck": []}')
+    fake_shards(monkeypatch, {})
+    with pytest.raises(ValueError):
+        reconcile.reconcile_ledger(str(state_path))
+    reconcile.reconcile_ledger(str(state_path), regions=['NA'])
+
+def test_missing_ids_are_kept_until_the_gap_retention(tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'state.json')
+    fresh = SNAPSHOT.isoformat()
+    stale = (SNAPSHOT - timedelta(seconds=3601)).isoformat()
+    fake_shards(monkeypatch, {'NA': {'checkpoint': 50, 'gaps': [[10, 12, fresh], [20, 20, stale]]}})
+    report = reconcile.reconcile_ledger(state_path, regions=['NA'])
+    assert load_state(state_path)['gaps']['SHARD1'] == [[10, 12, fresh]]
+    assert report['shards']['SHARD1']['open_gaps'] == 1
+
+    calls = fake_shards(monkeypatch, {})
+    reconcile.reconcile_ledger(state_path, regions=['NA'])
+    assert calls[0]['gaps'] == [[10, 12, fresh]]
+
+def shard_connection(monkeypatch, rows):
+    conn = FakeConnection(rows)
+    monkeypatch.setattr(reconcile, 'get_db_connection', lambda shard_region=None: conn)
+    return conn
+
+def test_late_commit_below_the_checkpoint_is_counted(monkeypatch):
+    # Id 11 was missing last run and has committed since; 12 is still missing
+    gap_bounds = []
+
+    def gaps(sql, params, conn):
+        gap_bounds.append((params['low'], params['high']))
+        return [(12, 12)] if params['low'] == 9 else []
+
+    def flows(sql, params, conn):
+        return [('NA-1', -500)] if params['checkpoint'] == 9 else [('NA-2', 700)]
+
+    conn = shard_connection(monkeypatch, {
+        'SELECT SYSDATE': [(SNAPSHOT,)],
+        'NVL(MAX(transaction_id), :checkpoint)': [(60, 10)],
+        'NVL(MAX(inbox_seq)': [(0, 0)],
+        'LAG(transaction_id': gaps,
+        'SUM(delta_cents)': flows,
+    })
+    result = reconcile._reconcile_shard('NA', 50, 0, None, [], 60, [[10, 12, 'first']])
+
+    assert result['flows'] == {'NA-1': -500, 'NA-2': 700}
+    assert result['gaps'] == [[12, 12, 'first']]
+    assert gap_bounds == [(9, 12), (50, 60)]
+    assert result['checkpoint'] == 60 and result['rows_processed'] == 12
+    assert ('rollback',) in conn.calls and conn.closed
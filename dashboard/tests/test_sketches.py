@@ -0,0 +1,91 @@
+"""HyperLogLog registers, merge and estimate"""
+
+import hashlib
+import math
+
+import pytest
+
+from utils.sketches import (
+    HyperLogLog, HLL_PRECISION, HASH_BITS, hll_registers_sql, merge_grouped, merge_all,
+    grouped_from_rows, error_bound
+)
+
+def ora_hash(value):
+    """Stand-in for ORA_HASH(value, 4294967295): a well mixed 32-bit hash"""
+    return int.from_bytes(hashlib.md5(str(value).encode()).digest()[:4], 'big')
+
+def register_rows(values, precision=HLL_PRECISION):
+    """(register_index, rho) rows as returned by hll_registers_sql() on a shard"""
+    buckets = 2 ** precision
+    value_bits = HASH_BITS - precision
+    registers = {}
+    for value in values:
+        h = ora_hash(value)
+        w = h // buckets
+        rho = value_bits - (w.bit_length() - 1)  # FLOOR(LOG(2, w + 0.5)) = highest 1-bit
+        registers[h % buckets] = max(registers.get(h % buckets, 0), rho)
+    return list(registers.items())
+
+def sketch_of(values):
+    return HyperLogLog.from_rows(register_rows(values))
+
+def test_empty_sketch_counts_zero():
+    assert HyperLogLog().estimate() == 0
+
+def test_small_counts_are_practically_exact():
+    assert sketch_of(range(50)).estimate() == pytest.approx(50, rel=0.02)
+
+@pytest.mark.parametrize('n', [10000, 200000])
+def test_estimate_within_error_bound(n):
+    estimate = sketch_of(f'user-{i}' for i in range(n)).estimate()
+    assert abs(estimate - n) / n < 3 * HyperLogLog().relative_error
+
+def test_merge_counts_the_union():
+    na = sketch_of(f'acct-{i}' for i in range(0, 30000))
+    eu = sketch_of(f'acct-{i}' for i in range(20000, 50000))
+    union = sketch_of(f'acct-{i}' for i in range(50000))
+    merged = merge_all([na, eu])
+    assert merged.registers == union.registers
+    assert abs(merged.estimate() - 50000) / 50000 < 0.05
+
+def test_merge_is_commutative_and_idempotent():
+    a = sketch_of(range(1000))
+    b = sketch_of(range(500, 3000))
+    ab = merge_all([a, b])
+    assert ab.registers == merge_all([b, a]).registers
+    assert merge_all([ab, a, b]).registers == ab.registers
+
+def test_merge_rejects_other_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+
+def test_from_rows_keeps_max_rho_per_register():
+    sketch = HyperLogLog.from_rows([(5, 2), (5, 7), (5, 3)])
+    assert sketch.registers[5] == 7
+
+def test_grouped_sketches_merge_per_group():
+    shard1 = grouped_from_rows([('NA', i, r) for i, r in register_rows(range(100))])
+    shard2 = grouped_from_rows([('NA', i, r) for i, r in register_rows(range(50, 150))]
+                               + [('EU', i, r) for i, r in register_rows(range(10))])
+    merged = merge_grouped([shard1, shard2])
+    assert merged['NA'].estimate() == pytest.approx(150, rel=0.02)
+    assert merged['EU'].estimate() == pytest.approx(10, rel=0.02)
+
+def test_large_range_correction():
+    sketch = HyperLogLog()
+    sketch.registers = [20] * sketch.m
+    raw = 0.7213 / (1 + 1.079 / sketch.m) * sketch.m * 2 ** 20
+    assert raw > 2 ** HASH_BITS / 30.0
+    assert sketch.estimate() == pytest.approx(-(2 ** HASH_BITS) * math.log(1 - raw / 2 ** HASH_BITS))
+
+def test_registers_sql_groups_by_register():
+    sql = hll_registers_sql('user_id', 'users', group_expr='region', where="status = 'ACTIVE'")
+    assert 'ORA_HASH(user_id, 4294967295)' in sql
+    assert 'GROUP BY grp, MOD(h, 4096)' in sql
+    assert "WHERE status = 'ACTIVE'" in sql
+
+def test_error_bound():
+    bound = error_bound()
+    assert bound['registers'] == 4096
+    assert bound['relative_standard_error'] == pytest.approx(0.0162, abs=1e-4)
+    assert bound['relative_error_95'] == pytest.approx(2 * bound['relative_standard_error'], abs=1e-4)
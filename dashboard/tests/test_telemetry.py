@@ -0,0 +1,74 @@
+"""Wait categories, the Diagnostics Pack check and the per-cycle timeout of the collector"""
+
+import threading
+
+from conftest import FakeConnection
+from utils import telemetry
+from utils.telemetry import WaitCollector, wait_category, TARGETS
+
+def test_wait_category():
+    assert wait_category('ON CPU', 'CPU') == 'cpu'
+    assert wait_category('enq: TX - row lock contention', 'Application') == 'row_lock'
+    assert wait_category('SQL*Net message from dblink', 'Network') == 'db_link'
+    assert wait_category('log file sync', 'Commit') == 'commit'
+    assert wait_category('db file sequential read', 'User I/O') == 'user_i/o'
+    assert wait_category('latch free', None) == 'other'
+
+def pack_access(value=None, error=None):
+    rows = {'control_management_pack_access': [(value,)] if value is not None else []}
+    return FakeConnection(rows, fail_on=['v$parameter'] if error else (), error=error).cursor()
+
+def test_ash_requires_the_diagnostics_pack():
+    collector = WaitCollector(interval=1, source='auto')
+    assert collector._ash_licensed(pack_access('DIAGNOSTIC+TUNING'))
+    assert collector._ash_licensed(pack_access('diagnostic'))
+    assert not collector._ash_licensed(pack_access('NONE'))
+    assert not collector._ash_licensed(pack_access(None))
+    assert not collector._ash_licensed(pack_access(error=telemetry.oracledb.DatabaseError('ORA-00942')))
+    collector.stop()
+
+def test_slow_target_times_out_without_holding_the_others(monkeypatch):
+    slow = TARGETS[1]
+    release = threading.Event()
+    calls = []
+
+    def sample(self, target):
+        calls.append(target)
+        if target == slow:
+            release.wait(5)
+        return {'db_time': {}, 'sql': {}, 'latest': {'status': 'ok'}}
+
+    monkeypatch.setattr(WaitCollector, '_safe_sample', sample)
+    collector = WaitCollector(interval=0.2)
+    try:
+        results = collector.collect_once()
+        assert results[slow]['latest']['status'] == 'timeout'
+        assert all(results[t]['latest']['status'] == 'ok' for t in TARGETS if t != slow)
+
+        # Still running: not sampled again, still reported as timeout
+        results = collector.collect_once()
+        assert results[slow]['latest']['status'] == 'timeout'
+        assert calls.count(slow) == 1
+
+        # Once it ends, its result is picked up by the next cycle
+        release.set()
+        collector.pending[slow].result(5)
+        results = collector.collect_once()
+        assert results[slow]['latest']['status'] == 'ok'
+        assert calls.count(slow) == 1
+        assert collector.snapshot()['targets'][slow]['status'] == 'ok'
+    finally:
+        release.set()
+        collector.stop()
+
+def test_sessions_get_a_call_timeout(monkeypatch):
+    monkeypatch.setattr(telemetry, 'get_db_connection', lambda shard_region=None: FakeConnection())
+    collector = WaitCollector(interval=5)
+    assert collector._connection(TARGETS[0]).call_timeout == 5000
+    collector.connections.clear()
+    collector.stop()
+
+    collector = WaitCollector(interval=5, call_timeout=2)
+    assert collector._connection(TARGETS[0]).call_timeout == 2000
+    collector.connections.clear()
+    collector.stop()
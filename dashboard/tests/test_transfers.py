@@ -0,0 +1,62 @@
+"""Outbox relay batch claim: several relays must claim disjoint rows"""
+
+import asyncio
+
+import pytest
+
+from conftest import AsyncFakeConnection
+from utils import transfers
+from utils.transfers import OutboxRelay
+
+class FakeOutbox:
+    """PENDING outbox rows shared by several sessions, with SKIP LOCKED row locks"""
+
+    def __init__(self, n):
+        self.rows = [(f'T{i:04d}', f'EU-{i}', 'EU' if i % 2 else 'APAC', 10.0 + i) for i in range(n)]
+        self.locks = {}
+
+    def skip_locked(self, sql, parameters, session):
+        # Rows locked by another session are skipped; a row is locked when it is fetched
+        for row in self.rows:
+            if self.locks.setdefault(row[0], session) is session:
+                yield row
+
+    def session(self):
+        return AsyncFakeConnection({'transfer_outbox': self.skip_locked})
+
+def claim(relay, conn):
+    return asyncio.run(relay._claim_batch(conn))
+
+def claimed_ids(batch):
+    return {entry['transfer_id'] for entries in batch.values() for entry in entries}
+
+@pytest.fixture
+def relays(monkeypatch):
+    monkeypatch.setattr(transfers, 'PIPELINING_AVAILABLE', True)
+    return OutboxRelay(batch_size=3), OutboxRelay(batch_size=3)
+
+def test_two_relays_claim_disjoint_batches(relays):
+    outbox = FakeOutbox(10)
+    first = claimed_ids(claim(relays[0], outbox.session()))
+    second = claimed_ids(claim(relays[1], outbox.session()))
+    assert first == {'T0000', 'T0001', 'T0002'}
+    assert second == {'T0003', 'T0004', 'T0005'}
+
+def test_claim_is_limited_by_fetch_not_rownum(relays):
+    conn = FakeOutbox(10).session()
+    claim(relays[0], conn)
+    cursor = conn.cursors[0]
+    sql = conn.executed[0][0]
+    assert 'ROWNUM' not in sql.upper()
+    assert 'FOR UPDATE SKIP LOCKED' in sql
+    assert cursor.arraysize == 3 and cursor.prefetchrows == 3
+
+def test_claim_groups_by_destination(relays):
+    batch = claim(relays[0], FakeOutbox(3).session())
+    assert [e['transfer_id'] for e in batch['APAC']] == ['T0000', 'T0002']
+    assert batch['EU'] == [{'transfer_id': 'T0001', 'to_account_number': 'EU-1', 'amount': 11.0}]
+
+def test_nothing_left_to_claim(relays):
+    outbox = FakeOutbox(2)
+    claim(relays[0], outbox.session())
+    assert claim(relays[1], outbox.session()) == {}
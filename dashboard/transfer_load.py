@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Cross-Shard Transfer Load Test
+Compares the synchronous transfer path (transfer_money, distributed transaction over
+DB links) with the async outbox path (transfer_money_async + relay) under concurrency
+
+Reports per mode: client latency percentiles and throughput; for async mode also the
+settle time until the relay has applied every queued credit (outbox drained)
+
+Usage:
+    python3 transfer_load.py --mode both --transfers 2000 --concurrency 16
+    python3 transfer_load.py --mode async --relay      # run a relay inside this process
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils import get_db_connection
+from utils.db import SHARD_LOCATIONS
+from utils.transfers import transfer_money_async, get_outbox_stats, OutboxRelay
+
+REGION_BY_LOCATION = {location: region for region, location in SHARD_LOCATIONS.items()}
+
+def load_cross_shard_pairs(amount, limit):
+    """Pick ACTIVE accounts on different shards with enough balance for the run"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError('Database connection failed')
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT account_number, shard_location
+            FROM accounts_all
+            WHERE status = 'ACTIVE' AND balance >= :min_balance
+            ORDER BY shard_location, account_number
+        """, {'min_balance': amount * limit})
+        by_region = {}
+        for account_number, location in cursor:
+            by_region.setdefault(REGION_BY_LOCATION[location], []).append(account_number)
+        cursor.close()
+    finally:
+        conn.close()
+
+    regions = sorted(by_region)
+    if len(regions) < 2:
+        raise RuntimeError('Need ACTIVE accounts with sufficient balance on at least two shards')
+    pairs = []
+    for i, source in enumerate(regions):
+        destination = regions[(i + 1) % len(regions)]
+        for from_account, to_account in zip(by_region[source], by_region[destination]):
+            pairs.append((source, destination, from_account, to_account))
+    return pairs
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_mode(mode, pairs, transfers, concurrency, amount):
+    """Execute `transfers` transfers with `concurrency` workers; returns the latency report"""
+    local = threading.local()
+    connections = []
+    connections_lock = threading.Lock()
+
+    def connection(region):
+        # One connection per worker and shard, like a pooled app server
+        cache = getattr(local, 'connections', None)
+        if cache is None:
+            cache = local.connections = {}
+        conn = cache.get(region)
+        if conn is None:
+            conn = get_db_connection(shard_region=region)
+            if not conn:
+                raise RuntimeError(f"Database connection failed to shard for region {region}")
+            cache[region] = conn
+            with connections_lock:
+                connections.append(conn)
+        return conn
+
+    def one_transfer(i):
+        source, destination, from_account, to_account = pairs[i % len(pairs)]
+        conn = connection(source)
+        started = time.perf_counter()
+        try:
+            if mode == 'sync':
+                cursor = conn.cursor()
+                cursor.callproc('transfer_money', [from_account, to_account, amount, 'load test'])
+                cursor.close()
+                conn.commit()
+            else:
+                transfer_money_async(conn, from_account, to_account, destination, amount, 'load test')
+            return time.perf_counter() - started, None
+        except Exception as e:
+            conn.rollback()
+            return time.perf_counter() - started, str(e)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one_transfer, range(transfers)))
+    elapsed = time.perf_counter() - started
+    for conn in connections:
+        conn.close()
+
+    latencies = sorted(latency for latency, error in results if error is None)
+    errors = [error for latency, error in results if error is not None]
+    return {
+        'mode': mode,
+        'transfers': transfers,
+        'succeeded': len(latencies),
+        'failed': len(errors),
+        'first_error': errors[0] if errors else None,
+        'seconds': round(elapsed, 3),
+        'transfers_per_second': round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            'p95': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+            'p99': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+            'max': round(latencies[-1] * 1000, 2) if latencies else None
+        }
+    }
+
+def wait_for_outbox(timeout, poll_interval=0.2):
+    """Wait until no PENDING outbox rows remain; returns seconds waited (None on timeout)"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        stats = get_outbox_stats()
+        if all('error' not in s and s['pending'] == 0 for s in stats.values()):
+            return time.perf_counter() - started
+        time.sleep(poll_interval)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sync and async (outbox) cross-shard transfers')
+    parser.add_argument('--mode', choices=['sync', 'async', 'both'], default='both')
+    parser.add_argument('--transfers', type=int, default=1000, help='Transfers per mode')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client workers')
+    parser.add_argument('--amount', type=float, default=0.01, help='Amount per transfer')
+    parser.add_argument('--relay', action='store_true', help='Run an outbox relay in this process during the async run')
+    parser.add_argument('--settle-timeout', type=float, default=300, help='Max seconds to wait for the outbox to drain')
+    args = parser.parse_args()
+
+    pairs = load_cross_shard_pairs(args.amount, args.transfers)
+    print(f"Using {len(pairs)} cross-shard account pairs")
+
+    reports = []
+    for mode in (['sync', 'async'] if args.mode == 'both' else [args.mode]):
+        relay_thread = None
+        stop = threading.Event()
+        if mode == 'async' and args.relay:
+            relay = OutboxRelay()
+
+            def relay_loop():
+                try:
+                    while not stop.is_set():
+                        cycle = relay.run_once()
+                        if not any(s.get('applied') or s.get('rejected') for s in cycle['shards'].values()):
+                            time.sleep(0.05)
+                finally:
+                    relay.close()
+
+            relay_thread = threading.Thread(target=relay_loop, daemon=True)
+            relay_thread.start()
+
+        report = run_mode(mode, pairs, args.transfers, args.concurrency, args.amount)
+        if mode == 'async':
+            drain = wait_for_outbox(args.settle_timeout)
+            report['settle_seconds_after_load'] = round(drain, 3) if drain is not None else None
+            if drain is not None:
+                total = report['seconds'] + drain
+                report['end_to_end_transfers_per_second'] = round(report['succeeded'] / total, 1)
+            report['outbox'] = get_outbox_stats()
+        if relay_thread:
+            stop.set()
+            relay_thread.join()
+        reports.append(report)
+        print(json.dumps(report, indent=2))
+
+    if len(reports) == 2:
+        print("\nmode   tps      p50 ms   p95 ms   p99 ms   settle s")
+        for r in reports:
+            print(f"{r['mode']:<6} {r['transfers_per_second'] or 0:<8} {r['latency_ms']['p50']!s:<8} "
+                  f"{r['latency_ms']['p95']!s:<8} {r['latency_ms']['p99']!s:<8} "
+                  f"{r.get('settle_seconds_after_load', '-')}")
+
+if __name__ == '__main__':
+    main()
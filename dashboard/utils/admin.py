@@ -0,0 +1,28 @@
+"""
+Admin endpoint utilities
+Token protection for /api/admin/* endpoints
+"""
+
+import hmac
+import os
+from functools import wraps
+
+from flask import request, jsonify
+
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+def require_admin(view):
+    """
+    Decorator: require the X-Admin-Token header to match ADMIN_TOKEN
+    Answers 404 when no token is configured (endpoint disabled) and 403 on a wrong token
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'error': 'Admin endpoints are disabled (set ADMIN_TOKEN)'}), 404
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+            return jsonify({'error': 'Invalid or missing X-Admin-Token'}), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,296 @@
+"""
+Admission control utilities
+Per-shard concurrency limits for write endpoints with a short bounded queue
+
+Writes to one shard beyond its limit wait in a queue (at most WRITE_QUEUE_LIMIT
+requests, for at most WRITE_QUEUE_TIMEOUT_MS); anything else is rejected early
+with 429 and Retry-After instead of piling up on row locks and shard sessions.
+
+Limit modes (WRITE_LIMIT_MODE):
+- fixed:    the limit stays at WRITE_CONCURRENCY_LIMIT
+- aimd:     +1/limit per request faster than WRITE_LATENCY_TARGET_MS, x0.9 when slower or failed
+- gradient: limit * (min latency / recent latency) + sqrt(limit) headroom, so the limit
+            shrinks as soon as latency rises above the no-load latency
+"""
+
+import math
+import os
+import threading
+import time
+
+from flask import g, jsonify
+
+from .db import oracledb
+
+WRITE_LIMIT_MODE = os.getenv('WRITE_LIMIT_MODE', 'aimd').lower()
+WRITE_CONCURRENCY_LIMIT = int(os.getenv('WRITE_CONCURRENCY_LIMIT', '8'))
+WRITE_MIN_LIMIT = int(os.getenv('WRITE_MIN_LIMIT', '1'))
+WRITE_MAX_LIMIT = int(os.getenv('WRITE_MAX_LIMIT', '32'))
+WRITE_QUEUE_LIMIT = int(os.getenv('WRITE_QUEUE_LIMIT', '16'))
+WRITE_QUEUE_TIMEOUT_MS = int(os.getenv('WRITE_QUEUE_TIMEOUT_MS', '500'))
+WRITE_LATENCY_TARGET_MS = float(os.getenv('WRITE_LATENCY_TARGET_MS', '250'))
+
+LIMIT_MODES = ('fixed', 'aimd', 'gradient')
+
+# Oracle errors caused by shard pressure rather than by the request itself; business
+# rule violations (ORA-20xxx from the procedures) and bad input are not overload signals
+OVERLOAD_ERROR_CODES = {
+    18,     # maximum number of sessions exceeded
+    20,     # maximum number of processes exceeded
+    54,     # resource busy (NOWAIT)
+    2049,   # timeout: distributed transaction waiting for lock
+    3156,   # call timed out
+    4021,   # timeout occurred while waiting to lock object
+    12516,  # listener could not find available handler
+    12519,  # no appropriate service handler found
+    12520,  # no available handler for the requested server type
+    30006   # resource busy; acquire with WAIT timeout expired
+}
+OVERLOAD_DRIVER_ERRORS = {
+    'DPY-4011',  # connection closed by the database
+    'DPY-4024'   # call timeout exceeded
+}
+
+class AdmissionRejected(Exception):
+    """Raised when a write cannot be admitted to a shard (answered with 429)"""
+
+    def __init__(self, region, reason, retry_after):
+        super().__init__(f"Shard {region} is overloaded ({reason}), retry after {retry_after}s")
+        self.region = region
+        self.reason = reason
+        self.retry_after = retry_after
+
+class ShardLimiter:
+    """
+    Concurrency limit + bounded wait queue for one shard
+
+    acquire() admits immediately while in-flight < limit and nobody is queued,
+    otherwise queues (if the queue has room) until a slot frees up or the deadline passes
+    """
+
+    def __init__(self, region, mode=WRITE_LIMIT_MODE, limit=WRITE_CONCURRENCY_LIMIT,
+                 min_limit=WRITE_MIN_LIMIT, max_limit=WRITE_MAX_LIMIT,
+                 queue_limit=WRITE_QUEUE_LIMIT, queue_timeout_ms=WRITE_QUEUE_TIMEOUT_MS,
+                 latency_target_ms=WRITE_LATENCY_TARGET_MS):
+        if mode not in LIMIT_MODES:
+            raise ValueError(f"Invalid WRITE_LIMIT_MODE: {mode}. Use one of {', '.join(LIMIT_MODES)}")
+        self.region = region
+        self.mode = mode
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.latency_target = latency_target_ms / 1000.0
+        self.in_flight = 0
+        self.waiting = 0
+        self.cond = threading.Condition()
+        # Latency tracking (seconds): EWMA of recent requests and a slowly decaying minimum
+        self.latency_ewma = None
+        self.min_latency = None
+        self.last_decrease = 0.0
+        self.stats = {
+            'admitted': 0,
+            'queued': 0,
+            'rejected_queue_full': 0,
+            'rejected_timeout': 0,
+            'failed': 0,
+            'admitted_after_wait': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0
+        }
+
+    def _has_slot(self):
+        return self.in_flight < int(self.limit)
+
+    def _retry_after(self):
+        """Seconds until the queue ahead is likely to drain (at least 1)"""
+        latency = self.latency_ewma or self.latency_target
+        return max(1, math.ceil(latency * (self.waiting + 1) / max(int(self.limit), 1)))
+
+    def acquire(self):
+        """
+        Take a slot, waiting in the queue if needed
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            AdmissionRejected: Queue full or deadline passed
+        """
+        started = time.monotonic()
+        with self.cond:
+            if self.waiting == 0 and self._has_slot():
+                self.in_flight += 1
+                self.stats['admitted'] += 1
+                return 0.0
+
+            if self.waiting >= self.queue_limit:
+                self.stats['rejected_queue_full'] += 1
+                raise AdmissionRejected(self.region, 'queue full', self._retry_after())
+
+            self.waiting += 1
+            self.stats['queued'] += 1
+            deadline = started + self.queue_timeout
+            try:
+                while not self._has_slot():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['rejected_timeout'] += 1
+                        raise AdmissionRejected(self.region, 'queue timeout', self._retry_after())
+                    self.cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            waited = time.monotonic() - started
+            self.in_flight += 1
+            self.stats['admitted'] += 1
+            self.stats['admitted_after_wait'] += 1
+            self.stats['wait_seconds_total'] += waited
+            self.stats['wait_seconds_max'] = max(self.stats['wait_seconds_max'], waited)
+            return waited
+
+    def release(self, latency, failed=False):
+        """
+        Return a slot and feed the request latency into the adaptive limit
+
+        Args:
+            latency (float): Seconds the request held the slot
+            failed (bool): The write failed on the shard (treated as an overload signal)
+        """
+        with self.cond:
+            # Only grow the limit while it is actually being used
+            saturated = self.in_flight >= self.limit / 2
+            self.in_flight -= 1
+            if failed:
+                self.stats['failed'] += 1
+            self.latency_ewma = latency if self.latency_ewma is None else 0.9 * self.latency_ewma + 0.1 * latency
+            if self.min_latency is None or latency < self.min_latency:
+                self.min_latency = latency
+            else:
+                # Let the no-load latency drift up slowly (plans and data change)
+                self.min_latency *= 1.001
+
+            if self.mode == 'aimd':
+                # Back off at most once per latency window, not once per slow request of a burst
+                now = time.monotonic()
+                if failed or latency > self.latency_target:
+                    if now - self.last_decrease >= self.latency_ewma:
+                        self.limit *= 0.9
+                        self.last_decrease = now
+                elif saturated:
+                    self.limit += 1.0 / self.limit
+            elif self.mode == 'gradient':
+                ratio = self.min_latency / self.latency_ewma if self.latency_ewma > 0 else 1.0
+                gradient = max(0.5, min(1.0, ratio))
+                if failed:
+                    gradient = 0.5
+                new_limit = self.limit * gradient + math.sqrt(self.limit)
+                if saturated or new_limit < self.limit:
+                    self.limit = 0.8 * self.limit + 0.2 * new_limit
+            self.limit = float(max(self.min_limit, min(self.max_limit, self.limit)))
+            self.cond.notify_all()
+
+    def snapshot(self):
+        """Current limit, queue depth and counters"""
+        with self.cond:
+            admitted = self.stats['admitted']
+            waited = self.stats['admitted_after_wait']
+            return {
+                'mode': self.mode,
+                'limit': int(self.limit),
+                'limit_exact': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'queue_depth': self.waiting,
+                'queue_limit': self.queue_limit,
+                'admitted': admitted,
+                'queued': self.stats['queued'],
+                'rejected': self.stats['rejected_queue_full'] + self.stats['rejected_timeout'],
+                'rejected_queue_full': self.stats['rejected_queue_full'],
+                'rejected_timeout': self.stats['rejected_timeout'],
+                'failed': self.stats['failed'],
+                # Average over requests that actually queued (immediate admits wait 0)
+                'avg_wait_ms': round(self.stats['wait_seconds_total'] / waited * 1000, 2) if waited else 0.0,
+                'max_wait_ms': round(self.stats['wait_seconds_max'] * 1000, 2),
+                'latency_ms': round(self.latency_ewma * 1000, 2) if self.latency_ewma is not None else None,
+                'min_latency_ms': round(self.min_latency * 1000, 2) if self.min_latency is not None else None
+            }
+
+_limiters = {region: ShardLimiter(region) for region in ('NA', 'EU', 'APAC')}
+
+def admit_write(region):
+    """
+    Admit the current request's write to a shard; the slot is released when the request ends
+
+    Args:
+        region (str): Shard region ('NA', 'EU', 'APAC')
+
+    Raises:
+        AdmissionRejected: The shard is at its limit and its queue is full or timed out
+    """
+    limiter = _limiters[region.upper()]
+    limiter.acquire()
+    g.admission = (limiter, time.monotonic())
+
+def is_overload_error(error):
+    """
+    Check whether a write error signals shard overload (see OVERLOAD_ERROR_CODES)
+
+    Args:
+        error (Exception): Error raised by the write
+
+    Returns:
+        bool: True for session / process limits, lock and call timeouts and lost connections
+    """
+    if isinstance(error, oracledb.OperationalError):
+        return True
+    if not isinstance(error, oracledb.DatabaseError) or not error.args:
+        return False
+    detail = error.args[0]
+    return (getattr(detail, 'code', None) in OVERLOAD_ERROR_CODES
+            or getattr(detail, 'full_code', None) in OVERLOAD_DRIVER_ERRORS)
+
+def mark_write_failed(error=None):
+    """
+    Report that the current request's admitted write failed on the shard
+    Routes answer errors themselves, so the slot release cannot see them otherwise
+
+    Args:
+        error (Exception, optional): The write error, counted only if it is an overload
+            signal; None for a failed shard connection (always counted)
+    """
+    if error is None or is_overload_error(error):
+        g.admission_failed = True
+
+def get_admission_stats():
+    """Per-shard admission metrics, keyed by region"""
+    return {region: limiter.snapshot() for region, limiter in _limiters.items()}
+
+def init_admission(app):
+    """
+    Release admission slots at request end and answer AdmissionRejected with 429
+
+    Args:
+        app: Flask application
+    """
+    @app.teardown_request
+    def release_slot(exc):
+        # Failures are reported by the routes (mark_write_failed) or are unhandled exceptions;
+        # handled business errors (insufficient balance, ...) are not overload signals
+        admission = g.pop('admission', None)
+        failed = g.pop('admission_failed', False) or exc is not None
+        if admission is not None:
+            limiter, started = admission
+            limiter.release(time.monotonic() - started, failed=failed)
+
+    @app.errorhandler(AdmissionRejected)
+    def admission_rejected(e):
+        response = jsonify({
+            'error': str(e),
+            'shard_region': e.region,
+            'reason': e.reason,
+            'retry_after': e.retry_after
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
@@ -0,0 +1,302 @@
+"""
+Columnar analytics utilities
+Reproduces the dashboard_* catalog views from an extracted Parquet / Arrow dataset
+(see utils/extract.py) with vectorized NumPy kernels, without touching the shards
+
+Every function returns the same keys (lowercase) and value types as cursor_to_dicts()
+returns for the corresponding catalog view, so results can be served by the same API
+"""
+
+import os
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:
+    # numpy/pyarrow are optional - only needed for the extract/analytics tools
+    np = None
+    pa = None
+
+from .db import SHARD_LOCATIONS
+
+# Latest version of a row wins for mutable tables (see EXTRACT_TABLES in extract.py)
+TABLE_KEYS = {
+    'users': 'user_id',
+    'accounts': 'account_number',
+    'transactions': None
+}
+
+SHARD_REGION_BY_LOCATION = {location: region for region, location in SHARD_LOCATIONS.items()}
+
+def require_numpy():
+    """Raise a helpful error if numpy/pyarrow are not installed"""
+    if np is None or pa is None:
+        raise RuntimeError("numpy and pyarrow are required for columnar analytics. Install with: pip install pyarrow numpy")
+
+def _codes(values):
+    """Map an array of hashable values to dense integer codes (unique values, codes)"""
+    return np.unique(values, return_inverse=True)
+
+def _numpy(table, column, dtype=None):
+    """Return a table column as a NumPy array (nulls become NaN / None)"""
+    col = table.column(column)
+    if dtype == 'float':
+        col = pc.fill_null(pc.cast(col, pa.float64()), 0.0)
+    elif dtype == 'int':
+        col = pc.cast(col, pa.int64())
+    elif dtype == 'str':
+        col = pc.fill_null(pc.cast(col, pa.string()), '')
+    return col.to_numpy(zero_copy_only=False)
+
+def latest_versions(table, key):
+    """
+    Keep only the most recent version (max last_updated) of each key
+    Incremental extracts of mutable tables append new versions of changed rows
+
+    Args:
+        table (pyarrow.Table): Extracted rows (possibly several versions per key)
+        key (str): Primary key column
+
+    Returns:
+        pyarrow.Table: One row per key
+    """
+    if table.num_rows == 0:
+        return table
+    _, key_codes = _codes(_numpy(table, key, 'str' if key == 'account_number' else None))
+    if 'last_updated' in table.column_names:
+        updated = pc.fill_null(pc.cast(table.column('last_updated'), pa.int64()), 0).to_numpy(zero_copy_only=False)
+    else:
+        updated = np.zeros(table.num_rows, dtype=np.int64)
+    # Sort by key, then last_updated; the last row of each key run is the latest version
+    order = np.lexsort((updated, key_codes))
+    sorted_keys = key_codes[order]
+    is_last = np.ones(len(order), dtype=bool)
+    is_last[:-1] = sorted_keys[:-1] != sorted_keys[1:]
+    return table.take(pa.array(order[is_last]))
+
+def load_table(dataset_dir, table, file_format='parquet'):
+    """
+    Load one extracted table (all shard partitions) as a pyarrow Table
+
+    Args:
+        dataset_dir (str): Root directory written by extract_shards()
+        table (str): 'users', 'accounts' or 'transactions'
+        file_format (str): 'parquet' or 'arrow'
+
+    Returns:
+        pyarrow.Table: Deduplicated rows, or None if the table was never extracted
+    """
+    require_numpy()
+    path = os.path.join(dataset_dir, table)
+    if not os.path.isdir(path):
+        return None
+    data = ds.dataset(path, format='ipc' if file_format == 'arrow' else 'parquet').to_table()
+    key = TABLE_KEYS.get(table)
+    if key:
+        data = latest_versions(data, key)
+    return data
+
+def load_dataset(dataset_dir, file_format='parquet'):
+    """Load users, accounts and transactions from an extracted dataset"""
+    return {table: load_table(dataset_dir, table, file_format) for table in TABLE_KEYS}
+
+def _transaction_regions(transactions):
+    """
+    Region of each transaction: transactions.region (the routing account's region), ''
+    where it is NULL (left out, as in the views). Extracts written before the column existed
+    use the region of the shard
+    """
+    if 'region' in transactions.column_names:
+        return _numpy(transactions, 'region', 'str')
+    locations = _numpy(transactions, 'shard_location', 'str')
+    unique_locations, codes = _codes(locations)
+    regions = np.array([SHARD_REGION_BY_LOCATION.get(loc, loc) for loc in unique_locations], dtype=object)
+    return regions[codes]
+
+def _transaction_type_stats(types, amounts, group_codes, n_groups):
+    """Per-group counts and amount totals for each transaction type"""
+    stats = {}
+    for txn_type, label in (('DEPOSIT', 'deposit'), ('WITHDRAWAL', 'withdrawal'), ('TRANSFER', 'transfer')):
+        mask = types == txn_type
+        stats[label + 's'] = np.bincount(group_codes[mask], minlength=n_groups)
+        stats['total_' + label + 's'] = np.bincount(group_codes[mask], weights=amounts[mask], minlength=n_groups)
+    return stats
+
+def regional_stats(data):
+    """
+    Vectorized equivalent of dashboard_regional_stats
+
+    Args:
+        data (dict): Tables returned by load_dataset()
+
+    Returns:
+        list: One dict per region, ordered by region
+    """
+    require_numpy()
+    users, accounts, transactions = data.get('users'), data.get('accounts'), data.get('transactions')
+    user_regions = _numpy(users, 'region', 'str') if users is not None else np.array([], dtype=object)
+    account_regions = _numpy(accounts, 'region', 'str') if accounts is not None else np.array([], dtype=object)
+    if transactions is not None:
+        txn_regions = _transaction_regions(transactions)
+        # Transactions without a region are left out, as in dashboard_regional_stats
+        has_region = txn_regions != ''
+        txn_regions = txn_regions[has_region]
+        txn_types = _numpy(transactions, 'transaction_type', 'str')[has_region]
+        txn_amounts = _numpy(transactions, 'amount', 'float')[has_region]
+    else:
+        txn_regions = txn_types = np.array([], dtype=object)
+        txn_amounts = np.array([], dtype=float)
+
+    regions, codes = _codes(np.concatenate([user_regions, account_regions, txn_regions]).astype(str))
+    n = len(regions)
+    user_codes = codes[:len(user_regions)]
+    account_codes = codes[len(user_regions):len(user_regions) + len(account_regions)]
+    txn_codes = codes[len(user_regions) + len(account_regions):]
+
+    total_users = np.bincount(user_codes, minlength=n)
+    total_accounts = np.bincount(account_codes, minlength=n)
+    balances = _numpy(accounts, 'balance', 'float') if accounts is not None else np.array([], dtype=float)
+    total_balance = np.bincount(account_codes, weights=balances, minlength=n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_balance = np.where(total_accounts > 0, total_balance / np.maximum(total_accounts, 1), 0.0)
+
+    total_transactions = np.bincount(txn_codes, minlength=n)
+    type_stats = _transaction_type_stats(txn_types, txn_amounts, txn_codes, n)
+
+    results = []
+    for i, region in enumerate(regions):
+        row = {
+            'region': region,
+            'total_users': float(total_users[i]),
+            'total_accounts': float(total_accounts[i]),
+            'total_transactions': float(total_transactions[i]),
+            'total_balance': float(total_balance[i]),
+            'avg_balance_per_account': round(float(avg_balance[i]), 2)
+        }
+        for key, values in type_stats.items():
+            row[key] = float(values[i])
+        results.append(row)
+    return results
+
+def overall_stats(data):
+    """
+    Vectorized equivalent of dashboard_overall_stats
+
+    Args:
+        data (dict): Tables returned by load_dataset()
+
+    Returns:
+        dict: Single row of overall totals
+    """
+    require_numpy()
+    users, accounts, transactions = data.get('users'), data.get('accounts'), data.get('transactions')
+    balances = _numpy(accounts, 'balance', 'float') if accounts is not None else np.array([], dtype=float)
+    result = {
+        'metric': 'TOTAL',
+        'total_users': float(users.num_rows if users is not None else 0),
+        'total_accounts': float(len(balances)),
+        'total_transactions': float(transactions.num_rows if transactions is not None else 0),
+        'total_balance': float(balances.sum()),
+        'avg_balance_per_account': round(float(balances.mean()), 2) if len(balances) else None
+    }
+
+    if transactions is not None:
+        statuses = _numpy(transactions, 'status', 'str')
+        types = _numpy(transactions, 'transaction_type', 'str')
+        amounts = _numpy(transactions, 'amount', 'float')
+    else:
+        statuses = types = np.array([], dtype=object)
+        amounts = np.array([], dtype=float)
+    for status in ('COMPLETED', 'PENDING', 'FAILED'):
+        result[status.lower() + '_transactions'] = float(np.count_nonzero(statuses == status))
+    for txn_type, label in (('DEPOSIT', 'deposits'), ('WITHDRAWAL', 'withdrawals'), ('TRANSFER', 'transfers')):
+        result['total_' + label] = float(amounts[types == txn_type].sum())
+    return result
+
+def accounts_by_region(data):
+    """
+    Vectorized equivalent of dashboard_accounts_by_region
+
+    Args:
+        data (dict): Tables returned by load_dataset()
+
+    Returns:
+        list: One dict per (region, account_type), ordered by region, account_type
+    """
+    require_numpy()
+    accounts = data.get('accounts')
+    if accounts is None or accounts.num_rows == 0:
+        return []
+    group_keys = np.char.add(np.char.add(_numpy(accounts, 'region', 'str').astype(str), '|'),
+                             _numpy(accounts, 'account_type', 'str').astype(str))
+    groups, codes = _codes(group_keys)
+    n = len(groups)
+    balances = _numpy(accounts, 'balance', 'float')
+
+    counts = np.bincount(codes, minlength=n)
+    totals = np.bincount(codes, weights=balances, minlength=n)
+    mins = np.full(n, np.inf)
+    maxs = np.full(n, -np.inf)
+    np.minimum.at(mins, codes, balances)
+    np.maximum.at(maxs, codes, balances)
+
+    results = []
+    for i, group in enumerate(groups):
+        region, account_type = group.split('|')
+        results.append({
+            'region': region,
+            'account_type': account_type,
+            'account_count': float(counts[i]),
+            'total_balance': float(totals[i]),
+            'avg_balance': round(float(totals[i] / counts[i]), 2),
+            'min_balance': float(mins[i]),
+            'max_balance': float(maxs[i])
+        })
+    return results
+
+def transactions_by_date(data, days=30, now=None):
+    """
+    Vectorized equivalent of dashboard_transactions_by_date
+
+    Args:
+        data (dict): Tables returned by load_dataset()
+        days (int): Look-back window in days (the view uses 30)
+        now (datetime, optional): Reference time (default: current time)
+
+    Returns:
+        list: One dict per day, most recent first
+    """
+    require_numpy()
+    transactions = data.get('transactions')
+    if transactions is None or transactions.num_rows == 0:
+        return []
+    # Whole days, as in the view (TRUNC(SYSDATE) - days)
+    cutoff = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    dates = pc.cast(transactions.column('transaction_date'), pa.timestamp('us'))
+    recent = transactions.filter(pc.greater_equal(dates, pa.scalar(cutoff, pa.timestamp('us'))))
+    if recent.num_rows == 0:
+        return []
+
+    day_strings = pc.strftime(pc.cast(recent.column('transaction_date'), pa.timestamp('us')),
+                              format='%Y-%m-%d').to_numpy(zero_copy_only=False)
+    days_unique, codes = _codes(day_strings)
+    n = len(days_unique)
+    amounts = _numpy(recent, 'amount', 'float')
+    counts = np.bincount(codes, minlength=n)
+    totals = np.bincount(codes, weights=amounts, minlength=n)
+    type_stats = _transaction_type_stats(_numpy(recent, 'transaction_type', 'str'), amounts, codes, n)
+
+    results = []
+    for i in range(n - 1, -1, -1):
+        results.append({
+            'transaction_date': days_unique[i],
+            'transaction_count': float(counts[i]),
+            'total_amount': float(totals[i]),
+            'deposits': float(type_stats['deposits'][i]),
+            'withdrawals': float(type_stats['withdrawals'][i]),
+            'transfers': float(type_stats['transfers'][i])
+        })
+    return results
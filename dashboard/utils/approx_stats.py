@@ -0,0 +1,160 @@
+"""
+Approximate dashboard statistics
+Same keys as dashboard_regional_stats / dashboard_overall_stats, computed without
+the cross-link join of users_all and accounts_all:
+
+- distinct users / accounts come from per-shard HyperLogLog sketches merged in the app
+- sums and counts are additive, so they are aggregated on each shard and added up
+  (these stay exact)
+
+All shards are queried in parallel over direct shard connections.
+"""
+
+from .db import get_db_connection, run_per_shard
+from .sketches import hll_registers_sql, grouped_from_rows, merge_grouped, merge_all, error_bound
+
+USER_SKETCH_SQL = hll_registers_sql('user_id', 'users', group_expr='UPPER(region)')
+ACCOUNT_SKETCH_SQL = hll_registers_sql('account_number', 'accounts', group_expr='UPPER(region)')
+
+ACCOUNT_TOTALS_SQL = """
+    SELECT UPPER(region) AS region, COUNT(*) AS account_rows, COALESCE(SUM(balance), 0) AS total_balance
+    FROM accounts
+    GROUP BY UPPER(region)
+"""
+
+# Transactions carry the region of their routing account (transactions.region),
+# so they are grouped without a join to accounts
+TRANSACTION_TOTALS_SQL = """
+    SELECT
+        UPPER(t.region) AS region,
+        COUNT(*) AS total_transactions,
+        COUNT(CASE WHEN t.transaction_type = 'DEPOSIT' THEN 1 END) AS deposits,
+        COUNT(CASE WHEN t.transaction_type = 'WITHDRAWAL' THEN 1 END) AS withdrawals,
+        COUNT(CASE WHEN t.transaction_type = 'TRANSFER' THEN 1 END) AS transfers,
+        COALESCE(SUM(CASE WHEN t.transaction_type = 'DEPOSIT' THEN t.amount ELSE 0 END), 0) AS total_deposits,
+        COALESCE(SUM(CASE WHEN t.transaction_type = 'WITHDRAWAL' THEN t.amount ELSE 0 END), 0) AS total_withdrawals,
+        COALESCE(SUM(CASE WHEN t.transaction_type = 'TRANSFER' THEN t.amount ELSE 0 END), 0) AS total_transfers,
+        COUNT(CASE WHEN t.status = 'COMPLETED' THEN 1 END) AS completed_transactions,
+        COUNT(CASE WHEN t.status = 'PENDING' THEN 1 END) AS pending_transactions,
+        COUNT(CASE WHEN t.status = 'FAILED' THEN 1 END) AS failed_transactions
+    FROM transactions t
+    GROUP BY UPPER(t.region)
+"""
+
+TRANSACTION_FIELDS = [
+    'total_transactions', 'deposits', 'withdrawals', 'transfers',
+    'total_deposits', 'total_withdrawals', 'total_transfers',
+    'completed_transactions', 'pending_transactions', 'failed_transactions'
+]
+
+def _shard_aggregates(region):
+    """Sketches and additive totals for one shard"""
+    conn = get_db_connection(shard_region=region)
+    if not conn:
+        raise RuntimeError(f"Database connection failed to shard for region {region}")
+    try:
+        cursor = conn.cursor()
+        cursor.arraysize = 5000
+        cursor.execute(USER_SKETCH_SQL)
+        users = grouped_from_rows(cursor.fetchall())
+        cursor.execute(ACCOUNT_SKETCH_SQL)
+        accounts = grouped_from_rows(cursor.fetchall())
+        cursor.execute(ACCOUNT_TOTALS_SQL)
+        account_totals = {row[0]: (int(row[1]), float(row[2])) for row in cursor}
+        cursor.execute(TRANSACTION_TOTALS_SQL)
+        transaction_totals = {row[0]: [float(v) for v in row[1:]] for row in cursor}
+        cursor.close()
+    finally:
+        conn.close()
+    return {
+        'users': users,
+        'accounts': accounts,
+        'account_totals': account_totals,
+        'transaction_totals': transaction_totals
+    }
+
+def _collect():
+    """Merge the per-shard aggregates; returns per-region sketches and totals"""
+    shards = list(run_per_shard(_shard_aggregates).values())
+    users = merge_grouped(s['users'] for s in shards)
+    accounts = merge_grouped(s['accounts'] for s in shards)
+    account_totals = {}
+    transaction_totals = {}
+    for shard in shards:
+        for region, (rows, balance) in shard['account_totals'].items():
+            totals = account_totals.setdefault(region, [0, 0.0])
+            totals[0] += rows
+            totals[1] += balance
+        for region, values in shard['transaction_totals'].items():
+            totals = transaction_totals.setdefault(region, [0.0] * len(TRANSACTION_FIELDS))
+            for i, value in enumerate(values):
+                totals[i] += value
+    return users, accounts, account_totals, transaction_totals
+
+def approximate_regional_stats():
+    """
+    Approximate equivalent of dashboard_regional_stats
+
+    Returns:
+        list: One dict per region (ordered by region), with 'approximate' and 'error_bound'
+    """
+    users, accounts, account_totals, transaction_totals = _collect()
+    bound = error_bound()
+    results = []
+    regions = sorted((set(users) | set(accounts) | set(transaction_totals)) - {None})
+    for region in regions:
+        account_rows, total_balance = account_totals.get(region, (0, 0.0))
+        txn = dict(zip(TRANSACTION_FIELDS, transaction_totals.get(region, [0.0] * len(TRANSACTION_FIELDS))))
+        results.append({
+            'region': region,
+            'total_users': float(round(users[region].estimate())) if region in users else 0.0,
+            'total_accounts': float(round(accounts[region].estimate())) if region in accounts else 0.0,
+            'total_transactions': txn['total_transactions'],
+            'total_balance': total_balance,
+            'avg_balance_per_account': round(total_balance / account_rows, 2) if account_rows else 0.0,
+            'deposits': txn['deposits'],
+            'withdrawals': txn['withdrawals'],
+            'transfers': txn['transfers'],
+            'total_deposits': txn['total_deposits'],
+            'total_withdrawals': txn['total_withdrawals'],
+            'total_transfers': txn['total_transfers'],
+            'approximate': True,
+            'error_bound': bound
+        })
+    return results
+
+def approximate_overall_stats():
+    """
+    Approximate equivalent of dashboard_overall_stats
+    Regional sketches are merged again, so the totals count each user / account once
+
+    Returns:
+        dict: Overall statistics with 'approximate' and 'error_bound'
+    """
+    users, accounts, account_totals, transaction_totals = _collect()
+    total_users = merge_all(users.values())
+    total_accounts = merge_all(accounts.values())
+
+    account_rows = sum(rows for rows, _ in account_totals.values())
+    total_balance = sum(balance for _, balance in account_totals.values())
+    txn = [0.0] * len(TRANSACTION_FIELDS)
+    for values in transaction_totals.values():
+        txn = [a + b for a, b in zip(txn, values)]
+    txn = dict(zip(TRANSACTION_FIELDS, txn))
+
+    return {
+        'metric': 'TOTAL',
+        'total_users': float(round(total_users.estimate())),
+        'total_accounts': float(round(total_accounts.estimate())),
+        'total_transactions': txn['total_transactions'],
+        'total_balance': total_balance,
+        'avg_balance_per_account': round(total_balance / account_rows, 2) if account_rows else 0.0,
+        'completed_transactions': txn['completed_transactions'],
+        'pending_transactions': txn['pending_transactions'],
+        'failed_transactions': txn['failed_transactions'],
+        'total_deposits': txn['total_deposits'],
+        'total_withdrawals': txn['total_withdrawals'],
+        'total_transfers': txn['total_transfers'],
+        'approximate': True,
+        'error_bound': error_bound()
+    }
@@ -0,0 +1,458 @@
+"""
+Synthetic data generation utilities
+Loads large, realistic datasets into every shard in parallel for scale testing
+
+Per shard (all shards run concurrently, one session each):
+- users get explicit user_ids from the region's range (NA 1-10M, EU 10M+1-20M,
+  APAC 20M+1-30M), continuing after the highest existing id / sequence value
+- accounts are co-located with their user (same shard, same region) and get
+  globally unique account numbers (ACC-<region>-<account_id>)
+- transactions are spread over the shard's ACTIVE accounts (Zipf skew: a few hot
+  accounts, a long tail) and over the last `history_days` days; they are stored on
+  the routing account's shard with region filled in, and transfers stay on the shard
+  (cross-shard traffic is what transfer_load.py is for)
+- balances end up as the opening balance plus the generated net flows, so ledger
+  reconciliation sees consistent accounts
+
+Rows are sent with array DML (executemany) and committed in large batches.
+Load modes:
+- conventional: regular inserts, the row triggers fire
+- no-triggers:  triggers are disabled during the load; the generator supplies every
+                value they would set (ids, account numbers, region, currency)
+- direct:       no-triggers + foreign keys disabled + direct-path inserts
+                (APPEND_VALUES, one commit per batch); foreign keys are validated
+                again when the load ends
+
+Triggers and constraints are disabled for the whole table, so the no-triggers and
+direct modes are meant for quiet test deployments.
+"""
+
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from .db import get_db_connection, run_per_shard, oracledb
+
+USER_ID_RANGES = {
+    'NA': (1, 10000000),
+    'EU': (10000001, 20000000),
+    'APAC': (20000001, 30000000)
+}
+
+USER_SEQUENCES = {
+    'NA': 'USER_SEQ_NA',
+    'EU': 'USER_SEQ_EU',
+    'APAC': 'USER_SEQ_APAC'
+}
+
+LOAD_MODES = ('conventional', 'no-triggers', 'direct')
+
+LOAD_TABLES = ['USERS', 'ACCOUNTS', 'TRANSACTIONS']
+
+ACCOUNT_TYPES = (('CHECKING', 0.60), ('SAVINGS', 0.35), ('BUSINESS', 0.05))
+ACCOUNT_STATUSES = (('ACTIVE', 0.97), ('INACTIVE', 0.02), ('FROZEN', 0.01))
+TRANSACTION_TYPES = (('DEPOSIT', 0.40), ('WITHDRAWAL', 0.30), ('TRANSFER', 0.30))
+FAILED_RATIO = 0.01
+
+# Accounts / transaction types are drawn this many at a time (random.choices with k)
+SAMPLE_CHUNK = 10000
+
+FIRST_NAMES = ['James', 'Mary', 'Wei', 'Aiko', 'Lukas', 'Sofia', 'Arjun', 'Fatima', 'Carlos', 'Emma',
+               'Hiroshi', 'Olga', 'Kwame', 'Priya', 'Liam', 'Chloe', 'Mateo', 'Mei', 'Noah', 'Amara']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Tanaka', 'Muller', 'Rossi', 'Patel', 'Khan', 'Silva', 'Dubois',
+              'Kim', 'Nguyen', 'Johnson', 'Ivanova', 'Okafor', 'Lopez', 'Schmidt', 'Singh', 'Brown', 'Sato']
+STREETS = ['Main St', 'Oak Ave', 'Pine Rd', 'Elm St', 'Maple Dr', 'High St', 'Park Ln', 'Station Rd']
+
+INSERT_SQL = {
+    'users': """
+        INSERT {hint}INTO users (user_id, username, email, full_name, phone, address,
+                                 region, created_date, last_updated)
+        VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9)
+    """,
+    'accounts': """
+        INSERT {hint}INTO accounts (account_id, user_id, account_number, account_type, balance,
+                                    currency, region, status, created_date, last_updated)
+        VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10)
+    """,
+    'transactions': """
+        INSERT {hint}INTO transactions (account_number, region, from_account_number, to_account_number,
+                                        transaction_type, amount, currency, status, transaction_date,
+                                        description, reference_number)
+        VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11)
+    """
+}
+
+# Bind types by position (None = inferred), so a NULL in the first row of a batch
+# does not fix the bind type of that column
+INPUT_SIZES = {
+    'users': [None, 50, 100, 100, 20, 200, 50, oracledb.DB_TYPE_DATE, oracledb.DB_TYPE_DATE],
+    'accounts': [None, None, 20, 20, None, 3, 50, 10, oracledb.DB_TYPE_DATE, oracledb.DB_TYPE_DATE],
+    'transactions': [20, 10, 20, 20, 20, None, 3, 20, oracledb.DB_TYPE_TIMESTAMP, 200, 50]
+}
+
+UPDATE_BALANCE_SQL = """
+    UPDATE accounts
+    SET balance = :1, last_updated = SYSDATE
+    WHERE account_number = :2
+"""
+
+def _batches(rows, size):
+    """Split an iterable of rows into lists of at most `size` rows"""
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _rate(rows, seconds):
+    return {
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None
+    }
+
+class _BatchLoader:
+    """Array inserts into one shard with a commit every `commit_every` rows"""
+
+    def __init__(self, conn, load_mode, batch_size, commit_every):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.direct = load_mode == 'direct'
+        self.batch_size = batch_size
+        # A direct-path insert must be committed before the table is modified again (ORA-12838)
+        self.commit_every = batch_size if self.direct else max(commit_every, batch_size)
+
+    def load(self, table, rows):
+        """Insert rows into a table; returns rows / seconds / rows_per_second"""
+        sql = INSERT_SQL[table].format(hint='/*+ APPEND_VALUES */ ' if self.direct else '')
+        started = time.perf_counter()
+        total = 0
+        uncommitted = 0
+        for batch in _batches(rows, self.batch_size):
+            self.cursor.setinputsizes(*INPUT_SIZES[table])
+            self.cursor.executemany(sql, batch)
+            total += len(batch)
+            uncommitted += len(batch)
+            if uncommitted >= self.commit_every:
+                self.conn.commit()
+                uncommitted = 0
+        self.conn.commit()
+        return _rate(total, time.perf_counter() - started)
+
+    def update_balances(self, balances):
+        """Write final balances ((balance, account_number) pairs)"""
+        started = time.perf_counter()
+        total = 0
+        uncommitted = 0
+        for batch in _batches(balances, self.batch_size):
+            self.cursor.executemany(UPDATE_BALANCE_SQL, batch)
+            total += len(batch)
+            uncommitted += len(batch)
+            if uncommitted >= self.commit_every:
+                self.conn.commit()
+                uncommitted = 0
+        self.conn.commit()
+        return _rate(total, time.perf_counter() - started)
+
+def _next_id(cursor, max_sql, params, sequence, low):
+    """First free id: above both the table's highest id and the sequence's next value"""
+    cursor.execute(max_sql, params)
+    max_id = cursor.fetchone()[0]
+    cursor.execute("SELECT last_number FROM user_sequences WHERE sequence_name = :1", [sequence])
+    row = cursor.fetchone()
+    candidates = [low]
+    if max_id is not None:
+        candidates.append(int(max_id) + 1)
+    if row is not None:
+        candidates.append(int(row[0]))
+    return max(candidates)
+
+def _advance_sequence(cursor, max_sql, params, sequence):
+    """Restart a sequence after the highest id in use (never moves it backwards)"""
+    cursor.execute(max_sql, params)
+    max_id = cursor.fetchone()[0]
+    cursor.execute("SELECT last_number, max_value FROM user_sequences WHERE sequence_name = :1", [sequence])
+    row = cursor.fetchone()
+    if max_id is None or row is None:
+        return
+    next_id = int(max_id) + 1
+    if row[0] < next_id <= row[1]:
+        cursor.execute(f"ALTER SEQUENCE {sequence} RESTART START WITH {next_id}")
+
+def _user_sql(region):
+    low, high = USER_ID_RANGES[region]
+    return "SELECT MAX(user_id) FROM users WHERE user_id BETWEEN :1 AND :2", [low, high]
+
+def _disable_for_load(cursor, load_mode, disabled):
+    """Disable triggers (and foreign keys for direct path) for the load
+
+    Each item is appended to disabled as soon as it is disabled, so a failure partway through
+    still leaves the list of what has to be restored.
+
+    Args:
+        cursor: Cursor on the shard
+        load_mode: 'conventional', 'no-triggers' or 'direct'
+        disabled: List receiving (table, None) for triggers and (table, constraint) for foreign keys
+    """
+    if load_mode == 'conventional':
+        return
+    for table in LOAD_TABLES:
+        cursor.execute(f"ALTER TABLE {table} DISABLE ALL TRIGGERS")
+        disabled.append((table, None))
+    if load_mode == 'direct':
+        # Direct-path inserts silently fall back to conventional ones on tables with enabled foreign keys
+        cursor.execute("""
+            SELECT table_name, constraint_name
+            FROM user_constraints
+            WHERE constraint_type = 'R'
+              AND status = 'ENABLED'
+              AND table_name IN ('USERS', 'ACCOUNTS', 'TRANSACTIONS')
+        """)
+        for table, constraint in cursor.fetchall():
+            cursor.execute(f"ALTER TABLE {table} DISABLE CONSTRAINT {constraint}")
+            disabled.append((table, constraint))
+
+def _restore_after_load(cursor, disabled):
+    """Re-enable the triggers and validate the foreign keys disabled for the load
+
+    Every item is restored on its own, so one failure (e.g. a foreign key that no longer
+    validates) does not leave the others disabled.
+
+    Args:
+        cursor: Cursor on the shard
+        disabled: Items recorded by _disable_for_load
+
+    Returns:
+        list: Error messages of the items that could not be restored
+    """
+    errors = []
+    for table, constraint in disabled:
+        if constraint is None:
+            sql = f"ALTER TABLE {table} ENABLE ALL TRIGGERS"
+        else:
+            sql = f"ALTER TABLE {table} ENABLE VALIDATE CONSTRAINT {constraint}"
+        try:
+            cursor.execute(sql)
+        except Exception as e:
+            print(f"Error restoring after load ({sql}): {e}")
+            errors.append(f"{sql}: {e}")
+    return errors
+
+def _finish_load(cursor, disabled, sequences):
+    """Restore the disabled triggers/foreign keys, bump the data generation and advance the sequences
+
+    Runs every step even when an earlier one fails; failures are printed and returned instead
+    of raised, so they never hide the exception that ended the load.
+
+    Args:
+        cursor: Cursor on the shard
+        disabled: Items recorded by _disable_for_load
+        sequences: (max_sql, params, sequence) tuples for _advance_sequence
+
+    Returns:
+        list: Error messages of the steps that failed
+    """
+    errors = _restore_after_load(cursor, disabled)
+    if disabled:
+        # The data_generation triggers were disabled too: move the dashboard data version once
+        try:
+            cursor.execute("BEGIN bump_data_generation; END;")
+            cursor.connection.commit()
+        except Exception as e:
+            print(f"Error bumping data generation: {e}")
+            errors.append(f"bump_data_generation: {e}")
+    for max_sql, params, sequence in sequences:
+        try:
+            _advance_sequence(cursor, max_sql, params, sequence)
+        except Exception as e:
+            print(f"Error advancing sequence {sequence}: {e}")
+            errors.append(f"{sequence}: {e}")
+    return errors
+
+def _weighted(rng, choices):
+    values = [value for value, _ in choices]
+    weights = [weight for _, weight in choices]
+    return lambda k=1: rng.choices(values, weights=weights, k=k)
+
+def _user_rows(rng, region, first_user_id, count, created_before):
+    for user_id in range(first_user_id, first_user_id + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        username = f"{first.lower()}_{last.lower()}_{user_id}"
+        created = created_before - timedelta(days=rng.uniform(30, 395))
+        yield (user_id, username, f"{username}@example.com", f"{first} {last}",
+               f"555-{rng.randint(0, 9999):04d}", f"{rng.randint(1, 9999)} {rng.choice(STREETS)}",
+               region, created, created)
+
+def _account_rows(rng, region, first_user_id, users, first_account_id, accounts_per_user, created_before):
+    account_type = _weighted(rng, ACCOUNT_TYPES)
+    account_status = _weighted(rng, ACCOUNT_STATUSES)
+    account_id = first_account_id
+    for user_id in range(first_user_id, first_user_id + users):
+        for _ in range(rng.randint(1, accounts_per_user)):
+            # Opening balance: log-normal, median about $3,000
+            balance = round(min(rng.lognormvariate(8, 1.2), 10000000), 2)
+            created = created_before - timedelta(days=rng.uniform(0, 30))
+            yield (account_id, user_id, f"ACC-{region}-{account_id}", account_type()[0], balance,
+                   'USD', region, account_status()[0], created, created)
+            account_id += 1
+
+def _transaction_rows(rng, region, accounts, balances, count, skew, history_start, history_days, run_id):
+    """
+    Transactions over `accounts` (account numbers), updating `balances` (cents, same order)
+    Withdrawals and transfers that would overdraw the account become deposits
+    """
+    if not accounts or count <= 0:
+        return
+    # Zipf weights over a shuffled account order, so hot accounts are spread over all users
+    order = list(range(len(accounts)))
+    rng.shuffle(order)
+    cum_weights = list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, len(order) + 1)))
+    transaction_type = _weighted(rng, TRANSACTION_TYPES)
+    history_seconds = history_days * 86400
+    produced = 0
+    while produced < count:
+        k = min(SAMPLE_CHUNK, count - produced)
+        sources = rng.choices(order, cum_weights=cum_weights, k=k)
+        destinations = rng.choices(order, cum_weights=cum_weights, k=k)
+        kinds = transaction_type(k)
+        for source, destination, kind in zip(sources, destinations, kinds):
+            produced += 1
+            amount_cents = max(1, min(int(rng.lognormvariate(9, 1.1)), 5000000))  # median about $81
+            failed = rng.random() < FAILED_RATIO
+            if kind != 'DEPOSIT' and balances[source] < amount_cents:
+                kind = 'DEPOSIT'
+            if kind == 'TRANSFER' and destination == source:
+                kind = 'WITHDRAWAL'
+
+            number = accounts[source]
+            from_account = to_account = None
+            if kind == 'DEPOSIT':
+                to_account = number
+            else:
+                from_account = number
+                if kind == 'TRANSFER':
+                    to_account = accounts[destination]
+            if not failed:
+                if from_account is not None:
+                    balances[source] -= amount_cents
+                if kind == 'DEPOSIT':
+                    balances[source] += amount_cents
+                elif kind == 'TRANSFER':
+                    balances[destination] += amount_cents
+
+            transaction_date = history_start + timedelta(seconds=rng.random() * history_seconds)
+            yield (number, region, from_account, to_account, kind, amount_cents / 100.0, 'USD',
+                   'FAILED' if failed else 'COMPLETED', transaction_date,
+                   'Generated', f"GEN-{run_id}-{region}-{produced}")
+
+def generate_data(users=10000, accounts_per_user=3, transactions=100000, regions=None,
+                  load_mode='conventional', batch_size=10000, commit_every=100000,
+                  skew=1.0, history_days=365, seed=None, gather_stats=True):
+    """
+    Generate users, accounts and transactions on every shard in parallel
+
+    Args:
+        users (int): Users per shard
+        accounts_per_user (int): Accounts per user (uniform between 1 and this)
+        transactions (int): Transactions per shard (over all ACTIVE accounts of the shard)
+        regions (list, optional): Shard regions to load (default: all)
+        load_mode (str): 'conventional', 'no-triggers' or 'direct'
+        batch_size (int): Rows per array insert
+        commit_every (int): Rows per commit (direct mode commits every batch)
+        skew (float): Zipf exponent of the transactions per account (0 = uniform)
+        history_days (float): Transaction dates are spread over this many past days
+        seed (int, optional): Random seed (per shard) for reproducible datasets
+        gather_stats (bool): Gather optimizer statistics on the loaded tables
+
+    Returns:
+        dict: Region -> {table: {'rows', 'seconds', 'rows_per_second'}, 'total': {...}}
+    """
+    if load_mode not in LOAD_MODES:
+        raise ValueError(f"Invalid load mode: {load_mode}. Must be one of {', '.join(LOAD_MODES)}")
+    if users < 0 or transactions < 0 or accounts_per_user < 1:
+        raise ValueError('users and transactions must be >= 0 and accounts_per_user >= 1')
+    if batch_size < 1 or commit_every < 1:
+        raise ValueError('batch_size and commit_every must be at least 1')
+    if skew < 0 or history_days < 0:
+        raise ValueError('skew and history_days must be >= 0')
+
+    now = datetime.now().replace(microsecond=0)
+    history_start = now - timedelta(days=history_days)
+    run_id = now.strftime('%Y%m%d%H%M%S')
+
+    def generate_region(region):
+        rng = random.Random(f"{seed}-{region}") if seed is not None else random.Random()
+        low, high = USER_ID_RANGES[region]
+        conn = get_db_connection(shard_region=region)
+        if not conn:
+            raise RuntimeError(f"Database connection failed to shard for region {region}")
+
+        results = {}
+        started = time.perf_counter()
+        try:
+            cursor = conn.cursor()
+            cursor.arraysize = 10000
+            user_sql, user_params = _user_sql(region)
+            first_user_id = _next_id(cursor, user_sql, user_params, USER_SEQUENCES[region], low)
+            if first_user_id + users - 1 > high:
+                raise ValueError(f"{users} more users do not fit in the {region} user_id range "
+                                 f"({low}-{high}, next free id {first_user_id})")
+            first_account_id = _next_id(cursor, "SELECT MAX(account_id) FROM accounts", [], 'ACCOUNT_SEQ', 1)
+
+            loader = _BatchLoader(conn, load_mode, batch_size, commit_every)
+            disabled = []
+            try:
+                _disable_for_load(cursor, load_mode, disabled)
+                results['users'] = loader.load(
+                    'users', _user_rows(rng, region, first_user_id, users, history_start))
+                results['accounts'] = loader.load(
+                    'accounts', _account_rows(rng, region, first_user_id, users, first_account_id,
+                                              accounts_per_user, history_start))
+
+                # Transactions use every ACTIVE account of the shard (existing ones included)
+                cursor.execute("""
+                    SELECT account_number, ROUND(balance * 100)
+                    FROM accounts
+                    WHERE status = 'ACTIVE'
+                    ORDER BY account_number
+                """)
+                rows = cursor.fetchall()
+                accounts = [row[0] for row in rows]
+                opening = [int(row[1] or 0) for row in rows]
+                balances = list(opening)
+                results['transactions'] = loader.load(
+                    'transactions', _transaction_rows(rng, region, accounts, balances, transactions,
+                                                      skew, history_start, history_days, run_id))
+                results['balances'] = loader.update_balances(
+                    (balances[i] / 100.0, accounts[i]) for i in range(len(accounts)) if balances[i] != opening[i])
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                # Errors here are only printed so they never replace the exception that ended the load
+                finish_errors = _finish_load(cursor, disabled, [
+                    (user_sql, user_params, USER_SEQUENCES[region]),
+                    ("SELECT MAX(account_id) FROM accounts", [], 'ACCOUNT_SEQ'),
+                ])
+            if finish_errors:
+                raise RuntimeError(f"Load on {region} finished but could not be cleaned up: "
+                                   + '; '.join(finish_errors))
+
+            if gather_stats:
+                stats_started = time.perf_counter()
+                for table in LOAD_TABLES:
+                    cursor.execute("BEGIN DBMS_STATS.GATHER_TABLE_STATS(USER, :1); END;", [table])
+                results['gather_stats_seconds'] = round(time.perf_counter() - stats_started, 3)
+            cursor.close()
+        finally:
+            conn.close()
+
+        inserted = sum(results[table]['rows'] for table in ('users', 'accounts', 'transactions'))
+        results['total'] = _rate(inserted, time.perf_counter() - started)
+        print(f"Generated {inserted} rows on {region} in {results['total']['seconds']}s "
+              f"({results['total']['rows_per_second']} rows/s)")
+        return results
+
+    return run_per_shard(generate_region, regions=regions)
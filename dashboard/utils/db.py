@@ -4,6 +4,7 @@ Handles connections to catalog and shard databases
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 try:
     import oracledb
     # Use python-oracledb (thick mode is optional, works in thin mode without Oracle Client)
@@ -26,6 +27,71 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', 'BankAppPass123')
 }
 
+# Shard layout (region -> shard_location as exposed by the catalog union views)
+SHARD_REGIONS = ['NA', 'EU', 'APAC']
+SHARD_LOCATIONS = {
+    'NA': 'SHARD1',
+    'EU': 'SHARD2',
+    'APAC': 'SHARD3'
+}
+
+def run_per_shard(task, regions=None, max_workers=None):
+    """
+    Run task(region) for every shard region in parallel
+    Each task is expected to open (and close) its own shard connection
+    
+    Args:
+        task (callable): Function taking a region ('NA', 'EU', 'APAC')
+        regions (list, optional): Regions to run on (default: all shards)
+        max_workers (int, optional): Thread pool size (default: one per region)
+    
+    Returns:
+        dict: Region -> task result (exceptions are re-raised)
+    """
+    regions = [r.upper() for r in (regions or SHARD_REGIONS)]
+    with ThreadPoolExecutor(max_workers=max_workers or len(regions)) as executor:
+        futures = {region: executor.submit(task, region) for region in regions}
+        return {region: future.result() for region, future in futures.items()}
+
+# Shard addresses (region -> host, port); inside Docker the container hostnames are used
+SHARD_ADDRESSES = {
+    'docker': {
+        'NA': ('oracle-shard1', 1521),
+        'EU': ('oracle-shard2', 1521),
+        'APAC': ('oracle-shard3', 1521)
+    },
+    'local': {
+        'NA': ('localhost', 1522),   # Shard 1 mapped to 1522
+        'EU': ('localhost', 1523),   # Shard 2 mapped to 1523
+        'APAC': ('localhost', 1524)  # Shard 3 mapped to 1524
+    }
+}
+
+# Round-trip pipelining (outbox relay batches) needs python-oracledb 2.4+ (asyncio
+# connections) and Oracle Database 23ai to overlap the operations (older databases
+# run them one by one, still correctly)
+PIPELINING_AVAILABLE = hasattr(oracledb, 'create_pipeline') and hasattr(oracledb, 'connect_async')
+
+def get_db_address(shard_region=None):
+    """
+    Resolve host and port of a shard (or of the catalog if shard_region is None)
+    
+    Args:
+        shard_region (str, optional): Region ('NA', 'EU', 'APAC')
+    
+    Returns:
+        tuple: (host, port)
+    """
+    is_docker = os.path.exists('/.dockerenv')
+    if shard_region:
+        host_port = SHARD_ADDRESSES['docker' if is_docker else 'local'].get(shard_region.upper())
+        if not host_port:
+            raise ValueError(f"Invalid region: {shard_region}. Must be NA, EU, or APAC")
+        return host_port
+    if is_docker:
+        return 'oracle-catalog', 1521
+    return DB_CONFIG['host'], DB_CONFIG['port']  # Default: localhost:1521
+
 def get_db_connection(shard_region=None):
     """
     Create and return database connection
@@ -41,43 +107,13 @@ def get_db_connection(shard_region=None):
     Returns:
         Connection object or None if connection fails
     """
-    is_docker = os.path.exists('/.dockerenv')
-    
     try:
         # Use oracledb (works in thin mode without Oracle Client)
+        host, port = get_db_address(shard_region)
         if shard_region:
-            # Connect to specific shard based on region
-            region_upper = shard_region.upper()
-            
-            if is_docker:
-                # Inside Docker: use Docker hostnames and internal port 1521
-                shard_map = {
-                    'NA': ('oracle-shard1', 1521),
-                    'EU': ('oracle-shard2', 1521),
-                    'APAC': ('oracle-shard3', 1521)
-                }
-            else:
-                # Outside Docker: use localhost with mapped ports
-                shard_map = {
-                    'NA': ('localhost', 1522),   # Shard 1 mapped to 1522
-                    'EU': ('localhost', 1523),   # Shard 2 mapped to 1523
-                    'APAC': ('localhost', 1524)  # Shard 3 mapped to 1524
-                }
-            
-            host_port = shard_map.get(region_upper)
-            if not host_port:
-                raise ValueError(f"Invalid region: {shard_region}. Must be NA, EU, or APAC")
-            
-            host, port = host_port
-            print(f"Connecting to shard for region {region_upper} at {host}:{port}")
+            print(f"Connecting to shard for region {shard_region.upper()} at {host}:{port}")
         else:
             # Connect to catalog (for SELECT queries via union views)
-            if is_docker:
-                host = 'oracle-catalog'
-                port = 1521
-            else:
-                host = DB_CONFIG['host']  # Default: localhost
-                port = DB_CONFIG['port']    # Default: 1521
             print(f"Connecting to catalog at {host}:{port}")
         
         # Create connection string
@@ -103,6 +139,41 @@ def get_db_connection(shard_region=None):
         traceback.print_exc()
         return None
 
+async def get_async_connection(shard_region=None):
+    """
+    Create an asyncio connection (required for round-trip pipelining)
+    
+    Args:
+        shard_region (str, optional): Region to connect to (None = catalog)
+    
+    Returns:
+        AsyncConnection object (raises on failure)
+    """
+    host, port = get_db_address(shard_region)
+    return await oracledb.connect_async(
+        user=DB_CONFIG['user'],
+        password=DB_CONFIG['password'],
+        dsn=oracledb.makedsn(host, port, service_name=DB_CONFIG['service_name'])
+    )
+
+def call_procedure(conn, name, parameters):
+    """
+    Call a write procedure on a shard connection without a separate commit round trip
+    The bank procedures (06-create-procedures.sql) COMMIT themselves; autocommit makes the
+    driver commit with the call for any procedure that does not
+    
+    Args:
+        conn: Connection to the shard that runs the procedure
+        name (str): Procedure name
+        parameters (list): Positional procedure parameters (IN only)
+    """
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        cursor.callproc(name, parameters)
+    finally:
+        cursor.close()
+
 def get_user_id_by_username(username):
     """
     Look up user_id by username (query directly to shards since user_id removed from views)
@@ -265,6 +336,52 @@ def get_account_info_by_number(account_number):
                 pass
         return None
 
+def get_accounts_info_by_numbers(account_numbers):
+    """
+    Look up several accounts by account_number with one catalog query
+    (a transfer needs both accounts: one round trip instead of two connections)
+    
+    Args:
+        account_numbers (list): Account numbers to look up (None entries are ignored)
+    
+    Returns:
+        dict: account_number -> account info (as get_account_info_by_number); missing accounts are absent
+    """
+    account_numbers = [n for n in dict.fromkeys(account_numbers) if n]
+    if not account_numbers:
+        return {}
+    conn = get_db_connection()
+    if not conn:
+        return {}
+    
+    try:
+        cursor = conn.cursor()
+        binds = {f'n{i}': number for i, number in enumerate(account_numbers)}
+        cursor.execute(f"""
+            SELECT account_number, region, shard_location 
+            FROM accounts_all 
+            WHERE account_number IN ({', '.join(':' + name for name in binds)})
+        """, binds)
+        accounts = {
+            row[0]: {
+                'account_number': row[0],
+                'region': row[1].upper(),
+                'shard_location': row[2]
+            }
+            for row in cursor
+        }
+        cursor.close()
+        conn.close()
+        return accounts
+    except Exception as e:
+        print(f"Error looking up accounts by number: {e}")
+        if conn:
+            try:
+                conn.close()
+            except:
+                pass
+        return {}
+
 def get_account_id_by_number(account_number):
     """
     Look up account_id by account_number (which is globally unique)
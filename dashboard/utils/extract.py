@@ -0,0 +1,283 @@
+"""
+Columnar shard extract utilities
+Pulls users, accounts and transactions from every shard in parallel as Apache Arrow
+batches (python-oracledb DataFrame fetch) and writes them incrementally to partitioned
+Parquet or Arrow IPC files, so reporting can run off the OLTP shards entirely
+
+Output layout (one directory per table, one partition per shard, one file per run):
+    <output_dir>/<table>/shard=SHARD1/part-<run_id>.parquet
+    <output_dir>/_extract_state.json   (per table/shard high-water marks)
+"""
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    # pyarrow is optional - only needed for the extract/analytics tools
+    pa = None
+
+from .db import get_db_connection, run_per_shard, SHARD_LOCATIONS
+from .reconcile import DEFAULT_SETTLE_SECONDS
+from .state import load_state, save_state
+
+STATE_FILE = '_extract_state.json'
+
+# Tables to extract and how each one is tracked incrementally
+# Every run extracts (high-water mark, upper bound]: the upper bound trails the settle
+# window, because identity values and last_updated are set when a row is written, not
+# when it commits (a concurrent transaction may still commit a lower value)
+# - users/accounts are mutable: new versions of changed rows are appended
+#   (the analytics loader keeps the latest version of each row)
+# - transactions are append-only
+EXTRACT_TABLES = {
+    'users': {
+        'columns': ['user_id', 'username', 'email', 'full_name', 'region',
+                    'created_date', 'last_updated'],
+        'hwm_column': 'last_updated'
+    },
+    'accounts': {
+        'columns': ['account_id', 'user_id', 'account_number', 'account_type', 'balance',
+                    'currency', 'region', 'status', 'created_date', 'last_updated'],
+        'hwm_column': 'last_updated'
+    },
+    'transactions': {
+        'columns': ['transaction_id', 'account_number', 'region', 'from_account_number',
+                    'to_account_number', 'transaction_type', 'amount', 'currency',
+                    'status', 'transaction_date', 'reference_number'],
+        'hwm_column': 'transaction_id'
+    }
+}
+
+# Highest transaction_id old enough to be settled (same rule as the ledger reconciliation)
+TRANSACTIONS_UPPER_BOUND_SQL = """
+    SELECT NVL(MAX(transaction_id), :hwm)
+    FROM transactions
+    WHERE transaction_id > :hwm
+      AND transaction_date < LOCALTIMESTAMP - NUMTODSINTERVAL(:settle_seconds, 'SECOND')
+"""
+
+LAST_UPDATED_UPPER_BOUND_SQL = "SELECT SYSDATE - :settle_seconds / 86400 FROM DUAL"
+
+FILE_FORMATS = {
+    'parquet': '.parquet',
+    'arrow': '.arrow'
+}
+
+def require_pyarrow():
+    """Raise a helpful error if pyarrow is not installed"""
+    if pa is None:
+        raise RuntimeError("pyarrow is required for columnar extracts. Install with: pip install pyarrow numpy")
+
+def build_extract_query(table, hwm=None, upper_bound=None):
+    """
+    Build the SELECT statement for one table, filtered by high-water mark if known
+
+    Args:
+        table (str): Table name (key of EXTRACT_TABLES)
+        hwm: Last extracted high-water mark value, or None for a full extract
+        upper_bound: Highest settled value to extract, or None for no upper bound
+
+    Returns:
+        tuple: (sql, bind parameters)
+    """
+    spec = EXTRACT_TABLES[table]
+    sql = f"SELECT {', '.join(spec['columns'])} FROM {table}"
+    conditions = []
+    params = {}
+    if hwm is not None:
+        conditions.append(f"{spec['hwm_column']} > :hwm")
+        params['hwm'] = hwm
+    if upper_bound is not None:
+        conditions.append(f"{spec['hwm_column']} <= :upper_bound")
+        params['upper_bound'] = upper_bound
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql, params
+
+def settled_upper_bound(conn, table, hwm, settle_seconds):
+    """
+    Highest high-water mark value that is safe to extract up to
+
+    Args:
+        conn: Shard connection
+        table (str): Table name (key of EXTRACT_TABLES)
+        hwm: Last extracted high-water mark value, or None
+        settle_seconds (int): Settle window for in-flight commits
+
+    Returns:
+        datetime or int: Upper bound (never below hwm)
+    """
+    cursor = conn.cursor()
+    try:
+        if EXTRACT_TABLES[table]['hwm_column'] == 'last_updated':
+            cursor.execute(LAST_UPDATED_UPPER_BOUND_SQL, {'settle_seconds': settle_seconds})
+            upper_bound = cursor.fetchone()[0]
+        else:
+            cursor.execute(TRANSACTIONS_UPPER_BOUND_SQL, {'hwm': hwm or 0, 'settle_seconds': settle_seconds})
+            upper_bound = int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+    return upper_bound if hwm is None else max(hwm, upper_bound)
+
+def _to_arrow(odf):
+    """Convert an OracleDataFrame batch to a pyarrow Table with lowercase column names"""
+    if hasattr(odf, '__arrow_c_stream__'):
+        table = pa.table(odf)
+    else:
+        table = pa.Table.from_arrays(odf.column_arrays(), names=odf.column_names())
+    return table.rename_columns([name.lower() for name in table.column_names])
+
+def _encode_hwm(value):
+    """Serialize a high-water mark for the JSON state file"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _clear_partition(partition_dir, keep=None):
+    """Remove every part file of a partition except keep (after a full extract)"""
+    if not os.path.isdir(partition_dir):
+        return
+    for name in os.listdir(partition_dir):
+        path = os.path.join(partition_dir, name)
+        if name.startswith('part-') and path != keep:
+            os.remove(path)
+
+def _decode_hwm(table, value):
+    """Deserialize a high-water mark from the JSON state file into a bind value"""
+    if value is None:
+        return None
+    if EXTRACT_TABLES[table]['hwm_column'] == 'last_updated':
+        return datetime.fromisoformat(value)
+    return int(value)
+
+class _PartitionWriter:
+    """Lazily opened Parquet / Arrow IPC writer for one table partition"""
+
+    def __init__(self, path, file_format):
+        self.path = path
+        self.file_format = file_format
+        self.writer = None
+        self.rows = 0
+
+    def write(self, table):
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Claim the file name so a concurrent run never overwrites it (FileExistsError)
+            open(self.path, 'xb').close()
+            if self.file_format == 'parquet':
+                self.writer = pq.ParquetWriter(self.path, table.schema, compression='zstd')
+            else:
+                self.writer = pa.ipc.new_file(self.path, table.schema)
+        if self.file_format == 'parquet':
+            self.writer.write_table(table)
+        else:
+            self.writer.write(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def abort(self):
+        if self.writer is None:
+            return
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def extract_shards(output_dir, tables=None, regions=None, file_format='parquet',
+                   batch_size=100000, full=False, settle_seconds=DEFAULT_SETTLE_SECONDS):
+    """
+    Extract tables from all shards in parallel (one worker per shard)
+
+    Args:
+        output_dir (str): Root directory of the columnar dataset
+        tables (list, optional): Tables to extract (default: users, accounts, transactions)
+        regions (list, optional): Shard regions to extract (default: all)
+        file_format (str): 'parquet' or 'arrow' (Arrow IPC file)
+        batch_size (int): Rows per Arrow batch fetched from the driver
+        full (bool): Ignore stored high-water marks and extract everything
+        settle_seconds (int): Rows newer than this are left for the next run
+
+    Returns:
+        dict: Region -> {table: {'rows', 'seconds', 'rows_per_second', 'file', 'hwm'}}
+    """
+    require_pyarrow()
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Invalid format: {file_format}. Must be one of {', '.join(FILE_FORMATS)}")
+    tables = tables or list(EXTRACT_TABLES)
+    for table in tables:
+        if table not in EXTRACT_TABLES:
+            raise ValueError(f"Invalid table: {table}. Must be one of {', '.join(EXTRACT_TABLES)}")
+
+    state_path = os.path.join(output_dir, STATE_FILE)
+    state = load_state(state_path)
+    state_lock = threading.Lock()
+    # Timestamp for ordering, random suffix so runs started in the same second never collide
+    run_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    def extract_region(region):
+        shard_location = SHARD_LOCATIONS[region]
+        conn = get_db_connection(shard_region=region)
+        if not conn:
+            raise RuntimeError(f"Database connection failed to shard for region {region}")
+
+        results = {}
+        try:
+            for table in tables:
+                with state_lock:
+                    stored = state.get(table, {}).get(shard_location)
+                hwm = None if full else _decode_hwm(table, stored)
+                upper_bound = settled_upper_bound(conn, table, hwm, settle_seconds)
+                sql, params = build_extract_query(table, hwm, upper_bound)
+
+                path = os.path.join(output_dir, table, f"shard={shard_location}",
+                                    f"part-{run_id}{FILE_FORMATS[file_format]}")
+                writer = _PartitionWriter(path, file_format)
+                started = time.perf_counter()
+                try:
+                    for odf in conn.fetch_df_batches(statement=sql, parameters=params, size=batch_size):
+                        batch = _to_arrow(odf)
+                        if batch.num_rows == 0:
+                            continue
+                        batch = batch.append_column(
+                            'shard_location',
+                            pa.array([shard_location] * batch.num_rows, pa.string())
+                        )
+                        writer.write(batch)
+                    writer.close()
+                except Exception:
+                    writer.abort()
+                    raise
+
+                elapsed = time.perf_counter() - started
+                # A full extract replaces every earlier file in the partition,
+                # even when the table is now empty
+                if hwm is None:
+                    _clear_partition(os.path.dirname(path), keep=path)
+
+                # Only advance the high-water mark once the partition file is complete
+                with state_lock:
+                    state.setdefault(table, {})[shard_location] = _encode_hwm(upper_bound)
+                    save_state(state_path, state)
+
+                results[table] = {
+                    'rows': writer.rows,
+                    'seconds': round(elapsed, 3),
+                    'rows_per_second': round(writer.rows / elapsed, 1) if elapsed > 0 else None,
+                    'file': path if writer.rows else None,
+                    'hwm': _encode_hwm(upper_bound)
+                }
+                print(f"Extracted {writer.rows} {table} rows from {shard_location} in {elapsed:.2f}s")
+        finally:
+            conn.close()
+        return results
+
+    return run_per_shard(extract_region, regions=regions)
@@ -0,0 +1,149 @@
+"""
+HTTP caching utilities
+Conditional GET (ETag / If-None-Match) and response compression for the dashboard API
+
+The ETag of a read endpoint is derived from a cheap data version token
+(dashboard_data_version: per-shard data_generation counter, bumped by triggers in every
+writing transaction, and the catalog's current date) so unchanged data is answered with
+304 without running the full query.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import request, make_response
+
+try:
+    import brotli
+except ImportError:
+    # brotli is optional - gzip is used when it is not installed
+    brotli = None
+
+from .db import get_db_connection
+
+# How long a data version token is reused before the catalog is asked again (seconds)
+# One dashboard refresh hits several endpoints; they share one version lookup
+DATA_VERSION_TTL = float(os.getenv('DATA_VERSION_TTL', '1.0'))
+
+# Responses smaller than this are sent uncompressed (bytes)
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+
+_version_lock = threading.Lock()
+_version_cache = {'token': None, 'expires': 0.0}
+_write_generation = 0
+
+def bump_write_generation():
+    """
+    Mark data as changed after a successful write through this process
+    Invalidates the cached version token immediately (covers same-second updates)
+    """
+    global _write_generation
+    with _version_lock:
+        _write_generation += 1
+        _version_cache['expires'] = 0.0
+
+def get_data_version():
+    """
+    Return a token that changes whenever dashboard data changes
+
+    Returns:
+        str: Version token, or None if it could not be determined (caching disabled)
+    """
+    now = time.monotonic()
+    with _version_lock:
+        if _version_cache['token'] is not None and now < _version_cache['expires']:
+            return _version_cache['token']
+        generation = _write_generation
+
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        # The catalog's date is part of the version: views with a window relative to SYSDATE
+        # (dashboard_transactions_by_date) change at midnight without any write
+        cursor.execute("""
+            SELECT v.*, TRUNC(SYSDATE) AS version_date
+            FROM dashboard_data_version v
+            ORDER BY v.shard_location
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+    except Exception as e:
+        print(f"Error reading data version: {e}")
+        return None
+    finally:
+        conn.close()
+
+    token = hashlib.sha1(repr((generation, rows)).encode()).hexdigest()
+    with _version_lock:
+        # Don't cache a token read before a concurrent write bumped the generation
+        if generation == _write_generation:
+            _version_cache['token'] = token
+            _version_cache['expires'] = now + DATA_VERSION_TTL
+    return token
+
+def conditional_json(view):
+    """
+    Decorator for read endpoints: add a weak ETag and answer If-None-Match with 304
+    The data version is read before the view runs, so a concurrent change can only
+    make the ETag older than the body (forcing a refetch), never newer
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = get_data_version()
+        if version is None:
+            return view(*args, **kwargs)
+
+        etag = hashlib.sha1(f"{request.full_path}|{version}".encode()).hexdigest()[:32]
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        # Always revalidate: the ETag makes revalidation cheap
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+def init_compression(app, min_size=COMPRESS_MIN_SIZE):
+    """
+    Compress responses (br if available and accepted, otherwise gzip) above min_size
+
+    Args:
+        app: Flask application
+        min_size (int): Minimum body size in bytes to compress
+    """
+    encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESS_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(encodings)
+        if not encoding:
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=5)
+        else:
+            compressed = gzip.compress(data, compresslevel=6)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        response.headers['Content-Length'] = str(len(compressed))
+        return response
@@ -0,0 +1,241 @@
+"""
+Sampling profiler utilities
+On-demand stack sampling of request threads for the admin profiling endpoint
+
+While a profile session runs:
+- app.wsgi_app is wrapped to record which threads are serving matching requests
+- a sampler thread reads their stacks (sys._current_frames) at the configured rate
+  and counts collapsed stacks, each tagged with a time category:
+  driver (oracledb), cursor_to_dicts, json (encoding), flask (Flask / Werkzeug), app
+
+Both the wrapper and the sampler thread exist only during a session, so the
+profiler costs nothing when it is off.
+"""
+
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+MAX_HZ = 1000
+MAX_SECONDS = 300
+DEFAULT_REQUEST_TIMEOUT = 300  # a request-count session ends after this many seconds regardless
+
+# Requests to these paths are never profiled (the admin endpoints themselves)
+EXCLUDED_PREFIX = '/api/admin/'
+
+CATEGORIES = ['driver', 'cursor_to_dicts', 'json', 'flask', 'app']
+
+def _categorize(frames):
+    """
+    Time category of one sample: the first categorized frame from the leaf up
+    (cursor_to_dicts waiting on fetchall() is driver time, jsonify() encoding is json time)
+    """
+    for code in frames:
+        filename = code.co_filename.replace('\\', '/')
+        if '/oracledb/' in filename or 'cx_Oracle' in filename:
+            return 'driver'
+        if code.co_name in ('cursor_to_dicts', 'cursor_to_dict') and filename.endswith('utils/response.py'):
+            return 'cursor_to_dicts'
+        if '/json/' in filename:
+            return 'json'
+        if '/flask/' in filename or '/werkzeug/' in filename:
+            return 'flask'
+    return 'app'
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class ProfileSession:
+    """One profiling run: samples threads serving requests that match `route` (None = all)"""
+
+    def __init__(self, app, hz, route=None, seconds=None, requests=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.app = app
+        self.hz = hz
+        self.route = route
+        self.seconds = seconds
+        self.requests = requests
+        self.status = 'running'
+        self.started = time.time()
+        self.finished = None
+        self.samples = 0
+        self.requests_profiled = 0
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.lock = threading.Lock()
+        self.active_threads = set()
+        self.done = threading.Event()
+        self._original_wsgi_app = None
+        self._sampler = None
+
+    def _matches(self, environ):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(EXCLUDED_PREFIX):
+            return False
+        if self.route is None or path == self.route:
+            return True
+        try:
+            rule, _ = self.app.url_map.bind_to_environ(environ).match(return_rule=True)
+            return rule.rule == self.route
+        except Exception:
+            return False
+
+    def _wrap(self, wsgi_app):
+        def profiled_wsgi_app(environ, start_response):
+            if self.done.is_set() or not self._matches(environ):
+                return wsgi_app(environ, start_response)
+            thread_id = threading.get_ident()
+            with self.lock:
+                self.active_threads.add(thread_id)
+            try:
+                return wsgi_app(environ, start_response)
+            finally:
+                with self.lock:
+                    self.active_threads.discard(thread_id)
+                    self.requests_profiled += 1
+                    reached = self.requests is not None and self.requests_profiled >= self.requests
+                if reached:
+                    self.stop()
+        return profiled_wsgi_app
+
+    def _sample_loop(self):
+        interval = 1.0 / self.hz
+        deadline = self.started + (self.seconds if self.seconds else DEFAULT_REQUEST_TIMEOUT)
+        next_tick = time.perf_counter()
+        while not self.done.is_set():
+            if time.time() >= deadline:
+                self.stop()
+                break
+            with self.lock:
+                threads = list(self.active_threads)
+            if threads:
+                # Walk the stacks outside the lock, then merge the tick's counts under it
+                # (report() and collapsed() iterate the counters from request threads)
+                stacks = Counter()
+                categories = Counter()
+                frames = sys._current_frames()
+                for thread_id in threads:
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    codes = []  # leaf first
+                    while frame is not None:
+                        codes.append(frame.f_code)
+                        frame = frame.f_back
+                    category = _categorize(codes)
+                    stacks[';'.join([f'[{category}]'] + [_frame_name(c) for c in reversed(codes)])] += 1
+                    categories[category] += 1
+                del frames
+                with self.lock:
+                    self.stacks.update(stacks)
+                    self.categories.update(categories)
+                    self.samples += sum(categories.values())
+            next_tick += interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self.done.wait(delay)
+            else:
+                next_tick = time.perf_counter()  # fell behind: don't burst
+
+    def start(self):
+        self._original_wsgi_app = self.app.wsgi_app
+        self.app.wsgi_app = self._wrap(self._original_wsgi_app)
+        self._sampler = threading.Thread(target=self._sample_loop, name=f'profiler-{self.id}', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        """End the session and unhook the wrapper (idempotent)"""
+        with self.lock:
+            if self.done.is_set():
+                return
+            self.done.set()
+            self.status = 'done'
+            self.finished = time.time()
+            if self._original_wsgi_app is not None:
+                self.app.wsgi_app = self._original_wsgi_app
+
+    def collapsed(self):
+        """Collapsed stacks (flamegraph.pl / speedscope input), one 'stack count' per line"""
+        with self.lock:
+            stacks = self.stacks.most_common()
+        return '\n'.join(f'{stack} {count}' for stack, count in stacks) + '\n'
+
+    def report(self, include_stacks=True):
+        with self.lock:
+            samples = self.samples
+            categories = dict(self.categories)
+            status = self.status
+            finished = self.finished
+            requests_profiled = self.requests_profiled
+        total = samples or 1
+        report = {
+            'profile_id': self.id,
+            'status': status,
+            'route': self.route,
+            'hz': self.hz,
+            'seconds_requested': self.seconds,
+            'requests_requested': self.requests,
+            'requests_profiled': requests_profiled,
+            'elapsed_seconds': round((finished or time.time()) - self.started, 3),
+            'samples': samples,
+            'categories': {
+                name: {
+                    'samples': categories.get(name, 0),
+                    'percent': round(100.0 * categories.get(name, 0) / total, 1),
+                    'seconds': round(categories.get(name, 0) / self.hz, 3)
+                }
+                for name in CATEGORIES
+            }
+        }
+        if include_stacks:
+            report['collapsed'] = self.collapsed()
+        return report
+
+_sessions_lock = threading.Lock()
+_current = None
+_sessions = {}
+
+def start_profile(app, hz=100, route=None, seconds=None, requests=None):
+    """
+    Start a profile session (only one at a time)
+
+    Args:
+        app: Flask application
+        hz (int): Samples per second
+        route (str, optional): URL path or Flask rule (e.g. /api/transfers/<transfer_id>); None = all requests
+        seconds (float, optional): Profile for this long
+        requests (int, optional): Profile the next N matching requests
+
+    Returns:
+        ProfileSession
+
+    Raises:
+        ValueError: Invalid arguments
+        RuntimeError: A session is already running
+    """
+    global _current
+    if not 1 <= hz <= MAX_HZ:
+        raise ValueError(f'hz must be between 1 and {MAX_HZ}')
+    if (seconds is None) == (requests is None):
+        raise ValueError('Give exactly one of seconds or requests')
+    if seconds is not None and not 0 < seconds <= MAX_SECONDS:
+        raise ValueError(f'seconds must be between 0 and {MAX_SECONDS}')
+    if requests is not None and requests < 1:
+        raise ValueError('requests must be at least 1')
+
+    with _sessions_lock:
+        if _current is not None and not _current.done.is_set():
+            raise RuntimeError(f'Profile {_current.id} is already running')
+        session = ProfileSession(app, hz, route=route, seconds=seconds, requests=requests)
+        _current = session
+        _sessions.clear()  # keep only the latest session's results
+        _sessions[session.id] = session
+    session.start()
+    return session
+
+def get_profile(profile_id):
+    """Return a profile session by id (None if unknown)"""
+    return _sessions.get(profile_id)
@@ -0,0 +1,372 @@
+"""
+Global ledger reconciliation utilities
+Checks that account balances stay consistent with transaction history across shards
+
+Each shard is processed in parallel inside a read-only (consistent) transaction:
+- net flows since the shard's checkpoint are aggregated on the shard itself
+  (debits of the source account, credits of the destination account - a cross-shard
+  TRANSFER row lives on the source shard and carries the remote credit with it)
+- balances are read only for accounts changed since the previous run
+- async (outbox) transfers debit the source when queued (PENDING row on the source
+  shard) and credit the destination when the relay applies them (transfer_inbox on
+  the destination shard, with its own checkpoint); a rejected credit is refunded by a
+  compensating DEPOSIT row
+
+Flows are merged into running per-account totals keyed by account_number (globally
+unique), so every run only processes the delta since the last checkpoint.
+transaction_id values do not commit in order, and backdated transaction_date values
+pass the settle filter at once, so the ids missing below the checkpoint are kept as
+gaps and re-scanned by the next runs until they are filled or older than the gap
+retention (rolled back ids never fill).
+An account's opening balance is fixed the first time it is seen settled
+(opening = balance - net flow); afterwards balance - net flow must stay equal to it.
+A state file belongs to one set of shards: credits from shards outside the set are
+missing from its opening balances, so running it with other shards would report them
+as drift forever.
+
+All amounts are handled as integer cents to avoid floating point drift.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from .db import get_db_connection, run_per_shard, SHARD_REGIONS, SHARD_LOCATIONS
+from .state import load_state, save_state
+
+# Rows newer than this are not processed yet (their commit may still be in flight on
+# another shard) and accounts changed within it are reported as unsettled
+DEFAULT_SETTLE_SECONDS = 60
+
+# How long missing transaction_ids below the checkpoint are re-scanned (seconds)
+DEFAULT_GAP_RETENTION_SECONDS = 3600
+
+# Net flow per account from new transactions, aggregated on the shard
+# Async transfers are debited whatever their status (the debit is made when queued)
+# and never credited here: their credit comes from the destination inbox
+DELTA_FLOWS_SQL = """
+    SELECT account_number, SUM(delta_cents) AS net_cents
+    FROM (
+        SELECT t.from_account_number AS account_number, -ROUND(t.amount * 100) AS delta_cents
+        FROM transactions t
+        WHERE t.transaction_id > :checkpoint
+          AND t.transaction_id <= :upper_bound
+          AND t.transaction_type IN ('TRANSFER', 'WITHDRAWAL')
+          AND t.from_account_number IS NOT NULL
+          AND (t.status = 'COMPLETED'
+               OR EXISTS (SELECT 1 FROM transfer_outbox o WHERE o.transfer_id = t.reference_number))
+        UNION ALL
+        SELECT t.to_account_number AS account_number, ROUND(t.amount * 100) AS delta_cents
+        FROM transactions t
+        WHERE t.transaction_id > :checkpoint
+          AND t.transaction_id <= :upper_bound
+          AND t.status = 'COMPLETED'
+          AND t.transaction_type IN ('TRANSFER', 'DEPOSIT')
+          AND t.to_account_number IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM transfer_outbox o WHERE o.transfer_id = t.reference_number)
+        UNION ALL
+        SELECT i.to_account_number AS account_number, ROUND(i.amount * 100) AS delta_cents
+        FROM transfer_inbox i
+        WHERE i.inbox_seq > :inbox_checkpoint
+          AND i.inbox_seq <= :inbox_upper_bound
+          AND i.status = 'APPLIED'
+    )
+    GROUP BY account_number
+"""
+
+# Highest transaction_id old enough to be settled (identity values can commit out of order)
+UPPER_BOUND_SQL = """
+    SELECT NVL(MAX(transaction_id), :checkpoint), COUNT(*)
+    FROM transactions
+    WHERE transaction_id > :checkpoint
+      AND transaction_date < LOCALTIMESTAMP - NUMTODSINTERVAL(:settle_seconds, 'SECOND')
+"""
+
+# Missing transaction_ids in (:low, :high] as ranges: rolled back, or not committed when
+# the snapshot was taken
+ID_GAPS_SQL = """
+    SELECT gap_start, gap_end
+    FROM (
+        SELECT LAG(transaction_id, 1, :low) OVER (ORDER BY transaction_id) + 1 AS gap_start,
+               transaction_id - 1 AS gap_end
+        FROM transactions
+        WHERE transaction_id > :low
+          AND transaction_id <= :high
+    )
+    WHERE gap_end >= gap_start
+    UNION ALL
+    SELECT NVL(MAX(transaction_id), :low) + 1, :high
+    FROM transactions
+    WHERE transaction_id > :low
+      AND transaction_id <= :high
+    HAVING NVL(MAX(transaction_id), :low) < :high
+"""
+
+INBOX_UPPER_BOUND_SQL = """
+    SELECT NVL(MAX(inbox_seq), :checkpoint), COUNT(*)
+    FROM transfer_inbox
+    WHERE inbox_seq > :checkpoint
+      AND applied_date < LOCALTIMESTAMP - NUMTODSINTERVAL(:settle_seconds, 'SECOND')
+"""
+
+CHANGED_ACCOUNTS_SQL = """
+    SELECT account_number, ROUND(balance * 100) AS balance_cents,
+           CASE WHEN last_updated >= SYSDATE - :settle_seconds / 86400 THEN 1 ELSE 0 END AS unsettled
+    FROM accounts
+    WHERE last_updated >= :since
+"""
+
+ALL_ACCOUNTS_SQL = """
+    SELECT account_number, ROUND(balance * 100) AS balance_cents,
+           CASE WHEN last_updated >= SYSDATE - :settle_seconds / 86400 THEN 1 ELSE 0 END AS unsettled
+    FROM accounts
+"""
+
+RECHECK_ACCOUNTS_SQL = """
+    SELECT account_number, ROUND(balance * 100) AS balance_cents,
+           CASE WHEN last_updated >= SYSDATE - :settle_seconds / 86400 THEN 1 ELSE 0 END AS unsettled
+    FROM accounts
+    WHERE account_number IN (SELECT COLUMN_VALUE FROM TABLE(:recheck))
+"""
+
+def _id_gaps(cursor, low, high):
+    """Missing transaction_id ranges [start, end] in (low, high]"""
+    cursor.execute(ID_GAPS_SQL, {'low': low, 'high': high})
+    return [[int(start), int(end)] for start, end in cursor]
+
+def _reconcile_shard(region, checkpoint, inbox_checkpoint, since, recheck, settle_seconds, gaps=()):
+    """
+    Read the delta for one shard inside a read-only transaction
+
+    Args:
+        region (str): Shard region
+        checkpoint (int): Last processed transaction_id on this shard
+        inbox_checkpoint (int): Last processed transfer_inbox.inbox_seq on this shard
+        since (datetime): Read balances of accounts updated after this time (None = all)
+        recheck (list): Account numbers to re-read regardless of last_updated
+        settle_seconds (int): Settle window
+        gaps (list): [start, end, first_seen] transaction_id ranges below the checkpoint
+            that were missing in earlier runs
+
+    Returns:
+        dict: flows, balances, new checkpoint, remaining gaps, snapshot time and row counts
+    """
+    conn = get_db_connection(shard_region=region)
+    if not conn:
+        raise RuntimeError(f"Database connection failed to shard for region {region}")
+
+    started = time.perf_counter()
+    try:
+        cursor = conn.cursor()
+        cursor.arraysize = 10000
+        cursor.execute("SET TRANSACTION READ ONLY")
+        cursor.execute("SELECT SYSDATE FROM DUAL")
+        snapshot_time = cursor.fetchone()[0]
+
+        cursor.execute(UPPER_BOUND_SQL, {'checkpoint': checkpoint, 'settle_seconds': settle_seconds})
+        upper_bound, rows_processed = cursor.fetchone()
+        upper_bound = int(upper_bound)
+        if upper_bound <= checkpoint:
+            rows_processed = 0
+
+        cursor.execute(INBOX_UPPER_BOUND_SQL, {'checkpoint': inbox_checkpoint, 'settle_seconds': settle_seconds})
+        inbox_upper_bound, inbox_rows = cursor.fetchone()
+        inbox_upper_bound = int(inbox_upper_bound)
+        if inbox_upper_bound > inbox_checkpoint:
+            rows_processed += inbox_rows
+
+        flows = {}
+        if upper_bound > checkpoint or inbox_upper_bound > inbox_checkpoint:
+            cursor.execute(DELTA_FLOWS_SQL, {
+                'checkpoint': checkpoint,
+                'upper_bound': max(upper_bound, checkpoint),
+                'inbox_checkpoint': inbox_checkpoint,
+                'inbox_upper_bound': max(inbox_upper_bound, inbox_checkpoint)
+            })
+            for account_number, net_cents in cursor:
+                flows[account_number] = int(net_cents)
+
+        # Re-scan the ids missing in earlier runs; what is still missing stays a gap
+        remaining_gaps = []
+        for start, end, first_seen in gaps:
+            cursor.execute(DELTA_FLOWS_SQL, {
+                'checkpoint': start - 1,
+                'upper_bound': end,
+                'inbox_checkpoint': inbox_checkpoint,
+                'inbox_upper_bound': inbox_checkpoint
+            })
+            for account_number, net_cents in cursor:
+                flows[account_number] = flows.get(account_number, 0) + int(net_cents)
+            still_missing = _id_gaps(cursor, start - 1, end)
+            rows_processed += (end - start + 1) - sum(e - s + 1 for s, e in still_missing)
+            remaining_gaps.extend([s, e, first_seen] for s, e in still_missing)
+        if upper_bound > checkpoint:
+            remaining_gaps.extend([s, e, snapshot_time.isoformat()] for s, e in _id_gaps(cursor, checkpoint, upper_bound))
+
+        balances = {}
+        if since is None:
+            cursor.execute(ALL_ACCOUNTS_SQL, {'settle_seconds': settle_seconds})
+        else:
+            cursor.execute(CHANGED_ACCOUNTS_SQL, {'since': since, 'settle_seconds': settle_seconds})
+        for account_number, balance_cents, unsettled in cursor:
+            balances[account_number] = (int(balance_cents), bool(unsettled))
+
+        # Accounts that were unsettled or mismatched last run (on any shard)
+        list_type = conn.gettype('SYS.ODCIVARCHAR2LIST')
+        for i in range(0, len(recheck), 1000):
+            cursor.execute(RECHECK_ACCOUNTS_SQL, {
+                'recheck': list_type.newobject(recheck[i:i + 1000]),
+                'settle_seconds': settle_seconds
+            })
+            for account_number, balance_cents, unsettled in cursor:
+                balances[account_number] = (int(balance_cents), bool(unsettled))
+
+        conn.rollback()  # end the read-only transaction
+        cursor.close()
+    finally:
+        conn.close()
+
+    return {
+        'flows': flows,
+        'balances': balances,
+        'checkpoint': max(upper_bound, checkpoint),
+        'inbox_checkpoint': max(inbox_upper_bound, inbox_checkpoint),
+        'gaps': remaining_gaps,
+        'snapshot_time': snapshot_time,
+        'rows_processed': int(rows_processed),
+        'seconds': time.perf_counter() - started
+    }
+
+def reconcile_ledger(state_path, regions=None, settle_seconds=DEFAULT_SETTLE_SECONDS, full_check=False,
+                     gap_retention_seconds=DEFAULT_GAP_RETENTION_SECONDS):
+    """
+    Run one incremental reconciliation pass over all shards
+
+    Args:
+        state_path (str): JSON file holding checkpoints and running per-account totals
+        regions (list, optional): Shard regions to process (default: all)
+        settle_seconds (int): Settle window for in-flight (cross-shard) commits
+        full_check (bool): Compare every account's balance, not only changed ones
+        gap_retention_seconds (int): How long missing transaction_ids are re-scanned
+
+    Returns:
+        dict: Report with 'mismatches', 'unsettled', 'shards' throughput and totals
+
+    Raises:
+        ValueError: The state file was built for another set of regions
+    """
+    state = load_state(state_path, {'checkpoints': {}, 'snapshots': {}, 'accounts': {}, 'recheck': []})
+    state.setdefault('gaps', {})  # location -> [start, end, first_seen] missing transaction_ids
+    regions = {r.upper() for r in (regions or SHARD_REGIONS)}
+    unknown = regions - set(SHARD_REGIONS)
+    if unknown:
+        raise ValueError(f"Invalid region(s): {' '.join(sorted(unknown))}. Use {' '.join(SHARD_REGIONS)}")
+    regions = [region for region in SHARD_REGIONS if region in regions]
+    state_regions = _state_regions(state)
+    if state_regions is not None and state_regions != regions:
+        raise ValueError(f"{state_path} tracks regions {' '.join(state_regions)}, not {' '.join(regions)}: "
+                         f"opening balances would miss the other shards' credits. Use another --state file")
+    state['regions'] = regions
+    accounts = state['accounts']  # account_number -> [opening_cents, net_flow_cents]
+    recheck = sorted(set(state.get('recheck', [])))
+    started = time.perf_counter()
+
+    def task(region):
+        location = SHARD_LOCATIONS[region]
+        since = None if full_check else _parse_time(state['snapshots'].get(location))
+        if since is not None:
+            # Rows updated just before the last snapshot may have committed after it
+            since -= timedelta(seconds=settle_seconds)
+        return _reconcile_shard(
+            region,
+            int(state['checkpoints'].get(location, 0)),
+            int(state['checkpoints'].get(f'{location}:inbox', 0)),
+            since,
+            recheck,
+            settle_seconds,
+            state['gaps'].get(location, [])
+        )
+
+    results = run_per_shard(task, regions=regions)
+
+    # Merge net flows from every shard into the running totals first:
+    # a credit for an account may come from any shard's TRANSFER rows
+    for result in results.values():
+        for account_number, net_cents in result['flows'].items():
+            totals = accounts.setdefault(account_number, [None, 0])
+            totals[1] += net_cents
+
+    mismatches = []
+    unsettled = []
+    checked = 0
+    for region, result in results.items():
+        location = SHARD_LOCATIONS[region]
+        for account_number, (balance_cents, is_unsettled) in result['balances'].items():
+            if is_unsettled:
+                unsettled.append(account_number)
+                continue
+            totals = accounts.setdefault(account_number, [None, 0])
+            if totals[0] is None:
+                # First settled observation fixes the opening balance
+                totals[0] = balance_cents - totals[1]
+                continue
+            checked += 1
+            expected_cents = totals[0] + totals[1]
+            if expected_cents != balance_cents:
+                mismatches.append({
+                    'account_number': account_number,
+                    'shard_location': location,
+                    'balance': balance_cents / 100,
+                    'expected_balance': expected_cents / 100,
+                    'drift': (balance_cents - expected_cents) / 100
+                })
+
+    shards = {}
+    for region, result in results.items():
+        location = SHARD_LOCATIONS[region]
+        state['checkpoints'][location] = result['checkpoint']
+        state['checkpoints'][f'{location}:inbox'] = result['inbox_checkpoint']
+        state['snapshots'][location] = result['snapshot_time'].isoformat()
+        # Ids still missing after the retention were rolled back (or commit far too late to count)
+        oldest = result['snapshot_time'] - timedelta(seconds=gap_retention_seconds)
+        state['gaps'][location] = [gap for gap in result['gaps'] if _parse_time(gap[2]) >= oldest]
+        shards[location] = {
+            'checkpoint': result['checkpoint'],
+            'inbox_checkpoint': result['inbox_checkpoint'],
+            'open_gaps': len(state['gaps'][location]),
+            'rows_processed': result['rows_processed'],
+            'accounts_read': len(result['balances']),
+            'seconds': round(result['seconds'], 3),
+            'rows_per_second': round(result['rows_processed'] / result['seconds'], 1) if result['seconds'] > 0 else None
+        }
+    # Mismatched and unsettled accounts are re-checked next run even if unchanged
+    state['recheck'] = sorted(set(unsettled) | {m['account_number'] for m in mismatches})
+    save_state(state_path, state)
+
+    elapsed = time.perf_counter() - started
+    total_rows = sum(s['rows_processed'] for s in shards.values())
+    return {
+        'mismatches': sorted(mismatches, key=lambda m: m['account_number']),
+        'unsettled': sorted(unsettled),
+        'accounts_checked': checked,
+        'accounts_tracked': len(accounts),
+        'rows_processed': total_rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(total_rows / elapsed, 1) if elapsed > 0 else None,
+        'shards': shards
+    }
+
+def _state_regions(state):
+    """Regions a state file was built for (None for a new state)"""
+    if state.get('regions'):
+        return state['regions']
+    # State files written before the region set was recorded: the regions with a checkpoint
+    locations = {location for location in state['checkpoints'] if ':' not in location}
+    if not locations:
+        return None
+    return [region for region in SHARD_REGIONS if SHARD_LOCATIONS[region] in locations]
+
+def _parse_time(value):
+    """Parse an ISO timestamp from the state file"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
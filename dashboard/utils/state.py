@@ -0,0 +1,45 @@
+"""
+Checkpoint state utilities
+Persists small JSON state files (high-water marks, checkpoints) for offline jobs
+"""
+
+import json
+import os
+import tempfile
+
+def load_state(path, default=None):
+    """
+    Load a JSON state file
+
+    Args:
+        path (str): State file path
+        default: Value returned when the file does not exist yet
+
+    Returns:
+        Parsed state, or default (an empty dict if not given)
+    """
+    if not os.path.exists(path):
+        return {} if default is None else default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_state(path, state):
+    """
+    Atomically write a JSON state file (write to temp file, then rename)
+    so an interrupted job never leaves a half-written checkpoint behind
+
+    Args:
+        path (str): State file path
+        state: JSON-serializable state
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.state-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True, default=str)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,468 @@
+"""
+Database wait-event telemetry utilities
+Samples session waits, top SQL and lock holders on the catalog and every shard
+
+A background collector wakes up every TELEMETRY_INTERVAL seconds and samples all
+databases in parallel (one long-lived session per database). A database that does not
+answer within the interval is reported with status 'timeout' and skipped until its
+sample ends; each call is also bounded by TELEMETRY_CALL_TIMEOUT.
+- DB time by procedure and wait event:
+  - ash:          new V$ACTIVE_SESSION_HISTORY samples since the last run (one sample
+                  is about one second of DB time). auto only uses it when
+                  CONTROL_MANAGEMENT_PACK_ACCESS includes the Diagnostics Pack
+  - session_wait: active sessions in V$SESSION (which carries the V$SESSION_WAIT
+                  columns), each counted for the time since the last run - coarser,
+                  but needs no Diagnostics Pack
+- top SQL: V$SQLSTATS deltas between runs (elapsed, CPU, lock and I/O wait per statement)
+- lock holders: sessions blocked by another session, with the blocker and the locked table
+
+Time is attributed to the bank procedure the session entered (PLSQL_ENTRY_OBJECT_ID,
+or PROGRAM_ID for SQL) - transfer_money, deposit_money, ... Sessions opened by
+database links are reported as 'remote (db link)', other SQL as 'sql'.
+
+Waits are grouped into categories: cpu, row_lock (enq: TX - row lock contention),
+db_link (SQL*Net ... from dblink), commit (log file sync), else the wait class.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .db import get_db_connection, SHARD_REGIONS, oracledb
+
+TELEMETRY_INTERVAL = float(os.getenv('TELEMETRY_INTERVAL', '0'))  # seconds, 0 = collector off
+TELEMETRY_WINDOW = float(os.getenv('TELEMETRY_WINDOW', '300'))  # seconds of samples kept
+TELEMETRY_SOURCE = os.getenv('TELEMETRY_SOURCE', 'auto').lower()  # auto, ash, session_wait
+TELEMETRY_CALL_TIMEOUT = float(os.getenv('TELEMETRY_CALL_TIMEOUT', '0'))  # seconds per database call, 0 = interval
+
+SOURCES = ('auto', 'ash', 'session_wait')
+
+CATALOG = 'CATALOG'
+TARGETS = [CATALOG] + SHARD_REGIONS
+
+TOP_SQL_LIMIT = 10
+TOP_EVENTS_LIMIT = 5
+BLOCKERS_LIMIT = 20
+
+def _attribution(alias, objects_alias):
+    """SQL expression naming the bank procedure (or origin) of a session / ASH sample"""
+    return f"""
+        CASE WHEN {objects_alias}.object_name IS NOT NULL THEN LOWER({objects_alias}.object_name)
+             WHEN {alias}.program LIKE 'oracle@%' THEN 'remote (db link)'
+             ELSE 'sql' END"""
+
+# ASH is licensed with the Diagnostics Pack ('DIAGNOSTIC' or 'DIAGNOSTIC+TUNING')
+PACK_ACCESS_SQL = "SELECT value FROM v$parameter WHERE name = 'control_management_pack_access'"
+
+ASH_UPPER_BOUND_SQL = "SELECT MAX(sample_id) FROM v$active_session_history"
+
+ASH_WAITS_SQL = f"""
+    SELECT {_attribution('h', 'o')} AS procedure_name,
+           CASE WHEN h.session_state = 'WAITING' THEN h.event ELSE 'ON CPU' END AS event,
+           CASE WHEN h.session_state = 'WAITING' THEN h.wait_class ELSE 'CPU' END AS wait_class,
+           COUNT(*) AS samples
+    FROM v$active_session_history h
+    LEFT JOIN user_objects o ON o.object_id = h.plsql_entry_object_id
+    WHERE h.sample_id > :last_sample
+      AND h.sample_id <= :upper_bound
+      AND h.user_id = UID
+      AND h.session_id != SYS_CONTEXT('USERENV', 'SID')
+    GROUP BY {_attribution('h', 'o')},
+             CASE WHEN h.session_state = 'WAITING' THEN h.event ELSE 'ON CPU' END,
+             CASE WHEN h.session_state = 'WAITING' THEN h.wait_class ELSE 'CPU' END
+"""
+
+# Active, non-idle sessions of the application user (states other than WAITING are on CPU)
+SESSION_WAITS_SQL = f"""
+    SELECT {_attribution('s', 'o')} AS procedure_name,
+           CASE WHEN s.state = 'WAITING' THEN s.event ELSE 'ON CPU' END AS event,
+           CASE WHEN s.state = 'WAITING' THEN s.wait_class ELSE 'CPU' END AS wait_class,
+           COUNT(*) AS sessions
+    FROM v$session s
+    LEFT JOIN user_objects o ON o.object_id = s.plsql_entry_object_id
+    WHERE s.username = USER
+      AND s.sid != SYS_CONTEXT('USERENV', 'SID')
+      AND s.status = 'ACTIVE'
+      AND (s.state != 'WAITING' OR s.wait_class != 'Idle')
+    GROUP BY {_attribution('s', 'o')},
+             CASE WHEN s.state = 'WAITING' THEN s.event ELSE 'ON CPU' END,
+             CASE WHEN s.state = 'WAITING' THEN s.wait_class ELSE 'CPU' END
+"""
+
+# Cumulative statistics of the application's statements (times in microseconds);
+# PROGRAM_ID is the PL/SQL unit that parsed the statement
+SQLSTATS_SQL = """
+    SELECT st.sql_id,
+           SUM(st.executions),
+           SUM(st.elapsed_time),
+           SUM(st.cpu_time),
+           SUM(st.application_wait_time),
+           SUM(st.concurrency_wait_time),
+           SUM(st.user_io_wait_time),
+           SUM(st.rows_processed),
+           MAX(SUBSTR(st.sql_text, 1, 200)),
+           MAX(LOWER(o.object_name))
+    FROM v$sqlstats st
+    JOIN (
+        SELECT sql_id, MAX(program_id) AS program_id
+        FROM v$sql
+        WHERE parsing_schema_name = USER
+        GROUP BY sql_id
+    ) q ON q.sql_id = st.sql_id
+    LEFT JOIN user_objects o ON o.object_id = q.program_id
+    GROUP BY st.sql_id
+"""
+
+SQL_FIELDS = ['executions', 'elapsed_us', 'cpu_us', 'lock_wait_us', 'concurrency_wait_us', 'io_wait_us', 'rows']
+
+BLOCKERS_SQL = f"""
+    SELECT w.sid,
+           {_attribution('w', 'wo')} AS waiter_procedure,
+           w.event,
+           ROUND(w.wait_time_micro / 1000) AS wait_ms,
+           w.sql_id,
+           LOWER(lo.object_name) AS locked_object,
+           b.sid,
+           b.username,
+           {_attribution('b', 'bo')} AS blocker_procedure,
+           b.status,
+           CASE WHEN b.state = 'WAITING' THEN b.event ELSE 'ON CPU' END AS blocker_event,
+           NVL(b.sql_id, b.prev_sql_id) AS blocker_sql_id
+    FROM v$session w
+    JOIN v$session b ON b.sid = w.blocking_session
+    LEFT JOIN user_objects wo ON wo.object_id = w.plsql_entry_object_id
+    LEFT JOIN user_objects bo ON bo.object_id = b.plsql_entry_object_id
+    LEFT JOIN user_objects lo ON lo.object_id = w.row_wait_obj#
+    WHERE w.username = USER
+      AND w.blocking_session IS NOT NULL
+    ORDER BY w.wait_time_micro DESC
+    FETCH FIRST {BLOCKERS_LIMIT} ROWS ONLY
+"""
+
+BLOCKER_FIELDS = ['waiter_sid', 'waiter_procedure', 'waiter_event', 'wait_ms', 'waiter_sql_id', 'locked_object',
+                  'blocker_sid', 'blocker_username', 'blocker_procedure', 'blocker_status', 'blocker_event',
+                  'blocker_sql_id']
+
+def wait_category(event, wait_class):
+    """Category of a wait event (cpu, row_lock, db_link, commit, or the wait class)"""
+    if event == 'ON CPU':
+        return 'cpu'
+    if event.startswith('enq: TX - row lock'):
+        return 'row_lock'
+    if 'dblink' in event:
+        return 'db_link'
+    if event == 'log file sync':
+        return 'commit'
+    return (wait_class or 'other').lower().replace(' ', '_')
+
+class WaitCollector:
+    """Background sampler of the catalog and all shards (one session per database)"""
+
+    def __init__(self, interval=TELEMETRY_INTERVAL, window=TELEMETRY_WINDOW, source=TELEMETRY_SOURCE,
+                 call_timeout=TELEMETRY_CALL_TIMEOUT):
+        if source not in SOURCES:
+            raise ValueError(f"Invalid TELEMETRY_SOURCE: {source}. Use one of {', '.join(SOURCES)}")
+        self.interval = interval
+        self.call_timeout = call_timeout or interval
+        self.window = window
+        self.source = source
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.executor = ThreadPoolExecutor(max_workers=len(TARGETS), thread_name_prefix='telemetry')
+        self.connections = {}
+        self.pending = {}  # target -> future of a sample still running after its cycle ended
+        # Per target: ASH source in use, last ASH sample_id, previous V$SQLSTATS totals, last sample time
+        self.progress = {target: {'source': None, 'last_sample': None, 'sql_totals': None, 'sampled_at': None}
+                        for target in TARGETS}
+        self.ticks = deque()  # (timestamp, {target: tick})
+        self.latest = {}  # target -> current sessions / blockers / status
+
+    def _connection(self, target):
+        conn = self.connections.get(target)
+        if conn is None:
+            conn = get_db_connection(shard_region=None if target == CATALOG else target)
+            if not conn:
+                raise RuntimeError(f"Database connection failed to {target}")
+            # A hung call raises DPY-4024 instead of holding the sampler thread
+            conn.call_timeout = int(self.call_timeout * 1000)
+            self.connections[target] = conn
+        return conn
+
+    def _drop_connection(self, target):
+        conn = self.connections.pop(target, None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _ash_licensed(self, cursor):
+        """Whether CONTROL_MANAGEMENT_PACK_ACCESS allows ASH (False when it cannot be read)"""
+        try:
+            cursor.execute(PACK_ACCESS_SQL)
+            row = cursor.fetchone()
+        except oracledb.DatabaseError as e:
+            print(f"Cannot read control_management_pack_access ({e}); sampling V$SESSION")
+            return False
+        return row is not None and 'DIAGNOSTIC' in (row[0] or '').upper()
+
+    def _db_time_ash(self, cursor, state):
+        """DB time from new ASH samples; returns Counter or None when ASH is unavailable"""
+        try:
+            cursor.execute(ASH_UPPER_BOUND_SQL)
+            upper_bound = cursor.fetchone()[0]
+            if state['last_sample'] is None or upper_bound is None:
+                state['last_sample'] = upper_bound or 0
+                return Counter()
+            cursor.execute(ASH_WAITS_SQL, last_sample=state['last_sample'], upper_bound=upper_bound)
+            db_time = Counter()
+            for procedure, event, wait_class, samples in cursor:
+                db_time[(procedure, event, wait_class)] += float(samples)
+            state['last_sample'] = upper_bound
+            return db_time
+        except oracledb.DatabaseError:
+            if self.source == 'ash':
+                raise
+            return None
+
+    def _sample_target(self, target):
+        state = self.progress[target]
+        now = time.time()
+        elapsed = now - state['sampled_at'] if state['sampled_at'] else self.interval
+        conn = self._connection(target)
+        cursor = conn.cursor()
+        try:
+            db_time = None
+            if self.source == 'auto' and state['source'] is None and not self._ash_licensed(cursor):
+                state['source'] = 'session_wait'
+            if self.source in ('auto', 'ash') and state['source'] != 'session_wait':
+                db_time = self._db_time_ash(cursor, state)
+                state['source'] = 'ash' if db_time is not None else 'session_wait'
+            # Current sessions are read in every mode (active / blocked counts)
+            cursor.execute(SESSION_WAITS_SQL)
+            sessions = Counter()
+            for procedure, event, wait_class, count in cursor:
+                sessions[(procedure, event, wait_class)] += int(count)
+            if db_time is None:
+                state['source'] = 'session_wait'
+                db_time = Counter({key: count * elapsed for key, count in sessions.items()})
+
+            cursor.execute(SQLSTATS_SQL)
+            totals = {row[0]: (list(row[1:8]), row[8], row[9]) for row in cursor}
+            sql_deltas = {}
+            previous = state['sql_totals']
+            if previous is not None:
+                for sql_id, (values, text, procedure) in totals.items():
+                    before = previous.get(sql_id, ([0] * len(SQL_FIELDS),))[0]
+                    delta = [max(0, (now_value or 0) - (old or 0)) for now_value, old in zip(values, before)]
+                    if delta[1] > 0:  # elapsed time
+                        sql_deltas[sql_id] = (delta, text, procedure)
+            state['sql_totals'] = totals
+
+            cursor.execute(BLOCKERS_SQL)
+            blockers = [dict(zip(BLOCKER_FIELDS, row)) for row in cursor]
+        finally:
+            cursor.close()
+        state['sampled_at'] = now
+        return {
+            'db_time': db_time,
+            'sql': sql_deltas,
+            'latest': {
+                'status': 'ok',
+                'source': state['source'],
+                'sampled_at': now,
+                'active_sessions': sum(sessions.values()),
+                'blocked_sessions': len(blockers),
+                'blockers': blockers
+            }
+        }
+
+    def _safe_sample(self, target):
+        try:
+            return self._sample_target(target)
+        except Exception as e:
+            print(f"Telemetry sample of {target} failed: {e}")
+            self._drop_connection(target)
+            self.progress[target].update({'last_sample': None, 'sql_totals': None, 'sampled_at': None})
+            return {'latest': {'status': 'error', 'error': str(e), 'sampled_at': time.time()}}
+
+    def collect_once(self):
+        """
+        Sample every database in parallel and store the results
+
+        Waits at most one interval. Targets still running are reported as 'timeout', and
+        are not sampled again until their sample ends (its result goes into that cycle).
+
+        Returns:
+            dict: Result per target
+        """
+        results = {}
+        futures = {}
+        for target in TARGETS:
+            future = self.pending.pop(target, None)
+            if future is None:
+                futures[target] = self.executor.submit(self._safe_sample, target)
+            elif future.done():
+                results[target] = future.result()
+            else:
+                futures[target] = future
+        wait(futures.values(), timeout=self.interval)
+        now = time.time()
+        for target, future in futures.items():
+            if future.done():
+                results[target] = future.result()
+            else:
+                self.pending[target] = future
+                results[target] = {'latest': {'status': 'timeout', 'sampled_at': now,
+                                              'error': f"No answer within {self.interval}s"}}
+        with self.lock:
+            self.ticks.append((now, {t: r for t, r in results.items() if 'db_time' in r}))
+            while self.ticks and self.ticks[0][0] < now - self.window:
+                self.ticks.popleft()
+            for target, result in results.items():
+                self.latest[target] = result['latest']
+        return results
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            self.collect_once()
+            self.stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='telemetry-collector', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        for target in list(self.connections):
+            self._drop_connection(target)
+        self.executor.shutdown(wait=False)
+
+    def snapshot(self, detail=False):
+        """
+        Aggregate the samples in the window
+
+        Args:
+            detail (bool): Include top SQL (with text) and lock holders
+
+        Returns:
+            dict: Per-target DB time by category / procedure / event, current sessions
+        """
+        with self.lock:
+            ticks = list(self.ticks)
+            latest = dict(self.latest)
+        covered = min(self.window, ticks[-1][0] - ticks[0][0] + self.interval) if ticks else 0.0
+        report = {
+            'enabled': True,
+            'interval_seconds': self.interval,
+            'window_seconds': round(covered, 1),
+            'targets': {}
+        }
+        for target in TARGETS:
+            db_time = Counter()
+            sql = {}
+            for _, results in ticks:
+                result = results.get(target)
+                if not result:
+                    continue
+                db_time.update(result['db_time'])
+                for sql_id, (delta, text, procedure) in result['sql'].items():
+                    entry = sql.setdefault(sql_id, {'values': [0] * len(SQL_FIELDS), 'text': text, 'procedure': procedure})
+                    entry['values'] = [a + b for a, b in zip(entry['values'], delta)]
+
+            total = sum(db_time.values())
+            categories = Counter()
+            procedures = {}
+            for (procedure, event, wait_class), seconds in db_time.items():
+                category = wait_category(event, wait_class)
+                categories[category] += seconds
+                entry = procedures.setdefault(procedure, {'db_time_seconds': 0.0, 'categories': Counter(), 'events': Counter()})
+                entry['db_time_seconds'] += seconds
+                entry['categories'][category] += seconds
+                entry['events'][event] += seconds
+
+            current = latest.get(target, {'status': 'pending'})
+            target_report = {
+                'status': current.get('status'),
+                'error': current.get('error'),
+                'source': current.get('source'),
+                'sampled_at': current.get('sampled_at'),
+                'active_sessions': current.get('active_sessions'),
+                'blocked_sessions': current.get('blocked_sessions'),
+                'db_time_seconds': round(total, 1),
+                'average_active_sessions': round(total / covered, 2) if covered else 0.0,
+                'categories': {name: round(seconds, 1) for name, seconds in categories.most_common()},
+                'procedures': {
+                    name: {
+                        'db_time_seconds': round(entry['db_time_seconds'], 1),
+                        'percent': round(100.0 * entry['db_time_seconds'] / total, 1) if total else 0.0,
+                        'categories': {c: round(s, 1) for c, s in entry['categories'].most_common()},
+                        'top_events': [{'event': e, 'seconds': round(s, 1)}
+                                       for e, s in entry['events'].most_common(TOP_EVENTS_LIMIT)]
+                    }
+                    for name, entry in sorted(procedures.items(), key=lambda item: -item[1]['db_time_seconds'])
+                }
+            }
+            if detail:
+                top = sorted(sql.items(), key=lambda item: -item[1]['values'][1])[:TOP_SQL_LIMIT]
+                target_report['top_sql'] = []
+                for sql_id, entry in top:
+                    values = dict(zip(SQL_FIELDS, entry['values']))
+                    executions = values['executions']
+                    target_report['top_sql'].append({
+                        'sql_id': sql_id,
+                        'procedure': entry['procedure'],
+                        'executions': int(executions),
+                        'elapsed_ms': round(values['elapsed_us'] / 1000, 1),
+                        'avg_elapsed_ms': round(values['elapsed_us'] / 1000 / executions, 2) if executions else None,
+                        'cpu_ms': round(values['cpu_us'] / 1000, 1),
+                        'lock_wait_ms': round(values['lock_wait_us'] / 1000, 1),
+                        'concurrency_wait_ms': round(values['concurrency_wait_us'] / 1000, 1),
+                        'io_wait_ms': round(values['io_wait_us'] / 1000, 1),
+                        'rows': int(values['rows']),
+                        'sql_text': entry['text']
+                    })
+                target_report['blockers'] = current.get('blockers', [])
+            report['targets'][target] = target_report
+        return report
+
+_collector = None
+
+def init_telemetry(app):
+    """
+    Start the wait collector with the first request when TELEMETRY_INTERVAL > 0
+    (not at import, so the debug reloader's parent process does not sample too)
+
+    Args:
+        app: Flask application
+    """
+    if TELEMETRY_INTERVAL <= 0:
+        return
+    start_lock = threading.Lock()
+
+    @app.before_request
+    def start_collector():
+        global _collector
+        if _collector is None:
+            with start_lock:
+                if _collector is None:
+                    collector = WaitCollector()
+                    collector.start()
+                    _collector = collector
+
+def get_wait_stats(detail=False):
+    """Wait telemetry snapshot (enabled: False when the collector is off)"""
+    if _collector is None:
+        return {
+            'enabled': TELEMETRY_INTERVAL > 0,
+            'message': 'Collector starting' if TELEMETRY_INTERVAL > 0 else 'Set TELEMETRY_INTERVAL (seconds) to enable',
+            'targets': {}
+        }
+    return _collector.snapshot(detail=detail)
@@ -0,0 +1,311 @@
+"""
+Asynchronous transfer utilities
+Cross-shard transfers through the transactional outbox (see sql/sharding/21-create-transfer-outbox.sql)
+and the relay worker that applies the remote credits in batches per destination shard
+"""
+
+import asyncio
+import time
+
+from .db import (
+    oracledb, get_db_connection, get_async_connection, run_per_shard,
+    SHARD_REGIONS, SHARD_LOCATIONS, PIPELINING_AVAILABLE
+)
+
+def transfer_money_async(conn, from_account_number, to_account_number, to_region, amount, description=''):
+    """
+    Debit the source account and queue the remote credit in one local transaction
+    conn must be connected to the source account's shard
+
+    Returns:
+        str: transfer_id (globally unique, also stored as transactions.reference_number)
+    """
+    cursor = conn.cursor()
+    try:
+        transfer_id = cursor.var(str)
+        cursor.callproc('transfer_money_async', [
+            from_account_number,
+            to_account_number,
+            to_region,
+            amount,
+            description,
+            transfer_id
+        ])
+        return transfer_id.getvalue()
+    finally:
+        cursor.close()
+
+def get_transfer_status(transfer_id, region=None):
+    """
+    Look up an async transfer by transfer_id on its source shard
+
+    Args:
+        transfer_id (str): Transfer id returned by transfer_money_async
+        region (str, optional): Source shard region; all shards are searched if not given
+
+    Returns:
+        dict: Transfer status, or None if not found
+    """
+    for shard_region in ([region.upper()] if region else SHARD_REGIONS):
+        conn = get_db_connection(shard_region=shard_region)
+        if not conn:
+            continue
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT transfer_id, from_account_number, to_account_number, destination_shard,
+                       amount, status, attempts, last_error, created_date, processed_date
+                FROM transfer_outbox
+                WHERE transfer_id = :transfer_id
+            """, {'transfer_id': transfer_id})
+            row = cursor.fetchone()
+            cursor.close()
+            if row:
+                return {
+                    'transfer_id': row[0],
+                    'from_account_number': row[1],
+                    'to_account_number': row[2],
+                    'source_region': shard_region,
+                    'destination_region': row[3],
+                    'amount': float(row[4]),
+                    'status': row[5],
+                    'attempts': int(row[6] or 0),
+                    'last_error': row[7],
+                    'created_date': row[8].strftime('%Y-%m-%d %H:%M:%S') if row[8] else None,
+                    'processed_date': row[9].strftime('%Y-%m-%d %H:%M:%S') if row[9] else None
+                }
+        except Exception as e:
+            print(f"Error looking up transfer {transfer_id} in {shard_region}: {e}")
+        finally:
+            conn.close()
+    return None
+
+def get_outbox_stats():
+    """
+    Relay lag and throughput per source shard, read from the outbox tables
+    (works regardless of where / how many relay workers run)
+
+    Returns:
+        dict: shard_location -> pending count, oldest pending age (lag) and recent throughput
+    """
+    def shard_stats(region):
+        conn = get_db_connection(shard_region=region)
+        if not conn:
+            return {'error': f'Database connection failed to shard for region {region}'}
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT
+                    COUNT(CASE WHEN status = 'PENDING' THEN 1 END) AS pending,
+                    MIN(CASE WHEN status = 'PENDING' THEN created_date END) AS oldest_pending,
+                    COUNT(CASE WHEN status = 'APPLIED' AND processed_date >= LOCALTIMESTAMP - INTERVAL '1' MINUTE THEN 1 END) AS applied_last_minute,
+                    COUNT(CASE WHEN status = 'REJECTED' AND processed_date >= LOCALTIMESTAMP - INTERVAL '1' MINUTE THEN 1 END) AS rejected_last_minute,
+                    AVG(CASE WHEN processed_date >= LOCALTIMESTAMP - INTERVAL '1' MINUTE
+                             THEN EXTRACT(SECOND FROM (processed_date - created_date))
+                                + 60 * EXTRACT(MINUTE FROM (processed_date - created_date))
+                                + 3600 * EXTRACT(HOUR FROM (processed_date - created_date)) END) AS avg_settle_seconds,
+                    LOCALTIMESTAMP AS now
+                FROM transfer_outbox
+                WHERE status = 'PENDING' OR processed_date >= LOCALTIMESTAMP - INTERVAL '1' MINUTE
+            """)
+            pending, oldest, applied, rejected, avg_settle, now = cursor.fetchone()
+            cursor.close()
+            return {
+                'pending': int(pending or 0),
+                'lag_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+                'applied_last_minute': int(applied or 0),
+                'rejected_last_minute': int(rejected or 0),
+                'applied_per_second': round(int(applied or 0) / 60.0, 2),
+                'avg_settle_seconds': round(float(avg_settle), 3) if avg_settle is not None else None
+            }
+        except Exception as e:
+            return {'error': str(e)}
+        finally:
+            conn.close()
+
+    results = run_per_shard(shard_stats)
+    return {SHARD_LOCATIONS[region]: stats for region, stats in results.items()}
+
+def require_pipelining():
+    """Raise a helpful error if round-trip pipelining is not available"""
+    if not PIPELINING_AVAILABLE:
+        raise RuntimeError('The outbox relay requires python-oracledb 2.4+ (pipelining): pip install "oracledb>=3.1"')
+
+class OutboxRelay:
+    """
+    Relay worker: moves PENDING outbox entries to their destination shards
+
+    One cycle, per source shard:
+      1. lock a batch of PENDING outbox rows (FOR UPDATE SKIP LOCKED, so several
+         relays can run side by side)
+      2. per destination shard, in parallel: apply all credits, commit and read the
+         outcomes back in one pipeline (idempotent by transfer_id, so a crash before
+         step 3 is safe to retry)
+      3. complete / reverse the transfers on the source shard and commit in one pipeline
+
+    A pipeline sends its operations without waiting for each reply, but is not always a
+    single round trip: the transfer_id collection bind (DbObject) adds round trips
+
+    Uses asyncio connections (pipelining) driven by a private event loop, so callers
+    stay synchronous
+    """
+
+    def __init__(self, batch_size=500, regions=None):
+        require_pipelining()
+        self.batch_size = batch_size
+        self.regions = [r.upper() for r in (regions or SHARD_REGIONS)]
+        self.loop = asyncio.new_event_loop()
+        self.connections = {}
+        self.list_types = {}
+        self.totals = {'applied': 0, 'rejected': 0, 'failed_batches': 0, 'seconds': 0.0}
+
+    async def _connection(self, region):
+        conn = self.connections.get(region)
+        if conn is None:
+            conn = await get_async_connection(region)
+            self.connections[region] = conn
+            self.list_types[region] = await conn.gettype('SYS.ODCIVARCHAR2LIST')
+        return conn
+
+    async def _drop_connection(self, region):
+        conn = self.connections.pop(region, None)
+        self.list_types.pop(region, None)
+        if conn is not None:
+            try:
+                await conn.close()
+            except Exception:
+                pass
+
+    def close(self):
+        for region in list(self.connections):
+            self.loop.run_until_complete(self._drop_connection(region))
+
+    async def _apply_credits(self, destination, entries):
+        """Apply credits on one destination shard; returns transfer_id -> (status, reason)"""
+        conn = await self._connection(destination)
+        pipeline = oracledb.create_pipeline()
+        pipeline.add_executemany(
+            "BEGIN apply_transfer_credit(:1, :2, :3); END;",
+            [(e['transfer_id'], e['to_account_number'], e['amount']) for e in entries]
+        )
+        pipeline.add_commit()
+        pipeline.add_fetchall("""
+            SELECT transfer_id, status, reason
+            FROM transfer_inbox
+            WHERE transfer_id IN (SELECT COLUMN_VALUE FROM TABLE(:ids))
+        """, {'ids': self.list_types[destination].newobject([e['transfer_id'] for e in entries])},
+            arraysize=len(entries))  # all outcomes in the first fetch
+        results = await conn.run_pipeline(pipeline)
+        return {row[0]: (row[1], row[2]) for row in results[-1].rows}
+
+    async def _claim_batch(self, conn):
+        """
+        Lock up to batch_size PENDING outbox rows, oldest first; returns destination -> entries
+
+        SKIP LOCKED rows are locked as they are fetched, so the batch is limited by the
+        fetch, not by ROWNUM: ROWNUM is applied before rows locked by another relay are
+        skipped, so a second relay would get the same first rows and claim nothing
+        """
+        cursor = conn.cursor()
+        # Fetch exactly one batch from the server: prefetched rows would be locked too
+        cursor.arraysize = self.batch_size
+        cursor.prefetchrows = self.batch_size
+        try:
+            await cursor.execute("""
+                SELECT transfer_id, to_account_number, destination_shard, amount
+                FROM transfer_outbox
+                WHERE status = 'PENDING'
+                ORDER BY created_date
+                FOR UPDATE SKIP LOCKED
+            """)
+            by_destination = {}
+            for transfer_id, to_account_number, destination, amount in await cursor.fetchmany(self.batch_size):
+                by_destination.setdefault(destination, []).append({
+                    'transfer_id': transfer_id,
+                    'to_account_number': to_account_number,
+                    'amount': amount
+                })
+        finally:
+            cursor.close()
+        return by_destination
+
+    async def _relay_shard(self, source):
+        conn = await self._connection(source)
+        stats = {'applied': 0, 'rejected': 0, 'failed': 0}
+        try:
+            by_destination = await self._claim_batch(conn)
+
+            # Destination shards are independent connections: apply them concurrently
+            destinations = list(by_destination)
+            outcomes = await asyncio.gather(
+                *(self._apply_credits(d, by_destination[d]) for d in destinations),
+                return_exceptions=True
+            )
+
+            completions = []
+            failures = []
+            for destination, result in zip(destinations, outcomes):
+                entries = by_destination[destination]
+                if isinstance(result, Exception):
+                    print(f"Relay error applying {len(entries)} credits on {destination}: {result}")
+                    await self._drop_connection(destination)
+                    failures.extend((str(result)[:400], entry['transfer_id']) for entry in entries)
+                    continue
+                for entry in entries:
+                    status, reason = result.get(entry['transfer_id'], (None, None))
+                    if status:
+                        completions.append((entry['transfer_id'], status, reason))
+                        stats['applied' if status == 'APPLIED' else 'rejected'] += 1
+
+            pipeline = oracledb.create_pipeline()
+            if completions:
+                pipeline.add_executemany("BEGIN complete_outbox_transfer(:1, :2, :3); END;", completions)
+            if failures:
+                stats['failed'] = len(failures)
+                pipeline.add_executemany("""
+                    UPDATE transfer_outbox
+                    SET attempts = attempts + 1, last_error = :1
+                    WHERE transfer_id = :2
+                """, failures)
+            pipeline.add_commit()  # releases the outbox row locks
+            await conn.run_pipeline(pipeline)
+        except Exception:
+            await self._drop_connection(source)
+            raise
+        return stats
+
+    def relay_shard(self, source):
+        """Relay one batch of PENDING outbox rows from one source shard"""
+        return self.loop.run_until_complete(self._relay_shard(source))
+
+    def run_once(self):
+        """Run one relay cycle over all source shards; returns per-shard stats"""
+        started = time.perf_counter()
+        cycle = {}
+        for source in self.regions:
+            try:
+                cycle[SHARD_LOCATIONS[source]] = self.relay_shard(source)
+            except Exception as e:
+                print(f"Relay error on source shard {source}: {e}")
+                self.totals['failed_batches'] += 1
+                cycle[SHARD_LOCATIONS[source]] = {'error': str(e)}
+        elapsed = time.perf_counter() - started
+        for stats in cycle.values():
+            self.totals['applied'] += stats.get('applied', 0)
+            self.totals['rejected'] += stats.get('rejected', 0)
+        self.totals['seconds'] += elapsed
+        return {'shards': cycle, 'seconds': round(elapsed, 3)}
+
+    def run_forever(self, poll_interval=0.5):
+        """Relay continuously; sleeps only when a cycle found nothing to do"""
+        try:
+            while True:
+                cycle = self.run_once()
+                moved = sum(s.get('applied', 0) + s.get('rejected', 0) for s in cycle['shards'].values())
+                if moved:
+                    print(f"Relayed {moved} transfers in {cycle['seconds']}s "
+                          f"({moved / max(cycle['seconds'], 1e-6):.1f}/s), totals: {self.totals}")
+                else:
+                    time.sleep(poll_interval)
+        finally:
+            self.close()
@@ -157,6 +157,12 @@ for shard_num in 1 2 3; do
     echo "✅ Procedures created on shard $shard_num"
 done
 
+echo "Creating transfer outbox (async cross-shard transfers) on each shard..."
+for shard_num in 1 2 3; do
+    docker exec -i oracle-shard$shard_num sqlplus bank_app/${BANK_APP_PASSWORD}@freepdb1 < "$SQL_DIR/21-create-transfer-outbox.sql"
+    echo "✅ Transfer outbox created on shard $shard_num"
+done
+
 echo ""
 
 # Insert Sample Data on Correct Shards
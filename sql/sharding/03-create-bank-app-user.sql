@@ -59,6 +59,17 @@ GRANT EXECUTE ON DBMS_LOCK TO bank_app;
 -- Grant dictionary access for monitoring
 GRANT SELECT ON v_$session TO bank_app;
 GRANT SELECT ON v_$database TO bank_app;
+GRANT SELECT ON v_$mystat TO bank_app;    -- Session round trips (dashboard bench_write_path.py)
+GRANT SELECT ON v_$statname TO bank_app;
+
+-- Wait-event telemetry (dashboard utils/telemetry.py)
+-- V$ACTIVE_SESSION_HISTORY is part of the Diagnostics Pack on Enterprise Edition;
+-- without it the collector samples V$SESSION instead (TELEMETRY_SOURCE=session_wait).
+-- TELEMETRY_SOURCE=auto reads CONTROL_MANAGEMENT_PACK_ACCESS from V$PARAMETER and only uses ASH when it is licensed
+GRANT SELECT ON v_$active_session_history TO bank_app;
+GRANT SELECT ON v_$parameter TO bank_app;
+GRANT SELECT ON v_$sqlstats TO bank_app;
+GRANT SELECT ON v_$sql TO bank_app;
 
 -- Set default tablespace for user (runs whether tablespace newly created or pre-existing)
 ALTER USER bank_app DEFAULT TABLESPACE bank_data QUOTA UNLIMITED ON bank_data;
@@ -47,6 +47,7 @@ PROMPT Created view: accounts_all (UNION ALL from all shards)
 CREATE OR REPLACE VIEW transactions_all AS
 SELECT 
     account_number,  -- Always NOT NULL, account where transaction is routed
+    region,  -- Region of account_number (set by transactions_before_insert)
     from_account_number,
     to_account_number,
     transaction_type, 
@@ -61,6 +62,7 @@ FROM transactions@shard1_link
 UNION ALL
 SELECT 
     account_number,
+    region,
     from_account_number,
     to_account_number,
     transaction_type, 
@@ -75,6 +77,7 @@ FROM transactions@shard2_link
 UNION ALL
 SELECT 
     account_number,
+    region,
     from_account_number,
     to_account_number,
     transaction_type, 
@@ -89,6 +92,62 @@ FROM transactions@shard3_link;
 
 PROMPT Created view: transactions_all (UNION ALL from all shards)
 
+-- View of transaction aggregates per shard and region
+-- Each branch reads a single remote table, so the GROUP BY runs on the shard and only
+-- one row per region crosses the database link (no join back to accounts_all needed)
+-- Transactions whose account the trigger could not find have a NULL region: regional
+-- views leave that group out (as the old join to accounts_all did), overall totals keep it
+CREATE OR REPLACE VIEW transaction_region_stats AS
+SELECT 
+    region,
+    'SHARD1' AS shard_location,
+    COUNT(*) AS total_transactions,
+    COUNT(CASE WHEN transaction_type = 'DEPOSIT' THEN 1 END) AS deposits,
+    COUNT(CASE WHEN transaction_type = 'WITHDRAWAL' THEN 1 END) AS withdrawals,
+    COUNT(CASE WHEN transaction_type = 'TRANSFER' THEN 1 END) AS transfers,
+    COALESCE(SUM(CASE WHEN transaction_type = 'DEPOSIT' THEN amount ELSE 0 END), 0) AS total_deposits,
+    COALESCE(SUM(CASE WHEN transaction_type = 'WITHDRAWAL' THEN amount ELSE 0 END), 0) AS total_withdrawals,
+    COALESCE(SUM(CASE WHEN transaction_type = 'TRANSFER' THEN amount ELSE 0 END), 0) AS total_transfers,
+    COUNT(CASE WHEN status = 'COMPLETED' THEN 1 END) AS completed_transactions,
+    COUNT(CASE WHEN status = 'PENDING' THEN 1 END) AS pending_transactions,
+    COUNT(CASE WHEN status = 'FAILED' THEN 1 END) AS failed_transactions
+FROM transactions@shard1_link
+GROUP BY region
+UNION ALL
+SELECT 
+    region,
+    'SHARD2' AS shard_location,
+    COUNT(*) AS total_transactions,
+    COUNT(CASE WHEN transaction_type = 'DEPOSIT' THEN 1 END) AS deposits,
+    COUNT(CASE WHEN transaction_type = 'WITHDRAWAL' THEN 1 END) AS withdrawals,
+    COUNT(CASE WHEN transaction_type = 'TRANSFER' THEN 1 END) AS transfers,
+    COALESCE(SUM(CASE WHEN transaction_type = 'DEPOSIT' THEN amount ELSE 0 END), 0) AS total_deposits,
+    COALESCE(SUM(CASE WHEN transaction_type = 'WITHDRAWAL' THEN amount ELSE 0 END), 0) AS total_withdrawals,
+    COALESCE(SUM(CASE WHEN transaction_type = 'TRANSFER' THEN amount ELSE 0 END), 0) AS total_transfers,
+    COUNT(CASE WHEN status = 'COMPLETED' THEN 1 END) AS completed_transactions,
+    COUNT(CASE WHEN status = 'PENDING' THEN 1 END) AS pending_transactions,
+    COUNT(CASE WHEN status = 'FAILED' THEN 1 END) AS failed_transactions
+FROM transactions@shard2_link
+GROUP BY region
+UNION ALL
+SELECT 
+    region,
+    'SHARD3' AS shard_location,
+    COUNT(*) AS total_transactions,
+    COUNT(CASE WHEN transaction_type = 'DEPOSIT' THEN 1 END) AS deposits,
+    COUNT(CASE WHEN transaction_type = 'WITHDRAWAL' THEN 1 END) AS withdrawals,
+    COUNT(CASE WHEN transaction_type = 'TRANSFER' THEN 1 END) AS transfers,
+    COALESCE(SUM(CASE WHEN transaction_type = 'DEPOSIT' THEN amount ELSE 0 END), 0) AS total_deposits,
+    COALESCE(SUM(CASE WHEN transaction_type = 'WITHDRAWAL' THEN amount ELSE 0 END), 0) AS total_withdrawals,
+    COALESCE(SUM(CASE WHEN transaction_type = 'TRANSFER' THEN amount ELSE 0 END), 0) AS total_transfers,
+    COUNT(CASE WHEN status = 'COMPLETED' THEN 1 END) AS completed_transactions,
+    COUNT(CASE WHEN status = 'PENDING' THEN 1 END) AS pending_transactions,
+    COUNT(CASE WHEN status = 'FAILED' THEN 1 END) AS failed_transactions
+FROM transactions@shard3_link
+GROUP BY region;
+
+PROMPT Created view: transaction_region_stats (Transaction aggregates per shard and region)
+
 -- Composite view: Accounts with User details from all shards
 CREATE OR REPLACE VIEW account_summary_all AS
 SELECT 
@@ -112,23 +171,39 @@ PROMPT Created view: account_summary_all (Accounts with user details from all sh
 
 -- View for regional statistics
 -- user_id is globally unique, transaction_id removed (not globally unique)
--- Uses account_number (globally unique) for joins
+-- Transaction counts come from transaction_region_stats (grouped on each shard by
+-- transactions.region), so balances are no longer repeated once per transaction
 CREATE OR REPLACE VIEW regional_stats AS
+WITH account_stats AS (
+    SELECT 
+        a.region,
+        COUNT(DISTINCT u.user_id) AS user_count,  -- user_id is globally unique
+        COUNT(DISTINCT a.account_number) AS account_count,  -- Use account_number (globally unique)
+        SUM(a.balance) AS total_balance,
+        ROUND(AVG(a.balance), 2) AS avg_balance,
+        MIN(a.balance) AS min_balance,
+        MAX(a.balance) AS max_balance
+    FROM accounts_all a
+    LEFT JOIN users_all u ON a.user_id = u.user_id AND a.shard_location = u.shard_location
+    GROUP BY a.region
+),
+transaction_counts AS (
+    SELECT region, SUM(total_transactions) AS transaction_count
+    FROM transaction_region_stats
+    WHERE region IS NOT NULL
+    GROUP BY region
+)
 SELECT 
-    a.region,
-    COUNT(DISTINCT u.user_id) AS user_count,  -- user_id is globally unique
-    COUNT(DISTINCT a.account_number) AS account_count,  -- Use account_number (globally unique)
-    COUNT(*) AS transaction_count,  -- Count all transactions (transaction_id removed)
-    SUM(a.balance) AS total_balance,
-    ROUND(AVG(a.balance), 2) AS avg_balance,
-    MIN(a.balance) AS min_balance,
-    MAX(a.balance) AS max_balance
-FROM accounts_all a
-LEFT JOIN users_all u ON a.user_id = u.user_id AND a.shard_location = u.shard_location
-LEFT JOIN transactions_all t
-  ON (a.account_number = t.from_account_number AND a.shard_location = t.shard_location)
-  OR (a.account_number = t.to_account_number AND a.shard_location = t.shard_location)
-GROUP BY a.region;
+    ac.region,
+    ac.user_count,
+    ac.account_count,
+    COALESCE(tc.transaction_count, 0) AS transaction_count,
+    ac.total_balance,
+    ac.avg_balance,
+    ac.min_balance,
+    ac.max_balance
+FROM account_stats ac
+LEFT JOIN transaction_counts tc ON tc.region = ac.region;
 
 PROMPT Created view: regional_stats (Aggregated statistics by region)
 
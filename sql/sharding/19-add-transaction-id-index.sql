@@ -0,0 +1,31 @@
+-- Add Index on transactions.transaction_id
+-- Lets incremental jobs (ledger reconciliation) scan only rows after a checkpoint
+-- instead of the whole transactions table
+-- Run as bank_app user on EACH SHARD (already included in 04 for new installs)
+
+PROMPT ====================================
+PROMPT Adding transaction_id index
+PROMPT Run this script on EACH SHARD
+PROMPT ====================================
+
+WHENEVER SQLERROR EXIT SQL.SQLCODE
+WHENEVER OSERROR EXIT FAILURE
+
+CONNECT bank_app/BankAppPass123@freepdb1
+
+BEGIN
+    EXECUTE IMMEDIATE 'CREATE INDEX idx_trans_id ON transactions(transaction_id)';
+    DBMS_OUTPUT.PUT_LINE('Created idx_trans_id');
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLCODE IN (-955, -1408) THEN  -- ORA-00955 name already used / ORA-01408 column list already indexed
+            DBMS_OUTPUT.PUT_LINE('Index idx_trans_id already exists');
+        ELSE
+            RAISE;
+        END IF;
+END;
+/
+
+PROMPT ====================================
+PROMPT transaction_id index ready!
+PROMPT ====================================
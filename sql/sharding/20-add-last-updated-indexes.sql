@@ -0,0 +1,43 @@
+-- Add Indexes on last_updated
+-- Makes incremental extracts (last_updated > :hwm, dashboard extract_shards.py) index range scans
+-- Run as bank_app user on EACH SHARD (already included in 04 for new installs)
+
+PROMPT ====================================
+PROMPT Adding last_updated indexes
+PROMPT Run this script on EACH SHARD
+PROMPT ====================================
+
+WHENEVER SQLERROR EXIT SQL.SQLCODE
+WHENEVER OSERROR EXIT FAILURE
+
+CONNECT bank_app/BankAppPass123@freepdb1
+
+BEGIN
+    EXECUTE IMMEDIATE 'CREATE INDEX idx_users_last_updated ON users(last_updated)';
+    DBMS_OUTPUT.PUT_LINE('Created idx_users_last_updated');
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLCODE IN (-955, -1408) THEN  -- ORA-00955 name already used / ORA-01408 column list already indexed
+            DBMS_OUTPUT.PUT_LINE('Index idx_users_last_updated already exists');
+        ELSE
+            RAISE;
+        END IF;
+END;
+/
+
+BEGIN
+    EXECUTE IMMEDIATE 'CREATE INDEX idx_accounts_last_updated ON accounts(last_updated)';
+    DBMS_OUTPUT.PUT_LINE('Created idx_accounts_last_updated');
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLCODE IN (-955, -1408) THEN
+            DBMS_OUTPUT.PUT_LINE('Index idx_accounts_last_updated already exists');
+        ELSE
+            RAISE;
+        END IF;
+END;
+/
+
+PROMPT ====================================
+PROMPT last_updated indexes ready!
+PROMPT ====================================
@@ -0,0 +1,283 @@
+-- Create Transactional Outbox for Asynchronous Cross-Shard Transfers
+-- Run as bank_app user on EACH SHARD (after 04 and 06; existing deployments need 25 first)
+--
+-- Async mode avoids the distributed transaction of transfer_money:
+--   1. Source shard: transfer_money_async debits the source account, records a PENDING
+--      TRANSFER row and an outbox row in ONE local transaction
+--   2. Relay worker (dashboard/run_outbox_relay.py) batches PENDING outbox rows per
+--      destination shard and calls apply_transfer_credit there (idempotent by transfer_id)
+--   3. Source shard: complete_outbox_transfer marks the transfer COMPLETED, or refunds
+--      the source account and marks it REVERSED if the credit was rejected
+
+PROMPT ====================================
+PROMPT Creating Transfer Outbox / Inbox
+PROMPT Run this script on EACH SHARD
+PROMPT ====================================
+
+WHENEVER SQLERROR EXIT SQL.SQLCODE
+WHENEVER OSERROR EXIT FAILURE
+
+CONNECT bank_app/BankAppPass123@freepdb1
+
+PROMPT Creating transfer_outbox table (source side)...
+
+-- One row per async transfer debited on this shard, waiting to be credited remotely
+CREATE TABLE transfer_outbox (
+    transfer_id VARCHAR2(32) PRIMARY KEY,  -- Globally unique (SYS_GUID), also transactions.reference_number
+    from_account_number VARCHAR2(20) NOT NULL,
+    to_account_number VARCHAR2(20) NOT NULL,
+    destination_shard VARCHAR2(10) NOT NULL,  -- Region of the destination account: 'NA', 'EU', 'APAC'
+    amount NUMBER(15,2) NOT NULL CHECK (amount > 0),
+    description VARCHAR2(200),
+    status VARCHAR2(10) DEFAULT 'PENDING' CHECK (status IN ('PENDING', 'APPLIED', 'REJECTED')),
+    attempts NUMBER DEFAULT 0,
+    last_error VARCHAR2(400),
+    created_date TIMESTAMP DEFAULT LOCALTIMESTAMP,
+    processed_date TIMESTAMP,
+    CONSTRAINT fk_outbox_from_account FOREIGN KEY (from_account_number) REFERENCES accounts(account_number),
+    CONSTRAINT chk_outbox_destination CHECK (destination_shard IN ('NA', 'EU', 'APAC'))
+);
+
+CREATE INDEX idx_outbox_pending ON transfer_outbox(status, destination_shard, created_date);
+CREATE INDEX idx_outbox_processed ON transfer_outbox(processed_date);  -- Relay throughput metrics
+
+PROMPT Creating transfer_inbox table (destination side)...
+
+-- One row per transfer credit received by this shard
+-- The primary key makes applying the same transfer twice a no-op
+CREATE TABLE transfer_inbox (
+    transfer_id VARCHAR2(32) PRIMARY KEY,
+    inbox_seq NUMBER GENERATED ALWAYS AS IDENTITY,  -- Checkpoint for incremental jobs (ledger reconciliation)
+    to_account_number VARCHAR2(20) NOT NULL,
+    amount NUMBER(15,2) NOT NULL CHECK (amount > 0),
+    status VARCHAR2(10) NOT NULL CHECK (status IN ('APPLIED', 'REJECTED')),
+    reason VARCHAR2(400),
+    applied_date TIMESTAMP DEFAULT LOCALTIMESTAMP
+);
+
+CREATE INDEX idx_inbox_seq ON transfer_inbox(inbox_seq);
+
+PROMPT Creating async transfer procedures...
+
+-- Async transfer: debit + PENDING transaction + outbox row in one local transaction
+-- The destination region is resolved by the caller (catalog lookup), so no DB link is used
+CREATE OR REPLACE PROCEDURE transfer_money_async(
+    p_from_account_number VARCHAR2,
+    p_to_account_number VARCHAR2,
+    p_to_region VARCHAR2,
+    p_amount NUMBER,
+    p_description VARCHAR2 DEFAULT NULL,
+    p_transfer_id OUT VARCHAR2
+) AS
+    v_from_balance NUMBER;
+    v_from_status VARCHAR2(10);
+BEGIN
+    IF UPPER(p_to_region) NOT IN ('NA', 'EU', 'APAC') THEN
+        RAISE_APPLICATION_ERROR(-20005, 'Invalid destination region: ' || p_to_region);
+    END IF;
+
+    -- Check and lock source account
+    SELECT balance, status INTO v_from_balance, v_from_status
+    FROM accounts
+    WHERE account_number = p_from_account_number
+    FOR UPDATE;
+
+    IF v_from_status != 'ACTIVE' THEN
+        RAISE_APPLICATION_ERROR(-20001, 'Source account is not active');
+    END IF;
+
+    IF v_from_balance < p_amount THEN
+        RAISE_APPLICATION_ERROR(-20002, 'Insufficient balance. Current balance: ' || v_from_balance);
+    END IF;
+
+    p_transfer_id := RAWTOHEX(SYS_GUID());
+
+    UPDATE accounts
+    SET balance = balance - p_amount,
+        last_updated = SYSDATE
+    WHERE account_number = p_from_account_number;
+
+    -- Transaction record stays PENDING until the relay confirms the remote credit
+    INSERT INTO transactions (
+        account_number,
+        from_account_number,
+        to_account_number,
+        transaction_type,
+        amount,
+        status,
+        description,
+        reference_number
+    )
+    VALUES (
+        p_from_account_number,
+        p_from_account_number,
+        p_to_account_number,
+        'TRANSFER',
+        p_amount,
+        'PENDING',
+        p_description,
+        p_transfer_id
+    );
+
+    INSERT INTO transfer_outbox (
+        transfer_id, from_account_number, to_account_number, destination_shard, amount, description
+    )
+    VALUES (
+        p_transfer_id, p_from_account_number, p_to_account_number, UPPER(p_to_region), p_amount, p_description
+    );
+
+    COMMIT;
+
+EXCEPTION
+    WHEN NO_DATA_FOUND THEN
+        ROLLBACK;
+        RAISE_APPLICATION_ERROR(-20004, 'Account not found');
+    WHEN OTHERS THEN
+        ROLLBACK;
+        RAISE;
+END;
+/
+
+-- Apply one transfer credit on the destination shard (idempotent by transfer_id)
+-- Does NOT commit: the relay commits a whole batch in one local transaction
+CREATE OR REPLACE PROCEDURE apply_transfer_credit(
+    p_transfer_id VARCHAR2,
+    p_to_account_number VARCHAR2,
+    p_amount NUMBER
+) AS
+BEGIN
+    BEGIN
+        INSERT INTO transfer_inbox (transfer_id, to_account_number, amount, status)
+        VALUES (p_transfer_id, p_to_account_number, p_amount, 'APPLIED');
+    EXCEPTION
+        WHEN DUP_VAL_ON_INDEX THEN
+            RETURN;  -- Already applied (or rejected) by an earlier relay attempt
+    END;
+
+    UPDATE accounts
+    SET balance = balance + p_amount,
+        last_updated = SYSDATE
+    WHERE account_number = p_to_account_number
+    AND status = 'ACTIVE';
+
+    IF SQL%ROWCOUNT = 0 THEN
+        UPDATE transfer_inbox
+        SET status = 'REJECTED',
+            reason = 'Destination account not found or not active'
+        WHERE transfer_id = p_transfer_id;
+    END IF;
+END;
+/
+
+-- Finish an async transfer on the source shard once the destination outcome is known
+-- APPLIED:  transaction COMPLETED
+-- REJECTED: source account refunded with a compensating DEPOSIT, transaction REVERSED
+-- Idempotent (only PENDING outbox rows are changed); does NOT commit (relay commits the batch)
+CREATE OR REPLACE PROCEDURE complete_outbox_transfer(
+    p_transfer_id VARCHAR2,
+    p_outcome VARCHAR2,
+    p_reason VARCHAR2 DEFAULT NULL
+) AS
+    v_status VARCHAR2(10);
+    v_from_account_number VARCHAR2(20);
+    v_amount NUMBER;
+BEGIN
+    SELECT status, from_account_number, amount
+    INTO v_status, v_from_account_number, v_amount
+    FROM transfer_outbox
+    WHERE transfer_id = p_transfer_id
+    FOR UPDATE;
+
+    IF v_status != 'PENDING' THEN
+        RETURN;
+    END IF;
+
+    IF p_outcome = 'APPLIED' THEN
+        UPDATE transfer_outbox
+        SET status = 'APPLIED',
+            processed_date = LOCALTIMESTAMP,
+            attempts = attempts + 1
+        WHERE transfer_id = p_transfer_id;
+
+        UPDATE transactions
+        SET status = 'COMPLETED'
+        WHERE reference_number = p_transfer_id
+        AND transaction_type = 'TRANSFER';
+    ELSE
+        UPDATE accounts
+        SET balance = balance + v_amount,
+            last_updated = SYSDATE
+        WHERE account_number = v_from_account_number;
+
+        UPDATE transfer_outbox
+        SET status = 'REJECTED',
+            processed_date = LOCALTIMESTAMP,
+            attempts = attempts + 1,
+            last_error = SUBSTR(p_reason, 1, 400)
+        WHERE transfer_id = p_transfer_id;
+
+        UPDATE transactions
+        SET status = 'REVERSED'
+        WHERE reference_number = p_transfer_id
+        AND transaction_type = 'TRANSFER';
+
+        INSERT INTO transactions (
+            account_number,
+            from_account_number,
+            to_account_number,
+            transaction_type,
+            amount,
+            status,
+            description,
+            reference_number
+        )
+        VALUES (
+            v_from_account_number,
+            NULL,
+            v_from_account_number,
+            'DEPOSIT',
+            v_amount,
+            'COMPLETED',
+            'Reversal of transfer ' || p_transfer_id,
+            'REV-' || p_transfer_id
+        );
+    END IF;
+EXCEPTION
+    WHEN NO_DATA_FOUND THEN
+        NULL;  -- Unknown transfer_id: nothing to complete
+END;
+/
+
+PROMPT Creating data generation triggers...
+
+-- The relay runs in its own process, so the dashboard never sees its writes through the app.
+-- Outbox and inbox changes bump the dashboard data version (data_generation, see 04) in the
+-- relay's transaction, like the users / accounts / transactions triggers do
+CREATE OR REPLACE TRIGGER transfer_outbox_data_generation
+AFTER INSERT OR UPDATE OR DELETE ON transfer_outbox
+BEGIN
+    bump_data_generation;
+END;
+/
+
+CREATE OR REPLACE TRIGGER transfer_inbox_data_generation
+AFTER INSERT OR UPDATE OR DELETE ON transfer_inbox
+BEGIN
+    bump_data_generation;
+END;
+/
+
+PROMPT ====================================
+PROMPT Transfer outbox created successfully on this shard!
+PROMPT ====================================
+PROMPT
+PROMPT Tables:
+PROMPT   - transfer_outbox: Async transfers debited here, waiting for the remote credit
+PROMPT   - transfer_inbox: Transfer credits received here (idempotency by transfer_id)
+PROMPT   - Both bump data_generation (dashboard data version)
+PROMPT
+PROMPT Procedures:
+PROMPT   - transfer_money_async: Debit + outbox row in one local transaction (returns transfer_id)
+PROMPT   - apply_transfer_credit: Idempotent credit on the destination shard (no commit)
+PROMPT   - complete_outbox_transfer: Complete or reverse a transfer on the source shard (no commit)
+PROMPT ====================================
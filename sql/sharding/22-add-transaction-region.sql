@@ -0,0 +1,123 @@
+-- Add region to transactions and backfill existing rows
+-- The region of the routing account (transactions.account_number) is stored on each
+-- transaction, so the catalog can aggregate transactions per shard and region
+-- without joining them back to accounts over the database links
+-- Run as bank_app user on EACH SHARD (already included in 04 for new installs)
+-- Then re-run 11-create-catalog-union-views.sql and 08-create-dashboard-views.sql on the catalog
+
+PROMPT ====================================
+PROMPT Adding transactions.region
+PROMPT Run this script on EACH SHARD
+PROMPT ====================================
+
+WHENEVER SQLERROR EXIT SQL.SQLCODE
+WHENEVER OSERROR EXIT FAILURE
+
+CONNECT bank_app/BankAppPass123@freepdb1
+
+SET SERVEROUTPUT ON
+
+BEGIN
+    EXECUTE IMMEDIATE q'[ALTER TABLE transactions ADD (region VARCHAR2(10) CHECK (region IN ('NA', 'EU', 'APAC')))]';
+    DBMS_OUTPUT.PUT_LINE('Added transactions.region');
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLCODE = -1430 THEN  -- ORA-01430 column being added already exists in table
+            DBMS_OUTPUT.PUT_LINE('Column transactions.region already exists');
+        ELSE
+            RAISE;
+        END IF;
+END;
+/
+
+PROMPT Recreating transactions_before_insert trigger...
+
+-- Same trigger as in 04: also fills region for new rows
+CREATE OR REPLACE TRIGGER transactions_before_insert
+BEFORE INSERT ON transactions
+FOR EACH ROW
+BEGIN
+    -- Ensure currency is always USD
+    :NEW.currency := 'USD';
+
+    -- Auto-populate account_number based on transaction type
+    -- For TRANSFER and WITHDRAWAL: use from_account_number (transaction stored on source account shard)
+    -- For DEPOSIT: use to_account_number (transaction stored on destination account shard)
+    IF :NEW.account_number IS NULL THEN
+        IF :NEW.transaction_type IN ('TRANSFER', 'WITHDRAWAL') THEN
+            :NEW.account_number := :NEW.from_account_number;
+        ELSIF :NEW.transaction_type = 'DEPOSIT' THEN
+            :NEW.account_number := :NEW.to_account_number;
+        ELSE
+            -- Fallback: use whichever is not null
+            :NEW.account_number := COALESCE(:NEW.from_account_number, :NEW.to_account_number);
+        END IF;
+    END IF;
+
+    -- Denormalise the routing account's region, so regional aggregates need no join to accounts
+    IF :NEW.region IS NULL THEN
+        BEGIN
+            SELECT region INTO :NEW.region
+            FROM accounts
+            WHERE account_number = :NEW.account_number;
+        EXCEPTION
+            WHEN NO_DATA_FOUND THEN
+                NULL;  -- Rejected by fk_trans_account_number anyway
+        END;
+    END IF;
+END;
+/
+
+PROMPT Backfilling region for existing transactions...
+
+-- Batched by transaction_id range (index idx_trans_id) with a commit per batch,
+-- so undo stays small and concurrent writers only wait on one batch at a time.
+-- Rows that already have a region are skipped, so the script can be re-run after an interruption.
+DECLARE
+    c_batch_size CONSTANT PLS_INTEGER := 50000;
+    v_min_id NUMBER;
+    v_max_id NUMBER;
+    v_from_id NUMBER;
+    v_updated NUMBER := 0;
+BEGIN
+    SELECT MIN(transaction_id), MAX(transaction_id)
+    INTO v_min_id, v_max_id
+    FROM transactions
+    WHERE region IS NULL;
+
+    IF v_min_id IS NULL THEN
+        DBMS_OUTPUT.PUT_LINE('No transactions to backfill');
+        RETURN;
+    END IF;
+
+    v_from_id := v_min_id;
+    WHILE v_from_id <= v_max_id LOOP
+        UPDATE transactions t
+        SET t.region = (
+            SELECT a.region
+            FROM accounts a
+            WHERE a.account_number = t.account_number
+        )
+        WHERE t.transaction_id >= v_from_id
+          AND t.transaction_id < v_from_id + c_batch_size
+          AND t.region IS NULL;
+
+        v_updated := v_updated + SQL%ROWCOUNT;
+        COMMIT;
+        v_from_id := v_from_id + c_batch_size;
+    END LOOP;
+
+    DBMS_OUTPUT.PUT_LINE('Backfilled region on ' || v_updated || ' transactions');
+END;
+/
+
+-- No index on region: regional aggregates read every row of the shard anyway
+BEGIN
+    DBMS_STATS.GATHER_TABLE_STATS(USER, 'TRANSACTIONS');
+END;
+/
+
+PROMPT ====================================
+PROMPT transactions.region ready!
+PROMPT Re-run 11 and 08 on the catalog to use it in the views
+PROMPT ====================================
@@ -0,0 +1,78 @@
+-- Load synthetic transactions for the region view timing comparison
+-- Inserts 1,000,000 COMPLETED deposits/withdrawals spread over this shard's accounts
+-- (change c_rows below for another volume)
+-- Run as bank_app user on EACH SHARD of a TEST deployment, after 22-add-transaction-region.sql
+--
+-- WARNING: balances are NOT updated, so ledger reconciliation will report drift
+-- for these accounts. Remove the rows afterwards with:
+--   DELETE FROM transactions WHERE description = 'Region timing load';
+
+PROMPT ====================================
+PROMPT Loading timing transactions
+PROMPT Run this script on EACH SHARD (test deployments only)
+PROMPT ====================================
+
+WHENEVER SQLERROR EXIT SQL.SQLCODE
+WHENEVER OSERROR EXIT FAILURE
+
+CONNECT bank_app/BankAppPass123@freepdb1
+
+SET SERVEROUTPUT ON
+
+DECLARE
+    c_rows CONSTANT PLS_INTEGER := 1000000;
+    c_batch_size CONSTANT PLS_INTEGER := 100000;
+    v_accounts NUMBER;
+    v_from PLS_INTEGER := 1;
+BEGIN
+    SELECT COUNT(*) INTO v_accounts FROM accounts;
+    IF v_accounts = 0 THEN
+        RAISE_APPLICATION_ERROR(-20001, 'No accounts on this shard');
+    END IF;
+
+    -- Region is set explicitly, so the trigger skips its account lookup
+    WHILE v_from <= c_rows LOOP
+        INSERT INTO transactions (
+            account_number, region, from_account_number, to_account_number,
+            transaction_type, amount, status, transaction_date, description, reference_number
+        )
+        WITH acc AS (
+            SELECT account_number, region, ROW_NUMBER() OVER (ORDER BY account_number) AS rn
+            FROM accounts
+        ),
+        gen AS (
+            SELECT v_from + LEVEL - 1 AS i
+            FROM dual
+            CONNECT BY LEVEL <= LEAST(c_batch_size, c_rows - v_from + 1)
+        )
+        SELECT
+            acc.account_number,
+            acc.region,
+            CASE WHEN MOD(gen.i, 2) = 0 THEN acc.account_number END,
+            CASE WHEN MOD(gen.i, 2) = 1 THEN acc.account_number END,
+            CASE WHEN MOD(gen.i, 2) = 0 THEN 'WITHDRAWAL' ELSE 'DEPOSIT' END,
+            ROUND(DBMS_RANDOM.VALUE(1, 500), 2),
+            'COMPLETED',
+            SYSTIMESTAMP - NUMTODSINTERVAL(MOD(gen.i * 7919, 31536000), 'SECOND'),  -- spread over a year
+            'Region timing load',
+            'TIMING-' || gen.i
+        FROM gen
+        JOIN acc ON acc.rn = MOD(gen.i, v_accounts) + 1;
+
+        COMMIT;
+        v_from := v_from + c_batch_size;
+    END LOOP;
+
+    DBMS_OUTPUT.PUT_LINE('Loaded ' || c_rows || ' transactions over ' || v_accounts || ' accounts');
+END;
+/
+
+BEGIN
+    DBMS_STATS.GATHER_TABLE_STATS(USER, 'TRANSACTIONS');
+END;
+/
+
+PROMPT ====================================
+PROMPT Timing transactions loaded!
+PROMPT Compare the views from the catalog: python3 dashboard/bench_region_views.py
+PROMPT ====================================
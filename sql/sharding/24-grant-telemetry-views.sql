@@ -0,0 +1,25 @@
+-- Grant dynamic performance views for wait-event telemetry
+-- Lets the dashboard collector (utils/telemetry.py) sample session waits, top SQL and lock holders
+-- Run as SYS (AS SYSDBA) on the CATALOG and EACH SHARD (already included in 03 for new installs)
+
+PROMPT ====================================
+PROMPT Granting telemetry views to bank_app
+PROMPT Run this script on the CATALOG and EACH SHARD
+PROMPT ====================================
+
+WHENEVER SQLERROR EXIT SQL.SQLCODE
+WHENEVER OSERROR EXIT FAILURE
+
+GRANT SELECT ON v_$session TO bank_app;
+
+-- V$ACTIVE_SESSION_HISTORY is part of the Diagnostics Pack on Enterprise Edition;
+-- without it the collector samples V$SESSION instead (TELEMETRY_SOURCE=session_wait).
+-- TELEMETRY_SOURCE=auto reads CONTROL_MANAGEMENT_PACK_ACCESS from V$PARAMETER and only uses ASH when it is licensed
+GRANT SELECT ON v_$active_session_history TO bank_app;
+GRANT SELECT ON v_$parameter TO bank_app;
+GRANT SELECT ON v_$sqlstats TO bank_app;
+GRANT SELECT ON v_$sql TO bank_app;
+
+PROMPT ====================================
+PROMPT Telemetry grants ready!
+PROMPT ====================================
@@ -0,0 +1,84 @@
+-- Add the Data Generation Counter
+-- The dashboard data version (HTTP ETags) is the sum of this counter per shard.
+-- Statement triggers on users, accounts, transactions and the transfer outbox / inbox bump it
+-- inside the writing transaction, so every committed change moves it (same-second balance
+-- updates without a transaction row included) and uncommitted or rolled back ones never do.
+-- The counter is striped over 64 rows by session, so concurrent writers rarely wait on each other.
+-- Run as bank_app user on EACH SHARD (already included in 04 for new installs)
+
+PROMPT ====================================
+PROMPT Adding data generation counter
+PROMPT Run this script on EACH SHARD
+PROMPT ====================================
+
+WHENEVER SQLERROR EXIT SQL.SQLCODE
+WHENEVER OSERROR EXIT FAILURE
+
+CONNECT bank_app/BankAppPass123@freepdb1
+
+BEGIN
+    EXECUTE IMMEDIATE 'CREATE TABLE data_generation (
+        slot NUMBER PRIMARY KEY,
+        generation NUMBER DEFAULT 0 NOT NULL
+    )';
+    DBMS_OUTPUT.PUT_LINE('Created data_generation');
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLCODE = -955 THEN  -- ORA-00955 name already used
+            DBMS_OUTPUT.PUT_LINE('Table data_generation already exists');
+        ELSE
+            RAISE;
+        END IF;
+END;
+/
+
+INSERT INTO data_generation (slot)
+SELECT LEVEL - 1 FROM dual
+WHERE NOT EXISTS (SELECT 1 FROM data_generation WHERE slot = LEVEL - 1)
+CONNECT BY LEVEL <= 64;
+COMMIT;
+
+CREATE OR REPLACE PROCEDURE bump_data_generation AS
+BEGIN
+    UPDATE data_generation
+    SET generation = generation + 1
+    WHERE slot = MOD(TO_NUMBER(SYS_CONTEXT('USERENV', 'SID')), 64);
+END;
+/
+
+CREATE OR REPLACE TRIGGER users_data_generation
+AFTER INSERT OR UPDATE OR DELETE ON users
+BEGIN
+    bump_data_generation;
+END;
+/
+
+CREATE OR REPLACE TRIGGER accounts_data_generation
+AFTER INSERT OR UPDATE OR DELETE ON accounts
+BEGIN
+    bump_data_generation;
+END;
+/
+
+CREATE OR REPLACE TRIGGER transactions_data_generation
+AFTER INSERT OR UPDATE OR DELETE ON transactions
+BEGIN
+    bump_data_generation;
+END;
+/
+
+-- Outbox / inbox of async transfers (21), when installed
+BEGIN
+    FOR t IN (SELECT table_name FROM user_tables WHERE table_name IN ('TRANSFER_OUTBOX', 'TRANSFER_INBOX')) LOOP
+        EXECUTE IMMEDIATE 'CREATE OR REPLACE TRIGGER ' || t.table_name || '_data_generation '
+            || 'AFTER INSERT OR UPDATE OR DELETE ON ' || t.table_name || ' '
+            || 'BEGIN bump_data_generation; END;';
+        DBMS_OUTPUT.PUT_LINE('Created ' || t.table_name || '_data_generation');
+    END LOOP;
+END;
+/
+
+PROMPT ====================================
+PROMPT Data generation counter ready!
+PROMPT Refresh 08-create-dashboard-views.sql on the catalog
+PROMPT ====================================